@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+
+"""
+Log Pipeline Benchmark
+Drives build_automation_web_gui.py with synthetic build output and measures
+how run_command -> output_queue -> /get_output holds up under load.
+
+The web GUI runs in a child process with build_automation.sh replaced by
+fake_build_automation.sh, which prints lines at a configurable rate, size and
+ANSI density. N viewer threads poll /get_output like the browser does. For
+every scenario the benchmark reports:
+    - end-to-end line latency (printed by the build -> received by a viewer)
+    - server CPU time per line and request throughput
+    - server memory (RSS) at start, peak and end
+    - how many lines each viewer received
+
+Results are written as JSON so runs of different versions can be compared:
+    benchmarks/bench_log_pipeline.py --viewers 1 4 -o before.json
+    benchmarks/bench_log_pipeline.py --viewers 1 4 -o after.json --compare before.json
+
+--compare exits with status 1 when a metric regressed by more than --tolerance percent.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+
+BENCH_DIR = Path(__file__).parent.absolute()
+REPO_DIR = BENCH_DIR.parent
+FAKE_SCRIPT = BENCH_DIR / "fake_build_automation.sh"
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+sys.path.insert(0, str(REPO_DIR))
+from build_output import decode  # noqa: E402
+
+# Metric -> True when higher is better, used by --compare
+COMPARED_METRICS = {
+    'latency_p50_ms': False,
+    'latency_p95_ms': False,
+    'cpu_us_per_line': False,
+    'rss_growth_mb': False,
+    'lines_per_sec': True,
+    'requests_per_sec': True,
+}
+
+
+# ---------------------------------------------------------------- server side
+
+def serve(port, config):
+    """Run the web GUI with the fake build script (child process entry point)"""
+    import logging
+    sys.path.insert(0, str(REPO_DIR))
+    import build_automation_web_gui as web_gui
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    web_gui.build_script = FAKE_SCRIPT
+    web_gui.config_file = Path(config)
+    web_gui.app.run(host='127.0.0.1', port=port, debug=False, threaded=True)
+
+
+def process_cpu_seconds(pid):
+    """utime + stime of the process itself (children excluded)"""
+    with open(f'/proc/{pid}/stat', 'r') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def process_rss_mb(pid):
+    with open(f'/proc/{pid}/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ---------------------------------------------------------------- client side
+
+class Viewer(threading.Thread):
+    """Polls /get_output like the browser and records what it receives.
+
+    fmt 'legacy' polls every interval without a sequence (lines are shared out
+    between viewers); json/text/binary follow the output by sequence number
+    with a long poll, like the current page does.
+    """
+
+    def __init__(self, base_url, interval, done, fmt='legacy', use_gzip=False):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.interval = interval
+        self.done = done
+        self.fmt = fmt
+        self.use_gzip = use_gzip
+        self.seq = 0
+        self.latencies = []
+        self.seqs = []
+        self.requests = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def run(self):
+        finished_polls = 0
+        while finished_polls < 2:
+            started = time.time()
+            url = f"{self.base_url}/get_output"
+            if self.fmt != 'legacy':
+                url += f"?format={self.fmt}&since={self.seq}&wait=1000"
+            req = urllib.request.Request(url, headers={'Accept-Encoding': 'gzip'} if self.use_gzip else {})
+            try:
+                with urllib.request.urlopen(req, timeout=30) as response:
+                    body = response.read()
+                    encoding = response.headers.get('Content-Encoding')
+                self.bytes += len(body)
+                if encoding == 'gzip':
+                    body = gzip.decompress(body)
+                lines, data = decode(body, 'json' if self.fmt == 'legacy' else self.fmt)
+            except (OSError, ValueError):
+                self.errors += 1
+                time.sleep(self.interval)
+                continue
+            received = time.time()
+            self.requests += 1
+            self.seq = data.get('next', self.seq)
+            for line in lines:
+                self.feed(ANSI_ESCAPE.sub('', line), received)
+            # Keep polling a little after the run so trailing lines are drained
+            if self.done.is_set() and data.get('finished') and not data.get('more'):
+                finished_polls += 1
+            if self.fmt == 'legacy' or (data.get('finished') and not data.get('more')):
+                time.sleep(max(0.0, self.interval - (time.time() - started)))
+
+    def feed(self, line, received):
+        if line.startswith('BENCH_DONE'):
+            self.done.set()
+            return
+        if not line.startswith('BENCH '):
+            return
+        parts = line.split(' ', 3)
+        try:
+            seq, emitted = int(parts[1]), float(parts[2])
+        except (IndexError, ValueError):
+            return
+        self.seqs.append(seq)
+        self.latencies.append(received - emitted)
+
+
+def check_port_free(port):
+    """Raise when something already listens on the port, it would answer in place of our server"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(('127.0.0.1', port))
+        except OSError as e:
+            raise RuntimeError(f"port {port} is not free ({e.strerror}), pick another with --port") from None
+
+
+def wait_for_server(base_url, server, timeout=30):
+    """True once the server answers, False when it exits or does not answer in time"""
+    deadline = time.time() + timeout
+    while time.time() < deadline and server.poll() is None:
+        try:
+            with urllib.request.urlopen(f"{base_url}/get_output", timeout=2) as response:
+                response.read()
+            # A server that exited right after binding cannot have answered
+            return server.poll() is None
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def start_run(base_url):
+    body = json.dumps({'options': '-b', 'description': 'Log pipeline benchmark', 'user': 'bench'}).encode()
+    req = urllib.request.Request(f"{base_url}/execute", data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return json.loads(response.read())
+
+
+# ---------------------------------------------------------------- scenarios
+
+def run_scenario(args, viewers, port, workdir):
+    config = workdir / 'bench.cfg'
+    config.write_text(f"APP_ROOT=/bench\nPROJECT_NAME=BENCH\nENV_PATH={workdir}\nBUILD_TYPE=SW\n")
+    env = dict(os.environ,
+               BUILD_JOBS_DIR=str(workdir / f'jobs_{port}'),
+               BENCH_LINES=str(args.lines),
+               BENCH_RATE=str(args.rate),
+               BENCH_LINE_SIZE=str(args.line_size),
+               BENCH_ANSI_PCT=str(args.ansi_pct))
+    check_port_free(port)
+    server_log = workdir / f'server_{port}.log'
+    with open(server_log, 'w') as log:
+        server = subprocess.Popen([sys.executable, __file__, '--serve', str(port), '--config', str(config)],
+                                  env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not wait_for_server(base_url, server):
+            status = 'did not start' if server.poll() is None else f'exited with status {server.returncode}'
+            tail = server_log.read_text(errors='replace').strip().splitlines()[-5:]
+            raise RuntimeError(f"web GUI {status} on port {port}" + ''.join(f"\n  {line}" for line in tail))
+        cpu_start = process_cpu_seconds(server.pid)
+        rss_start = process_rss_mb(server.pid)
+        rss_peak = [rss_start]
+        sampling = threading.Event()
+
+        def sample_rss():
+            while not sampling.wait(0.1):
+                rss_peak[0] = max(rss_peak[0], process_rss_mb(server.pid))
+
+        sampler = threading.Thread(target=sample_rss, daemon=True)
+        sampler.start()
+
+        done = threading.Event()
+        clients = [Viewer(base_url, args.poll_interval, done, args.format, args.gzip) for _ in range(viewers)]
+        started = time.time()
+        for client in clients:
+            client.start()
+        start_run(base_url)
+        for client in clients:
+            client.join(timeout=args.timeout)
+        elapsed = time.time() - started
+        sampling.set()
+        sampler.join()
+        cpu_used = process_cpu_seconds(server.pid) - cpu_start
+        rss_end = process_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    latencies = [l for c in clients for l in c.latencies]
+    seqs = [s for c in clients for s in c.seqs]
+    unique = len(set(seqs))
+    requests = sum(c.requests for c in clients)
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'viewers': viewers,
+        'lines_emitted': args.lines,
+        'lines_received': unique,
+        'lines_received_per_viewer': [len(c.seqs) for c in clients],
+        'lines_duplicated': len(seqs) - unique,
+        'complete': done.is_set() and unique == args.lines,
+        'latency_p50_ms': ms(percentile(latencies, 50)),
+        'latency_p95_ms': ms(percentile(latencies, 95)),
+        'latency_p99_ms': ms(percentile(latencies, 99)),
+        'latency_max_ms': ms(max(latencies) if latencies else None),
+        'server_cpu_sec': round(cpu_used, 3),
+        'cpu_us_per_line': round(cpu_used / args.lines * 1e6, 2) if args.lines else None,
+        'rss_start_mb': round(rss_start, 1),
+        'rss_peak_mb': round(rss_peak[0], 1),
+        'rss_end_mb': round(rss_end, 1),
+        'rss_growth_mb': round(rss_end - rss_start, 1),
+        'requests': requests,
+        'requests_per_sec': round(requests / elapsed, 1),
+        'response_bytes': sum(c.bytes for c in clients),
+        'request_errors': sum(c.errors for c in clients),
+        'elapsed_sec': round(elapsed, 2),
+        'lines_per_sec': round(unique / elapsed, 1),
+    }
+
+
+def git_version():
+    try:
+        return subprocess.run(['git', '-C', str(REPO_DIR), 'describe', '--always', '--dirty'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline, tolerance):
+    """Print metric deltas against a baseline run, returns the regressions"""
+    regressions = []
+    previous = {s['viewers']: s for s in baseline.get('scenarios', [])}
+    print(f"\nComparison against {baseline.get('version', 'baseline')} (tolerance {tolerance}%)")
+    if baseline.get('params') != results['params']:
+        print(f"  warning: parameters differ from the baseline ({baseline.get('params')})")
+    for scenario in results['scenarios']:
+        old = previous.get(scenario['viewers'])
+        if not old:
+            print(f"  viewers={scenario['viewers']}: no baseline scenario")
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = old.get(metric), scenario.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            worse = -change if higher_is_better else change
+            flag = 'REGRESSION' if worse > tolerance else ''
+            print(f"  viewers={scenario['viewers']} {metric:<18} {before:>10} -> {after:>10} ({change:+.1f}%) {flag}")
+            if flag:
+                regressions.append((scenario['viewers'], metric, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the web GUI log pipeline")
+    parser.add_argument('--lines', type=int, default=10000, help="Lines printed by the fake build (default: 10000)")
+    parser.add_argument('--rate', type=int, default=0, help="Lines per second, 0 for unlimited (default: 0)")
+    parser.add_argument('--line-size', type=int, default=120, help="Characters per line (default: 120)")
+    parser.add_argument('--ansi-pct', type=int, default=30, help="Percentage of colored lines (default: 30)")
+    parser.add_argument('--viewers', type=int, nargs='+', default=[1], help="Concurrent viewers, one scenario per value")
+    parser.add_argument('--poll-interval', type=float, default=0.5, help="Viewer poll interval in seconds (browser: 0.5)")
+    parser.add_argument('--format', choices=['legacy', 'json', 'text', 'binary'], default='legacy',
+                        help="/get_output mode: legacy (shared drain, works on old versions) or a sequenced format")
+    parser.add_argument('--gzip', action='store_true', help="Ask for gzip responses (response_bytes counts the wire size)")
+    parser.add_argument('--timeout', type=float, default=300, help="Max seconds per scenario")
+    parser.add_argument('--port', type=int, default=18080, help="Port of the benchmarked server")
+    parser.add_argument('-o', '--output', help="Write the JSON results to this file (default: stdout)")
+    parser.add_argument('--compare', help="Baseline JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=20, help="Allowed regression in percent (default: 20)")
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.config)
+        return 0
+
+    results = {
+        'benchmark': 'log_pipeline',
+        'version': git_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': {'cpus': os.cpu_count(), 'python': sys.version.split()[0]},
+        'params': {'lines': args.lines, 'rate': args.rate, 'line_size': args.line_size,
+                   'ansi_pct': args.ansi_pct, 'poll_interval': args.poll_interval,
+                   'format': args.format, 'gzip': args.gzip},
+        'scenarios': [],
+    }
+    with tempfile.TemporaryDirectory(prefix='bench_log_pipeline_') as tmp:
+        for index, viewers in enumerate(args.viewers):
+            print(f"Running scenario: {viewers} viewer(s), {args.lines} lines...", file=sys.stderr)
+            scenario = run_scenario(args, viewers, args.port + index, Path(tmp))
+            results['scenarios'].append(scenario)
+            print(f"  latency p95={scenario['latency_p95_ms']}ms cpu/line={scenario['cpu_us_per_line']}us "
+                  f"received={scenario['lines_received']}/{args.lines}", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
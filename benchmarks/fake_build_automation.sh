@@ -0,0 +1,47 @@
+#!/bin/bash
+
+# ============================================================================
+# Fake build_automation.sh for the log pipeline benchmark
+# ============================================================================
+# Accepts (and ignores) the real script's options and prints synthetic build
+# output instead. Every line starts with "BENCH <seq> <epoch seconds>" so the
+# benchmark can measure the delay until a viewer receives it.
+#
+# Settings (environment):
+#   BENCH_LINES      Lines to print (default: 10000)
+#   BENCH_RATE       Lines per second, 0 for as fast as possible (default: 0)
+#   BENCH_LINE_SIZE  Characters per line, including the prefix (default: 120)
+#   BENCH_ANSI_PCT   Percentage of lines wrapped in color codes (default: 30)
+#   BENCH_BURST      Lines printed per pacing interval (default: 50)
+
+LINES=${BENCH_LINES:-10000}
+RATE=${BENCH_RATE:-0}
+LINE_SIZE=${BENCH_LINE_SIZE:-120}
+ANSI_PCT=${BENCH_ANSI_PCT:-30}
+BURST=${BENCH_BURST:-50}
+
+COLORS=('\033[0;31m' '\033[0;32m' '\033[1;33m' '\033[0;34m' '\033[0;35m' '\033[0;36m')
+NC='\033[0m'
+
+PAYLOAD=$(printf '%*s' "$LINE_SIZE" '' | tr ' ' 'x')
+
+echo "STEP 2: Building Project (BENCH)"
+
+start=$EPOCHREALTIME
+for ((seq = 1; seq <= LINES; seq++)); do
+    prefix="BENCH $seq $EPOCHREALTIME "
+    text="$prefix${PAYLOAD:${#prefix}}"
+    if (( RANDOM % 100 < ANSI_PCT )); then
+        printf '%b%s%b\n' "${COLORS[seq % ${#COLORS[@]}]}" "$text" "$NC"
+    else
+        printf '%s\n' "$text"
+    fi
+    # Pace in bursts: sleep until the schedule of the next burst
+    if (( RATE > 0 && seq % BURST == 0 )); then
+        delay=$(awk -v s="$start" -v now="$EPOCHREALTIME" -v n="$seq" -v r="$RATE" \
+            'BEGIN { d = s + n / r - now; printf "%.4f", (d > 0 ? d : 0) }')
+        [ "$delay" != "0.0000" ] && sleep "$delay"
+    fi
+done
+
+echo "BENCH_DONE $LINES"
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+
+"""
+Fake Lab
+Hermetic stand-in for the build lab, so the full build_automation.sh flow and
+the web GUI can be run, profiled and regression-tested on any Linux box.
+
+A lab directory holds:
+    tree/       ENV_PATH: stub TreeConfig.sh/AppConfig.sh, wake, generator.sh
+    output/     OUTPUT_BASE for generated packages
+    hosts/      home directories of the fake setup and AVPC (ssh shim)
+    bin/        ssh, sshpass (and tcsh when none is installed) shims
+    jobs/       web GUI job store
+    build_config.cfg, activate
+
+Usage:
+    fakelab.py create <lab>                     Create (or recreate with --force) a lab
+    fakelab.py run <lab> -- -a                  Run build_automation.sh against the lab
+    fakelab.py serve <lab> [--port 8080]        Start the web GUI against the lab
+    fakelab.py e2e <lab> [--web] [--runs 3] [-o results.json] [--compare baseline.json]
+
+e2e runs the workflow (default -a), checks that the generated package ended up
+installed on the fake AVPC and reports the duration of every step as JSON.
+It exits with status 1 when a run fails or, with --compare, when a step got
+slower than the baseline by more than --tolerance percent.
+
+Output volumes and timings of the stubs are set with FAKELAB_* environment
+variables, see the headers of the files under benchmarks/fakelab/tree.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+
+FAKELAB_DIR = Path(__file__).parent.absolute()
+REPO_DIR = FAKELAB_DIR.parent.parent
+BUILD_SCRIPT = REPO_DIR / "build_automation.sh"
+
+sys.path.insert(0, str(REPO_DIR))
+from build_jobstore import parse_step_marker  # noqa: E402
+
+STEP_NAMES = {'-u': 'update', '-b': 'build', '-g': 'generate', '-d': 'deploy', '-i': 'install'}
+SETUP_NAME = 'fakesetup'
+AVPC_IP = '10.0.0.2'
+# Steps shorter than this are not reported as regressions (timer noise)
+MIN_REGRESSION_SEC = 0.5
+
+CONFIG_TEMPLATE = """APP_ROOT=/fakelab/app_root_updated
+PROJECT_NAME=FAKELAB
+ENV_PATH={lab}/tree
+BUILD_TYPE=HW
+HW_APP=GPR_APP
+OUTPUT_BASE={lab}/output
+ZERO_CONFIG_PATH=
+SETUP_NAME={setup}
+AVPC_IP={avpc}
+AVPC_PASSWORD=fakelab
+RETRY_BACKOFF_SEC=1
+RETRY_MAX_BACKOFF_SEC=2
+BUILD_MATRIX="HW:GPR_APP HW:CV_BPP SW"
+"""
+
+
+# ---------------------------------------------------------------- lab setup
+
+def lab_env(lab):
+    """Environment build_automation.sh and the web GUI run with inside the lab"""
+    return dict(os.environ,
+                PATH=f"{lab / 'bin'}:{os.environ.get('PATH', '')}",
+                FAKELAB_ROOT=str(lab),
+                BUILD_JOBS_DIR=str(lab / 'jobs'),
+                BKC_HASH_CACHE=str(lab / 'bkc_hashes.db'))
+
+
+def create_lab(lab, force=False):
+    lab = lab.absolute()
+    if lab.exists():
+        if not force:
+            raise FileExistsError(f"{lab} already exists (use --force to recreate it)")
+        shutil.rmtree(lab)
+    shutil.copytree(FAKELAB_DIR / 'tree', lab / 'tree', symlinks=True)
+    for name in ('output', 'hosts', 'jobs', 'bin'):
+        (lab / name).mkdir(parents=True, exist_ok=True)
+    shims = ['ssh', 'sshpass']
+    if not shutil.which('tcsh'):
+        shims.append('tcsh')
+    for shim in shims:
+        (lab / 'bin' / shim).symlink_to(FAKELAB_DIR / 'bin' / shim)
+    (lab / 'build_config.cfg').write_text(CONFIG_TEMPLATE.format(lab=lab, setup=SETUP_NAME, avpc=AVPC_IP))
+    (lab / 'activate').write_text(
+        f"# source this file to run build_automation.sh against the fake lab by hand\n"
+        f"export FAKELAB_ROOT={lab}\n"
+        f"export PATH={lab / 'bin'}:$PATH\n"
+        f"export BUILD_JOBS_DIR={lab / 'jobs'}\n"
+        f"export BKC_HASH_CACHE={lab / 'bkc_hashes.db'}\n")
+    print(f"Fake lab created at {lab}")
+    print(f"  {BUILD_SCRIPT} -c {lab / 'build_config.cfg'} -a   (after: source {lab / 'activate'})")
+    return lab
+
+
+def check_lab(lab):
+    lab = lab.absolute()
+    if not (lab / 'build_config.cfg').exists():
+        raise FileNotFoundError(f"{lab} is not a fake lab (run: fakelab.py create {lab})")
+    return lab
+
+
+# ---------------------------------------------------------------- web GUI
+
+def serve(lab, port):
+    """Run the web GUI against the lab config (blocks)"""
+    os.environ.update(lab_env(lab))
+    import build_automation_web_gui as web_gui
+    web_gui.config_file = lab / 'build_config.cfg'
+    print(f"Web GUI for fake lab {lab}: http://127.0.0.1:{port}")
+    web_gui.app.run(host='127.0.0.1', port=port, debug=False, threaded=True)
+
+
+def http_json(url, payload=None, timeout=30):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+# ---------------------------------------------------------------- e2e runs
+
+def run_direct(lab, options, timeout):
+    """Run build_automation.sh, returns (returncode, [(timestamp, line)])"""
+    cmd = [str(BUILD_SCRIPT), '-c', str(lab / 'build_config.cfg')] + options.split()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               universal_newlines=True, bufsize=1, env=lab_env(lab))
+    lines = []
+    deadline = time.time() + timeout
+    for line in process.stdout:
+        lines.append((time.time(), line.rstrip()))
+        if time.time() > deadline:
+            process.kill()
+            break
+    process.wait()
+    return process.returncode, lines
+
+
+def run_web(lab, options, timeout, port):
+    """Run the workflow through the web GUI, returns (returncode, [(timestamp, line)])"""
+    server = subprocess.Popen([sys.executable, __file__, 'serve', str(lab), '--port', str(port)],
+                              env=lab_env(lab), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    lines = []
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                http_json(f"{base_url}/get_output", timeout=2)
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"web GUI did not start on port {port}")
+                time.sleep(0.2)
+        job = http_json(f"{base_url}/execute", {'options': options, 'description': 'Fake lab e2e', 'user': 'fakelab'})
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            data = http_json(f"{base_url}/get_output")
+            now = time.time()
+            lines.extend((now, line) for line in data.get('output', []))
+            record = http_json(f"{base_url}/jobs/{job['job_id']}")
+            if record.get('state') not in ('pending', 'running'):
+                data = http_json(f"{base_url}/get_output")
+                lines.extend((time.time(), line) for line in data.get('output', []))
+                return record.get('returncode'), lines
+            time.sleep(0.2)
+        return None, lines
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def step_durations(lines, started, ended):
+    """Seconds spent in every step, from the arrival time of the STEP markers"""
+    marks = []
+    for timestamp, line in lines:
+        flag = parse_step_marker(line)
+        if flag and (not marks or marks[-1][1] != flag):
+            marks.append((timestamp, flag))
+    durations = {}
+    for index, (timestamp, flag) in enumerate(marks):
+        end = marks[index + 1][0] if index + 1 < len(marks) else ended
+        durations[STEP_NAMES[flag]] = round(end - timestamp, 2)
+    return durations
+
+
+def verify_lab(lab, options):
+    """Check the generated package reached the fake AVPC (and was installed)"""
+    flags = options.split()
+    env_path = lab / 'tree'
+    last_bkc = env_path / '.last_bkc_path'
+    if not last_bkc.exists():
+        return False, "no .last_bkc_path written"
+    version_file = Path(last_bkc.read_text().strip()) / 'version.txt'
+    if not version_file.exists():
+        return False, f"generated package missing: {version_file}"
+    version = version_file.read_text().strip()
+    avpc_home = lab / 'hosts' / AVPC_IP
+    if '-a' in flags or '-i' in flags:
+        burned = avpc_home / 'burned_version'
+        if not burned.exists() or burned.read_text().strip() != version:
+            return False, f"AVPC does not run package {version}"
+    elif '-d' in flags:
+        staged = avpc_home / 'zeroconfig' / 'bkc' / 'version.txt'
+        if not staged.exists() or staged.read_text().strip() != version:
+            return False, f"package {version} not staged on the AVPC"
+    return True, version
+
+
+def e2e(lab, args):
+    runs = []
+    for index in range(args.runs):
+        print(f"Run {index + 1}/{args.runs}: {args.options} ({'web GUI' if args.web else 'direct'})", file=sys.stderr)
+        started = time.time()
+        if args.web:
+            returncode, lines = run_web(lab, args.options, args.timeout, args.port)
+        else:
+            returncode, lines = run_direct(lab, args.options, args.timeout)
+        ended = time.time()
+        verified, detail = verify_lab(lab, args.options) if returncode == 0 else (False, f"exit code {returncode}")
+        run = {
+            'returncode': returncode,
+            'ok': returncode == 0 and verified,
+            'detail': detail,
+            'total_sec': round(ended - started, 2),
+            'steps': step_durations(lines, started, ended),
+            'lines': len(lines),
+        }
+        runs.append(run)
+        print(f"  {'OK' if run['ok'] else 'FAILED'} in {run['total_sec']}s {run['steps']} ({detail})", file=sys.stderr)
+
+    step_names = sorted({name for run in runs for name in run['steps']},
+                        key=lambda name: list(STEP_NAMES.values()).index(name))
+    ok_runs = [run for run in runs if run['ok']] or runs
+    return {
+        'benchmark': 'fakelab_e2e',
+        'version': git_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mode': 'web' if args.web else 'direct',
+        'options': args.options,
+        'settings': {key: value for key, value in sorted(os.environ.items()) if key.startswith('FAKELAB_') and key != 'FAKELAB_ROOT'},
+        'runs': runs,
+        'median': {
+            'total_sec': round(statistics.median(run['total_sec'] for run in ok_runs), 2),
+            'steps': {name: round(statistics.median(run['steps'].get(name, 0) for run in ok_runs), 2)
+                      for name in step_names},
+        },
+        'ok': all(run['ok'] for run in runs),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print median step durations against a baseline, returns the regressions"""
+    print(f"\nComparison against {baseline.get('version', 'baseline')} (tolerance {tolerance}%)")
+    if (baseline.get('options'), baseline.get('mode'), baseline.get('settings')) != \
+            (results['options'], results['mode'], results['settings']):
+        print("  warning: options, mode or FAKELAB_* settings differ from the baseline")
+    before = dict(baseline['median']['steps'], total=baseline['median']['total_sec'])
+    after = dict(results['median']['steps'], total=results['median']['total_sec'])
+    regressions = []
+    for name, new in after.items():
+        old = before.get(name)
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        flag = 'REGRESSION' if change > tolerance and new - old > MIN_REGRESSION_SEC else ''
+        print(f"  {name:<10} {old:>8}s -> {new:>8}s ({change:+.1f}%) {flag}")
+        if flag:
+            regressions.append((name, old, new))
+    return regressions
+
+
+def git_version():
+    try:
+        return subprocess.run(['git', '-C', str(REPO_DIR), 'describe', '--always', '--dirty'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hermetic fake lab for build_automation.sh")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('create', help="Create a lab directory")
+    p.add_argument('lab')
+    p.add_argument('--force', action='store_true', help="Recreate the lab if it exists")
+
+    p = sub.add_parser('run', help="Run build_automation.sh against a lab")
+    p.add_argument('lab')
+    p.add_argument('options', nargs=argparse.REMAINDER, help="build_automation.sh options (after --)")
+
+    p = sub.add_parser('serve', help="Start the web GUI against a lab")
+    p.add_argument('lab')
+    p.add_argument('--port', type=int, default=8080)
+
+    p = sub.add_parser('e2e', help="Run the workflow end to end and report step timings")
+    p.add_argument('lab')
+    p.add_argument('--options', default='-a', help="build_automation.sh options (default: -a)")
+    p.add_argument('--runs', type=int, default=1, help="Number of runs (default: 1)")
+    p.add_argument('--web', action='store_true', help="Run through the web GUI instead of directly")
+    p.add_argument('--port', type=int, default=18090, help="Web GUI port for --web (default: 18090)")
+    p.add_argument('--timeout', type=float, default=1800, help="Max seconds per run")
+    p.add_argument('-o', '--output', help="Write the JSON results to this file (default: stdout)")
+    p.add_argument('--compare', help="Baseline JSON results to compare against")
+    p.add_argument('--tolerance', type=float, default=20, help="Allowed slowdown in percent (default: 20)")
+
+    args = parser.parse_args()
+    try:
+        if args.command == 'create':
+            create_lab(Path(args.lab), args.force)
+            return 0
+        lab = check_lab(Path(args.lab))
+        if args.command == 'run':
+            options = [o for o in args.options if o != '--']
+            cmd = [str(BUILD_SCRIPT), '-c', str(lab / 'build_config.cfg')] + options
+            return subprocess.call(cmd, env=lab_env(lab))
+        if args.command == 'serve':
+            serve(lab, args.port)
+            return 0
+    except (OSError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    results = e2e(lab, args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    status = 0 if results['ok'] else 1
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            if compare(results, json.load(f), args.tolerance):
+                status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,3 @@
+# Fake lab AppConfig.sh
+setenv APP_ROOT /fakelab/app_root
+setenv APP_VARIANT CV
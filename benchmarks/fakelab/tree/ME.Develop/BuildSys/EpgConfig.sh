@@ -0,0 +1,4 @@
+# Fake lab EpgConfig.sh
+# Comment lines are removed by the update step
+setenv EPG_MODE default
+# setenv EPG_TRACE 1
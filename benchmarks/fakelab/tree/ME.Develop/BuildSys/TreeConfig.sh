@@ -0,0 +1,7 @@
+# Fake lab TreeConfig.sh - valid for tcsh and for the bin/tcsh shim
+source ME.Develop/BuildSys/AppConfig.sh
+setenv FAKELAB_TREE 1
+setenv WAKE_TOOLCHAIN fake-gcc-12
+setenv WAKE_JOBS 8
+setenv PATH ${PATH}:/opt/fakelab/toolchain/bin
+echo "TreeConfig: tree environment ready (toolchain fake-gcc-12)"
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""
+Fake lab deploy.py
+Copies the BKC it is run from to zeroconfig/bkc on the AVPC, over ssh (the
+fake lab's ssh shim), the way the real deploy.py stages a package.
+
+Usage: ./INSTALLER/deploy.py --avpc <ip> -p <password>
+FAKELAB_FAIL=deploy makes it fail after connecting.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy a BKC to an AVPC")
+    parser.add_argument('--avpc', required=True, help="AVPC IP address")
+    parser.add_argument('-p', '--password', default='', help="AVPC password")
+    args = parser.parse_args()
+
+    bkc = Path(__file__).resolve().parent.parent
+    version = (bkc / 'version.txt').read_text().strip() if (bkc / 'version.txt').exists() else 'unknown'
+    target = f"avpc@{args.avpc}"
+    print(f"deploy: package {version} -> {target}:zeroconfig/bkc", flush=True)
+
+    result = subprocess.run(['ssh', target, 'rm -rf zeroconfig/bkc && mkdir -p zeroconfig/bkc'])
+    if result.returncode != 0:
+        print(f"deploy: error: cannot reach {target}", file=sys.stderr)
+        return result.returncode
+
+    if os.environ.get('FAKELAB_FAIL') == 'deploy':
+        print("deploy: error: injected failure (FAKELAB_FAIL=deploy)", file=sys.stderr)
+        return 1
+
+    tar = subprocess.Popen(['tar', '-C', str(bkc), '-cf', '-', '.'], stdout=subprocess.PIPE)
+    ssh = subprocess.run(['ssh', target, 'tar -xf - -C zeroconfig/bkc'], stdin=tar.stdout)
+    tar.stdout.close()
+    if tar.wait() != 0 or ssh.returncode != 0:
+        print("deploy: error: transfer failed", file=sys.stderr)
+        return ssh.returncode or 1
+
+    for step in ('verifying images', 'updating boot configuration', 'syncing'):
+        print(f"deploy: {step}...", flush=True)
+    print(f"deploy: package {version} staged on {args.avpc}", flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/bin/bash
+
+# ============================================================================
+# Fake lab generator.sh
+# ============================================================================
+# Usage: generator.sh -p <project> -o <output_path> [-m <module option>]
+# Packs the build products into <output_path>/bkc the way the real generator
+# lays out a BKC: INSTALLER/deploy.py, installer.sh, firmware images and a
+# tree of small configuration files.
+#
+#   FAKELAB_BKC_MB      Total size of the firmware images in MB (default: 64)
+#   FAKELAB_BKC_FILES   Number of small configuration files (default: 200)
+#   FAKELAB_GEN_SEC     Extra packing time in seconds (default: 2)
+#   FAKELAB_FAIL=generate  Fail the generator
+
+PROJECT="" OUTPUT="" MODULE=""
+while getopts "p:o:m:" opt; do
+    case $opt in
+        p) PROJECT="$OPTARG" ;;
+        o) OUTPUT="$OPTARG" ;;
+        m) MODULE="$OPTARG" ;;
+        *) echo "usage: generator.sh -p <project> -o <output_path> [-m <module option>]" >&2; exit 2 ;;
+    esac
+done
+
+if [ -z "$PROJECT" ] || [ -z "$OUTPUT" ]; then
+    echo "generator: -p and -o are required" >&2
+    exit 2
+fi
+if [ -z "$FAKELAB_TREE" ]; then
+    echo "generator: error: tree environment not set up" >&2
+    exit 2
+fi
+
+IMAGE_MB=${FAKELAB_BKC_MB:-64}
+SMALL_FILES=${FAKELAB_BKC_FILES:-200}
+GEN_SEC=${FAKELAB_GEN_SEC:-2}
+HERE=$(cd "$(dirname "$0")" && pwd)
+BKC="$OUTPUT/bkc"
+
+echo "generator: project=$PROJECT module=${MODULE:-none} output=$OUTPUT"
+mkdir -p "$BKC/INSTALLER" "$BKC/images" "$BKC/config"
+
+cp "$HERE/INSTALLER/deploy.py" "$BKC/INSTALLER/deploy.py"
+cp "$HERE/installer.sh" "$BKC/installer.sh"
+chmod +x "$BKC/INSTALLER/deploy.py" "$BKC/installer.sh"
+echo "${PROJECT}_$(date +%Y%m%d_%H%M%S)_$$" > "$BKC/version.txt"
+
+# Firmware images: a few large files, incompressible like real signed images
+images=4
+per_image=$(( IMAGE_MB / images > 0 ? IMAGE_MB / images : 1 ))
+for ((i = 1; i <= images; i++)); do
+    echo "generator: packing images/partition_$i.img (${per_image} MB)"
+    head -c $(( per_image * 1024 * 1024 )) /dev/urandom > "$BKC/images/partition_$i.img"
+done
+
+# Configuration tree: many small text files
+for ((i = 1; i <= SMALL_FILES; i++)); do
+    dir="$BKC/config/group_$(( i % 16 ))"
+    mkdir -p "$dir"
+    {
+        echo "# generated for $PROJECT"
+        echo "module=${MODULE:-none}"
+        for ((k = 0; k < 20; k++)); do
+            echo "param_${i}_$k=$(( (i * 31 + k * 17) % 997 ))"
+        done
+    } > "$dir/setting_$i.cfg"
+    (( i % 50 == 0 )) && echo "generator: packed $i/$SMALL_FILES configuration files"
+done
+
+sleep "$GEN_SEC"
+
+if [ "$FAKELAB_FAIL" = generate ]; then
+    echo "generator: error: injected failure (FAKELAB_FAIL=generate)" >&2
+    exit 1
+fi
+
+echo "generator: BKC ready at $BKC ($(du -sh "$BKC" | cut -f1))"
@@ -0,0 +1,33 @@
+#!/bin/bash
+
+# ============================================================================
+# Fake lab installer.sh
+# ============================================================================
+# Usage: ./installer.sh --burncode -e <target> <mode>
+# Runs on the fake AVPC from zeroconfig/bkc: "burns" every image with progress
+# output and records the installed package in ~/burned_version.
+#
+#   FAKELAB_INSTALL_SEC    Duration of the burn in seconds (default: 3)
+#   FAKELAB_FAIL=install   Fail the burn
+
+DURATION=${FAKELAB_INSTALL_SEC:-3}
+version=$(cat version.txt 2>/dev/null || echo unknown)
+
+echo "installer: $* (package $version)"
+images=(images/*.img)
+steps=$(( ${#images[@]} * 4 ))
+delay=$(awk -v d="$DURATION" -v s="$steps" 'BEGIN { printf "%.3f", (s > 0 ? d / s : 0) }')
+for image in "${images[@]}"; do
+    for pct in 25 50 75 100; do
+        echo "installer: burning $(basename "$image"): $pct%"
+        sleep "$delay"
+    done
+done
+
+if [ "$FAKELAB_FAIL" = install ]; then
+    echo "installer: error: injected failure (FAKELAB_FAIL=install)" >&2
+    exit 1
+fi
+
+echo "$version" > "$HOME/burned_version"
+echo "installer: switch done, package $version installed"
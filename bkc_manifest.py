@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+"""
+BKC Manifest
+Hashes every file of a generated BKC package and writes a compact manifest
+next to it ($output_path/bkc -> $output_path/bkc.manifest).
+
+Files are hashed in parallel with a process pool, using memory-mapped reads
+for large files and large buffered reads otherwise. Digests are cached by
+(device, inode, size, mtime), so files that did not change are never hashed
+again.
+
+Manifest format (one header line, then one line per file, sorted by path):
+    #bkc-manifest v1 files=<n> bytes=<total> package_hash=<sha256>
+    <sha256> <size> <relative path>
+
+package_hash is the sha256 of the file lines and identifies the package
+content as a whole.
+
+Usage: bkc_manifest.py <bkc_dir> [-o <manifest>] [-j <workers>]
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+MANIFEST_VERSION = 'v1'
+READ_BUFFER = 1024 * 1024
+MMAP_THRESHOLD = 8 * 1024 * 1024
+# Small files are sent to the workers in batches to keep the IPC overhead low
+BATCH_BYTES = 64 * 1024 * 1024
+BATCH_FILES = 256
+
+
+def default_cache_path():
+    return Path(os.environ.get('BKC_HASH_CACHE') or
+                Path.home() / '.cache' / 'build_automation' / 'bkc_hashes.db')
+
+
+def manifest_path_for(bkc_dir):
+    bkc_dir = Path(bkc_dir)
+    return bkc_dir.parent / f"{bkc_dir.name}.manifest"
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            buffer = bytearray(READ_BUFFER)
+            view = memoryview(buffer)
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digest.update(view[:count])
+    return digest.hexdigest()
+
+
+def hash_batch(paths):
+    """Worker entry point: hash a batch of files, returns [(path, digest)]"""
+    return [(path, hash_file(path)) for path in paths]
+
+
+class HashCache:
+    """Digests keyed by (device, inode, size, mtime_ns)"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or default_cache_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "dev INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, digest TEXT, "
+                "PRIMARY KEY (dev, inode))")
+
+    def lookup(self, stat):
+        row = self.conn.execute(
+            "SELECT digest FROM hashes WHERE dev = ? AND inode = ? AND size = ? AND mtime_ns = ?",
+            (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)).fetchone()
+        return row[0] if row else None
+
+    def store(self, entries):
+        """entries: [(stat, digest)]"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes (dev, inode, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)",
+                [(st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, digest) for st, digest in entries])
+
+    def close(self):
+        self.conn.close()
+
+
+def walk_files(root):
+    """Yield (relative path, absolute path, stat) for every regular file under root"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield os.path.relpath(entry.path, root), entry.path, entry.stat(follow_symlinks=False)
+
+
+def _batches(files):
+    batch, batch_bytes = [], 0
+    for path, stat in files:
+        batch.append(path)
+        batch_bytes += stat.st_size
+        if len(batch) >= BATCH_FILES or batch_bytes >= BATCH_BYTES:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+def build_manifest(bkc_dir, output=None, workers=None, cache_path=None, log=print):
+    """Hash bkc_dir and write its manifest, returns the manifest summary dict"""
+    bkc_dir = os.path.abspath(bkc_dir)
+    if not os.path.isdir(bkc_dir):
+        raise FileNotFoundError(f"BKC directory not found: {bkc_dir}")
+    output = Path(output) if output else manifest_path_for(bkc_dir)
+    start = time.time()
+
+    cache = HashCache(cache_path)
+    entries = {}
+    to_hash = []
+    stats = {}
+    for rel_path, abs_path, stat in walk_files(bkc_dir):
+        stats[abs_path] = (rel_path, stat)
+        digest = cache.lookup(stat)
+        if digest:
+            entries[rel_path] = (digest, stat.st_size)
+        else:
+            to_hash.append((abs_path, stat))
+
+    hashed_bytes = sum(stat.st_size for _, stat in to_hash)
+    if to_hash:
+        # Largest files first so one big image does not finish last on its own
+        to_hash.sort(key=lambda item: item[1].st_size, reverse=True)
+        new_digests = []
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for results in pool.map(hash_batch, _batches(to_hash)):
+                for abs_path, digest in results:
+                    rel_path, stat = stats[abs_path]
+                    entries[rel_path] = (digest, stat.st_size)
+                    new_digests.append((stat, digest))
+        cache.store(new_digests)
+    cache.close()
+
+    lines = [f"{digest} {size} {rel_path}\n" for rel_path, (digest, size) in sorted(entries.items())]
+    package_hash = hashlib.sha256(''.join(lines).encode()).hexdigest()
+    total_bytes = sum(size for digest, size in entries.values())
+    header = f"#bkc-manifest {MANIFEST_VERSION} files={len(lines)} bytes={total_bytes} package_hash={package_hash}\n"
+    tmp = output.with_name(output.name + '.tmp')
+    with open(tmp, 'w') as f:
+        f.write(header)
+        f.writelines(lines)
+    os.replace(tmp, output)
+
+    elapsed = time.time() - start
+    summary = {
+        'bkc_dir': bkc_dir,
+        'manifest': str(output),
+        'files': len(lines),
+        'bytes': total_bytes,
+        'package_hash': package_hash,
+        'hashed_files': len(to_hash),
+        'cached_files': len(lines) - len(to_hash),
+        'hashed_mb_per_sec': round(hashed_bytes / 1024 / 1024 / elapsed, 1) if elapsed > 0 else 0,
+        'seconds': round(elapsed, 2),
+    }
+    if log:
+        log(f"[MANIFEST] files={summary['files']} bytes={summary['bytes']} hashed={summary['hashed_files']} "
+            f"cached={summary['cached_files']} rate={summary['hashed_mb_per_sec']}MB/s "
+            f"time={summary['seconds']}s package_hash={package_hash}")
+        log(f"[MANIFEST] written to {output}")
+    return summary
+
+
+def read_manifest(path, with_entries=False):
+    """Parse a manifest file into its header fields and, optionally, its entries"""
+    result = {'manifest': str(path)}
+    entries = []
+    with open(path, 'r') as f:
+        header = f.readline().split()
+        if not header or header[0] != '#bkc-manifest':
+            raise ValueError(f"Not a BKC manifest: {path}")
+        result['version'] = header[1]
+        for field in header[2:]:
+            key, value = field.split('=', 1)
+            result[key] = int(value) if value.isdigit() else value
+        if with_entries:
+            for line in f:
+                digest, size, rel_path = line.rstrip('\n').split(' ', 2)
+                entries.append({'path': rel_path, 'sha256': digest, 'size': int(size)})
+    if with_entries:
+        result['entries'] = entries
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash a BKC package and write its manifest")
+    parser.add_argument('bkc_dir', help="BKC directory produced by generate (e.g. $output_path/bkc)")
+    parser.add_argument('-o', '--output', help="Manifest path (default: <bkc_dir>.manifest)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--cache', default=None, help="Hash cache database (default: $BKC_HASH_CACHE or ~/.cache/build_automation/bkc_hashes.db)")
+    args = parser.parse_args()
+    try:
+        build_manifest(args.bkc_dir, args.output, args.jobs, args.cache)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
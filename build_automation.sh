@@ -6,7 +6,7 @@
 # This script automates the build, generate, deploy, and install workflow
 # based on a configuration file.
 #
-# Usage: ./build_automation.sh -c <config_file> [-u] [-b] [-g] [-d] [-i] [-h]
+# Usage: ./build_automation.sh -c <config_file> [-u] [-b] [-m] [-g] [-d] [-i] [-h] [--resume]
 #
 # Options:
 #   -c <config_file>  Path to configuration file (required)
@@ -16,7 +16,10 @@
 #   -d                Deploy to setup
 #   -i                Install on setup
 #   -a                Execute all steps (update, build, generate, deploy, install)
+#   -m                Build every BUILD_MATRIX variant instead of a single build
 #   -h                Show this help message
+#   --resume          Skip leading steps already completed with unchanged inputs
+#   --events[=<fd>|=<file>]  Also write NDJSON events to fd 3 (or the given fd/file)
 # ============================================================================
 
 set -e  # Exit on error
@@ -30,28 +33,35 @@ MAGENTA='\033[0;35m'
 NC='\033[0m' # No Color
 
 # Script variables
+SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
 CONFIG_FILE=""
 DO_UPDATE=false
 DO_BUILD=false
 DO_GENERATE=false
 DO_DEPLOY=false
 DO_INSTALL=false
+RESUME=false
+BUILD_MODE=single
 
 # Function to print colored messages
 print_info() {
     echo -e "${BLUE}[INFO]${NC} $1"
+    emit_event log level info message "$1"
 }
 
 print_success() {
     echo -e "${GREEN}[SUCCESS]${NC} $1"
+    emit_event log level success message "$1"
 }
 
 print_warning() {
     echo -e "${YELLOW}[WARNING]${NC} $1"
+    emit_event log level warning message "$1"
 }
 
 print_error() {
     echo -e "${RED}[ERROR]${NC} $1"
+    emit_event log level error message "$1"
 }
 
 print_step() {
@@ -65,12 +75,75 @@ print_command() {
     echo -e "${MAGENTA}[COMMAND]${NC} $1"
     # Also print a plain, easy-to-read shell command line for tools and UIs
     echo -e "\u2192 $1"
+    emit_event command command "$1" cwd "$PWD"
+}
+
+# ============================================================================
+# Event stream
+# ============================================================================
+# --events[=<fd>|=<file>] writes newline-delimited JSON events next to the
+# human output (fd 3 when no value is given), so tools do not have to parse
+# the colored text. Every event has "ts" (epoch seconds) and "type":
+#   run_start   options, config, env_path, pid
+#   step_start  step (update|build|generate|deploy|install), label
+#   step_end    step, status (ok|failed|skipped), duration_sec
+#   command     command, cwd                  (every print_command)
+#   log         level (info|success|warning|error), message   (print_*)
+#   artifact    kind (bkc|manifest|matrix_report|install_log|install_syslog), path
+#   retry       label, attempt, max (+ exit_code, delay_sec when an attempt failed)
+#   ccache      hits, misses, hit_rate, size_mb, dir
+#   lock        state (waiting|held), mode, env_path
+#   run_end     status (ok|failed), exit_code
+EVENTS_TARGET=""
+EVENTS_FD=""
+
+json_escape() {
+    local s=$1
+    s=${s//\\/\\\\}
+    s=${s//\"/\\\"}
+    s=${s//$'\n'/\\n}
+    s=${s//$'\t'/\\t}
+    s=${s//$'\r'/}
+    s=${s//$'\e'/}
+    printf '%s' "$s"
+}
+
+# Usage: emit_event <type> [<key> <value>]...
+# Values are JSON strings; a key written as "#key" takes a number.
+emit_event() {
+    [ -n "$EVENTS_FD" ] || return 0
+    local ts=${EPOCHREALTIME:-$(date +%s.%N)}
+    local json="{\"ts\": ${ts/,/.}, \"type\": \"$1\""
+    shift
+    while [ $# -ge 2 ]; do
+        if [ "${1:0:1}" = "#" ]; then
+            json+=", \"${1:1}\": ${2:-null}"
+        else
+            json+=", \"$1\": \"$(json_escape "$2")\""
+        fi
+        shift 2
+    done
+    printf '%s}\n' "$json" >&"$EVENTS_FD" 2> /dev/null || true
+}
+
+events_open() {
+    [ -n "$EVENTS_TARGET" ] || return 0
+    case "$EVENTS_TARGET" in
+        *[!0-9]*) exec {EVENTS_FD}>> "$EVENTS_TARGET" ;;
+        *)
+            if ! { true >&"$EVENTS_TARGET"; } 2> /dev/null; then
+                print_error "--events: file descriptor $EVENTS_TARGET is not open (e.g. run with 3>events.ndjson)"
+                exit 1
+            fi
+            EVENTS_FD=$EVENTS_TARGET
+            ;;
+    esac
 }
 
 # Function to show usage
 show_usage() {
     cat << EOF
-Usage: $0 -c <config_file> [-u] [-b] [-g] [-d] [-i] [-a] [-h]
+Usage: $0 -c <config_file> [-u] [-b] [-m] [-g] [-d] [-i] [-a] [-h] [--resume]
 
 Options:
   -c <config_file>  Path to configuration file (required)
@@ -80,7 +153,16 @@ Options:
   -d                Deploy to setup
   -i                Install on setup
   -a                Execute all steps (update, build, generate, deploy, install)
+  -m                Build matrix: build every BUILD_MATRIX variant (e.g. "HW:GPR_APP HW:CV_BPP SW")
+                    with MATRIX_JOBS in parallel and print an aggregated report
   -h                Show this help message
+  --resume          Skip steps already completed (recorded in \$ENV_PATH/.build_checkpoint)
+                    whose inputs did not change, rerun from the first failed or
+                    invalidated step. Without step options, resumes all steps.
+  --events[=<fd>|=<file>]
+                    Write newline-delimited JSON events (steps, commands, log
+                    messages, artifacts) to file descriptor 3, or to the given
+                    descriptor or file (appended to)
 
 Examples:
   # Update APP_ROOT and build only
@@ -91,15 +173,38 @@ Examples:
 
   # Execute all steps
   $0 -c build_config.cfg -a
+
+  # Build all variants listed in BUILD_MATRIX
+  $0 -c build_config.cfg -m
+
+  # Continue an interrupted run from the first step that did not complete
+  $0 -c build_config.cfg -a --resume
+
+  # Build with a machine-readable event stream next to the console output
+  $0 -c build_config.cfg -u -b --events=build_events.ndjson
 EOF
 }
 
+# Long options are not supported by getopts, pick them out first
+ARGS=()
+for arg in "$@"; do
+    case "$arg" in
+        --resume) RESUME=true ;;
+        --events) EVENTS_TARGET=3 ;;
+        --events=*) EVENTS_TARGET="${arg#--events=}" ;;
+        --help) show_usage; exit 0 ;;
+        *) ARGS+=("$arg") ;;
+    esac
+done
+set -- "${ARGS[@]}"
+
 # Parse command line arguments
-while getopts "c:ubgdiah" opt; do
+while getopts "c:ubmgdiah" opt; do
     case $opt in
         c) CONFIG_FILE="$OPTARG" ;;
         u) DO_UPDATE=true ;;
         b) DO_BUILD=true ;;
+        m) DO_BUILD=true; BUILD_MODE=matrix ;;
         g) DO_GENERATE=true ;;
         d) DO_DEPLOY=true ;;
         i) DO_INSTALL=true ;;
@@ -115,10 +220,18 @@ while getopts "c:ubgdiah" opt; do
     esac
 done
 
+events_open
+# Runs on every exit from here on: report the outcome, drop the tree lock record
+on_exit() {
+    local status=$?
+    [ -n "$TREE_LOCK_HOLDER" ] && rm -f "$TREE_LOCK_HOLDER"
+    emit_event run_end status "$([ "$status" -eq 0 ] && echo ok || echo failed)" "#exit_code" "$status"
+}
+trap on_exit EXIT
+
 # Check if config file is provided, use default if not
 if [ -z "$CONFIG_FILE" ]; then
     # Use default config file
-    SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
     CONFIG_FILE="$SCRIPT_DIR/build_config.cfg"
     print_info "No config file specified, using default: $CONFIG_FILE"
 fi
@@ -155,6 +268,23 @@ print_info "PROJECT_NAME: $PROJECT_NAME"
 print_info "BUILD_TYPE: $BUILD_TYPE"
 print_info "ENV_PATH: $ENV_PATH"
 
+if [ "$BUILD_MODE" = "matrix" ]; then
+    if [ -z "$BUILD_MATRIX" ]; then
+        print_error "BUILD_MATRIX not defined in config file (e.g. BUILD_MATRIX=\"HW:GPR_APP HW:CV_BPP SW\")"
+        exit 1
+    fi
+    print_info "BUILD_MATRIX: $BUILD_MATRIX (parallel: ${MATRIX_JOBS:-1})"
+fi
+
+# --resume on its own resumes the full workflow
+if [ "$RESUME" = true ] && [ "$DO_UPDATE" = false ] && [ "$DO_BUILD" = false ] && [ "$DO_GENERATE" = false ] && [ "$DO_DEPLOY" = false ] && [ "$DO_INSTALL" = false ]; then
+    DO_UPDATE=true
+    DO_BUILD=true
+    DO_GENERATE=true
+    DO_DEPLOY=true
+    DO_INSTALL=true
+fi
+
 # Check if at least one action is selected
 if [ "$DO_UPDATE" = false ] && [ "$DO_BUILD" = false ] && [ "$DO_GENERATE" = false ] && [ "$DO_DEPLOY" = false ] && [ "$DO_INSTALL" = false ]; then
     print_warning "No action selected. Use -u, -b, -g, -d, -i, or -a"
@@ -162,53 +292,659 @@ if [ "$DO_UPDATE" = false ] && [ "$DO_BUILD" = false ] && [ "$DO_GENERATE" = fal
     exit 1
 fi
 
+# ============================================================================
+# Checkpoints
+# ============================================================================
+# Every completed step is recorded in $ENV_PATH/.build_checkpoint together with
+# a fingerprint of its inputs. Fingerprints chain the fingerprint of the step
+# before them, so redoing a step with different inputs invalidates later steps.
+CHECKPOINT_FILE="$ENV_PATH/.build_checkpoint"
+STEP_NAMES=(update build generate deploy install)
+
+hash_string() {
+    printf '%s\n' "$@" | sha1sum | cut -d' ' -f1
+}
+
+file_hash() {
+    if [ -f "$1" ]; then
+        sha1sum "$1" | cut -d' ' -f1
+    else
+        echo "missing"
+    fi
+}
+
+tree_revision() {
+    git -C "$ENV_PATH" rev-parse HEAD 2>/dev/null || echo "no-git"
+    git -C "$ENV_PATH" status --porcelain -uno 2>/dev/null | sha1sum | cut -d' ' -f1
+}
+
+last_bkc_path() {
+    if [ -f "$ENV_PATH/.last_bkc_path" ]; then
+        cat "$ENV_PATH/.last_bkc_path"
+    fi
+}
+
+checkpoint_get() {
+    if [ -f "$CHECKPOINT_FILE" ]; then
+        awk -v step="$1" '$1 == step {fp = $2} END {print fp}' "$CHECKPOINT_FILE"
+    fi
+}
+
+step_fingerprint() {
+    case "$1" in
+        update)
+            hash_string "$APP_ROOT" \
+                "$(file_hash "$ENV_PATH/ME.Develop/BuildSys/AppConfig.sh")" \
+                "$(file_hash "$ENV_PATH/ME.Develop/BuildSys/EpgConfig.sh")"
+            ;;
+        build)
+            if [ "$BUILD_MODE" = "matrix" ]; then
+                hash_string "matrix" "$BUILD_MATRIX" "$(checkpoint_get update)" "$(tree_revision)"
+            else
+                hash_string "$BUILD_TYPE" "${HW_APP:-GPR_APP}" "$(checkpoint_get update)" "$(tree_revision)"
+            fi
+            ;;
+        generate)
+            hash_string "$PROJECT_NAME" "$OUTPUT_BASE" "$(checkpoint_get build)" "$(last_bkc_path)"
+            ;;
+        deploy)
+            hash_string "$SETUP_NAME" "$AVPC_IP" "$(checkpoint_get generate)" "$(last_bkc_path)"
+            ;;
+        install)
+            hash_string "$SETUP_NAME" "$AVPC_IP" "$(checkpoint_get deploy)"
+            ;;
+    esac
+}
+
+# A step is still valid when it was recorded and its inputs did not change
+checkpoint_valid() {
+    local recorded
+    recorded=$(checkpoint_get "$1")
+    [ -n "$recorded" ] || return 1
+    if [ "$1" = "generate" ]; then
+        local bkc_path
+        bkc_path=$(last_bkc_path)
+        [ -n "$bkc_path" ] && [ -d "$bkc_path" ] || return 1
+    fi
+    [ "$recorded" = "$(step_fingerprint "$1")" ]
+}
+
+# Jobs holding the shared tree lock (deploy, install) can update the checkpoint
+# file at the same time, so every rewrite holds a short lock on fd 9
+checkpoint_lock() {
+    if command -v flock > /dev/null 2>&1; then
+        flock 9
+    fi
+}
+
+checkpoint_record() {
+    local tmp="${CHECKPOINT_FILE}.tmp.$$"
+    (
+        checkpoint_lock
+        {
+            if [ -f "$CHECKPOINT_FILE" ]; then
+                grep -v "^$1 " "$CHECKPOINT_FILE" || true
+            fi
+            echo "$1 $2 $(date +%s)"
+        } > "$tmp"
+        mv "$tmp" "$CHECKPOINT_FILE"
+    ) 9>> "$CHECKPOINT_FILE.lock"
+}
+
+# Redoing a step invalidates the step itself and every step after it
+checkpoint_invalidate_from() {
+    [ -f "$CHECKPOINT_FILE" ] || return 0
+    local name found=false pattern=""
+    for name in "${STEP_NAMES[@]}"; do
+        [ "$name" = "$1" ] && found=true
+        [ "$found" = true ] && pattern="${pattern:+$pattern|}$name"
+    done
+    (
+        checkpoint_lock
+        grep -Ev "^($pattern) " "$CHECKPOINT_FILE" > "${CHECKPOINT_FILE}.tmp.$$" || true
+        mv "${CHECKPOINT_FILE}.tmp.$$" "$CHECKPOINT_FILE"
+    ) 9>> "$CHECKPOINT_FILE.lock"
+}
+
+# Run one step, honouring --resume, and record its checkpoint on success
+run_step() {
+    local name="$1" func="$2" label="$3"
+    if [ "$RESUME" = true ] && [ "$RESUME_SKIPPING" = true ]; then
+        if checkpoint_valid "$name"; then
+            print_info "Skipping $label: already completed and inputs unchanged (checkpoint)"
+            SKIPPED_STEPS+=("$name")
+            emit_event step_end step "$name" status skipped "#duration_sec" 0
+            return 0
+        fi
+        RESUME_SKIPPING=false
+        print_info "Resuming from step: $label"
+    fi
+    checkpoint_invalidate_from "$name"
+    local started=$SECONDS
+    emit_event step_start step "$name" label "$label"
+    "$func" || {
+        print_error "$label failed"
+        emit_event step_end step "$name" status failed "#duration_sec" $((SECONDS - started))
+        exit 1
+    }
+    emit_event step_end step "$name" status ok "#duration_sec" $((SECONDS - started))
+    checkpoint_record "$name" "$(step_fingerprint "$name")"
+}
+
+is_skipped() {
+    local name
+    for name in "${SKIPPED_STEPS[@]}"; do
+        [ "$name" = "$1" ] && return 0
+    done
+    return 1
+}
+
+# ============================================================================
+# Tree lock
+# ============================================================================
+# Jobs on the same ENV_PATH take an advisory lock on $ENV_PATH/.build_lock
+# (flock; the web GUI and the Tk GUI use the same lock through build_treelock.py).
+# Update, build and generate change the tree and take it exclusively; deploy
+# and install only read the last BKC and share it. A job waits for the lock
+# (up to TREE_LOCK_TIMEOUT seconds, 0 = no limit) instead of running over
+# another job. Holders describe themselves in $ENV_PATH/.build_lock.d/.
+# Set TREE_LOCK=false to run without the lock.
+TREE_LOCK_FILE="$ENV_PATH/.build_lock"
+TREE_LOCK_HOLDERS="$ENV_PATH/.build_lock.d"
+TREE_LOCK_HOLDER=""
+
+tree_lock_mode() {
+    if [ "$DO_UPDATE" = true ] || [ "$DO_BUILD" = true ] || [ "$DO_GENERATE" = true ]; then
+        echo write
+    else
+        echo read
+    fi
+}
+
+# Prints "<mode> by <user>@<host> pid <pid> (<config>)" for every holder
+tree_lock_holders() {
+    local file
+    for file in "$TREE_LOCK_HOLDERS"/*; do
+        [ -f "$file" ] || continue
+        awk '{for (i = 1; i <= NF; i++) {split($i, kv, "="); v[kv[1]] = substr($i, length(kv[1]) + 2)}}
+             END {printf "%s by %s@%s pid %s (%s)\n", v["mode"], v["user"], v["host"], v["pid"], v["config"]}' "$file"
+    done
+}
+
+tree_lock() {
+    [ "${TREE_LOCK:-true}" = true ] || return 0
+    if ! command -v flock > /dev/null 2>&1; then
+        print_warning "flock not found, running without the tree lock"
+        return 0
+    fi
+    if [ ! -d "$ENV_PATH" ]; then
+        print_warning "ENV_PATH $ENV_PATH does not exist, running without the tree lock"
+        return 0
+    fi
+    local mode flag timeout=${TREE_LOCK_TIMEOUT:-0}
+    mode=$(tree_lock_mode)
+    [ "$mode" = write ] && flag=-x || flag=-s
+    exec {TREE_LOCK_FD}>> "$TREE_LOCK_FILE"
+    if ! flock -n $flag "$TREE_LOCK_FD"; then
+        print_warning "[LOCK] $ENV_PATH is in use, waiting for the $mode lock:"
+        emit_event lock state waiting mode "$mode" env_path "$ENV_PATH"
+        tree_lock_holders | sed 's/^/  /'
+        if [ "$timeout" -gt 0 ]; then
+            flock -w "$timeout" $flag "$TREE_LOCK_FD" || {
+                print_error "[LOCK] Gave up waiting for $ENV_PATH after ${timeout}s (TREE_LOCK_TIMEOUT)"
+                exit 1
+            }
+        else
+            flock $flag "$TREE_LOCK_FD"
+        fi
+    fi
+    mkdir -p "$TREE_LOCK_HOLDERS"
+    TREE_LOCK_HOLDER="$TREE_LOCK_HOLDERS/$(hostname).$$"
+    echo "mode=$mode pid=$$ host=$(hostname) user=${USER:-$(id -un)} config=$CONFIG_FILE since=$(date +%s)" > "$TREE_LOCK_HOLDER"
+    emit_event lock state held mode "$mode" env_path "$ENV_PATH"
+    print_info "[LOCK] Holding the $mode lock on $ENV_PATH"
+}
+
+# ============================================================================
+# Retries for network-bound steps
+# ============================================================================
+# ssh (and sshpass, which passes it through) exits with 255 when the connection
+# itself fails: refused, timed out, reset. Any other exit code comes from the
+# remote command (deploy.py, installer.sh) and is treated as fatal.
+RETRY_ATTEMPTS=${RETRY_ATTEMPTS:-3}
+RETRY_BACKOFF_SEC=${RETRY_BACKOFF_SEC:-10}
+RETRY_MAX_BACKOFF_SEC=${RETRY_MAX_BACKOFF_SEC:-120}
+RETRYABLE_EXIT_CODES=${RETRYABLE_EXIT_CODES:-"255"}
+SSH_CONNECT_TIMEOUT=${SSH_CONNECT_TIMEOUT:-20}
+SSH_OPTS=(-o ConnectTimeout="$SSH_CONNECT_TIMEOUT" -o ServerAliveInterval=15 -o ServerAliveCountMax=4)
+
+is_retryable() {
+    local code
+    for code in $RETRYABLE_EXIT_CODES; do
+        [ "$1" = "$code" ] && return 0
+    done
+    return 1
+}
+
+# Usage: run_with_retry <label> <command> [args...]
+# Retries with exponential backoff plus jitter while the failure is retryable.
+run_with_retry() {
+    local label="$1"
+    shift
+    local attempt=1 status delay
+    while true; do
+        if [ "$RETRY_ATTEMPTS" -gt 1 ]; then
+            print_info "[RETRY] $label attempt $attempt/$RETRY_ATTEMPTS"
+        fi
+        emit_event retry label "$label" "#attempt" "$attempt" "#max" "$RETRY_ATTEMPTS"
+        status=0
+        "$@" || status=$?
+        if [ "$status" -eq 0 ]; then
+            return 0
+        fi
+        if ! is_retryable "$status"; then
+            print_error "$label failed with exit code $status (not retryable)"
+            return "$status"
+        fi
+        if [ "$attempt" -ge "$RETRY_ATTEMPTS" ]; then
+            print_error "$label failed with exit code $status after $attempt attempts"
+            return "$status"
+        fi
+        delay=$(( RETRY_BACKOFF_SEC * (1 << (attempt - 1)) ))
+        [ "$delay" -gt "$RETRY_MAX_BACKOFF_SEC" ] && delay=$RETRY_MAX_BACKOFF_SEC
+        delay=$(( delay + RANDOM % (delay / 2 + 1) ))
+        print_warning "[RETRY] $label attempt $attempt/$RETRY_ATTEMPTS failed with exit code $status (connection error), retrying in ${delay}s"
+        emit_event retry label "$label" "#attempt" "$attempt" "#max" "$RETRY_ATTEMPTS" "#exit_code" "$status" "#delay_sec" "$delay"
+        sleep "$delay"
+        attempt=$((attempt + 1))
+    done
+}
+
+# ============================================================================
+# Compiler cache
+# ============================================================================
+# With CCACHE_ENABLE=true the wake build runs with ccache masquerading as the
+# compilers listed in CCACHE_COMPILERS. The cache directory is shared between
+# environments on the host and CCACHE_BASEDIR makes paths relative to the tree,
+# so a second environment on the same branch hits the objects of the first.
+CCACHE_BIN=""
+CCACHE_PRINT_STATS=false
+
+ccache_setup() {
+    [ "${CCACHE_ENABLE:-false}" = true ] || return 0
+    local ccache_path
+    ccache_path=$(command -v ccache) || {
+        print_warning "CCACHE_ENABLE=true but ccache is not installed, building without compiler cache"
+        CCACHE_ENABLE=false
+        return 0
+    }
+    export CCACHE_DIR=${CCACHE_DIR:-$HOME/.cache/build_automation/ccache}
+    export CCACHE_BASEDIR
+    CCACHE_BASEDIR=$(cd "$ENV_PATH" && pwd -P)
+    export CCACHE_NOHASHDIR=true
+    export CCACHE_UMASK=002
+    mkdir -p "$CCACHE_DIR/bin"
+    ccache -M "${CCACHE_MAXSIZE:-20G}" > /dev/null
+    # --print-stats (machine readable counters) exists since ccache 4.4
+    local version
+    version=$(ccache --version 2>/dev/null | sed -n '1s/.*version \([0-9][0-9.]*\).*/\1/p')
+    if [ -n "$version" ] && printf '%s\n' 4.4 "$version" | sort -V -C; then
+        CCACHE_PRINT_STATS=true
+    else
+        CCACHE_PRINT_STATS=false
+        print_warning "ccache ${version:-of unknown version} has no --print-stats (4.4+), hit counts are read from ccache -s"
+    fi
+    local compiler
+    for compiler in ${CCACHE_COMPILERS:-gcc g++ cc c++}; do
+        ln -sf "$ccache_path" "$CCACHE_DIR/bin/$compiler"
+    done
+    CCACHE_BIN="$CCACHE_DIR/bin"
+    print_info "Compiler cache: $CCACHE_DIR (max ${CCACHE_MAXSIZE:-20G}, compilers: ${CCACHE_COMPILERS:-gcc g++ cc c++})"
+}
+
+# Prints "<hits> <misses> <size_kib>" from the shared cache counters.
+# The counters belong to the cache, not to this build: the delta ccache_report
+# prints includes whatever other builds sharing CCACHE_DIR compiled meanwhile.
+ccache_counters() {
+    if [ "$CCACHE_PRINT_STATS" = true ]; then
+        ccache --print-stats 2>/dev/null | awk -F'\t' '
+            $1 == "direct_cache_hit" || $1 == "preprocessed_cache_hit" {hits += $2}
+            $1 == "cache_miss" {misses += $2}
+            $1 == "cache_size_kibibyte" {size = $2}
+            END {print hits + 0, misses + 0, size + 0}'
+        return
+    fi
+    # Human readable summary of ccache < 4.4, sizes in decimal units
+    ccache -s 2>/dev/null | awk '
+        BEGIN {unit["bytes"] = 1; unit["kB"] = 1e3; unit["MB"] = 1e6; unit["GB"] = 1e9; unit["TB"] = 1e12}
+        /^cache hit \((direct|preprocessed)\)/ {hits += $NF}
+        /^cache miss/ {misses += $NF}
+        /^cache size/ {size = $(NF - 1) * unit[$NF] / 1024}
+        END {printf "%d %d %d\n", hits, misses, size}'
+}
+
+# Usage: ccache_report "<counters before>" - prints the hit/miss delta of this build
+ccache_report() {
+    [ -n "$CCACHE_BIN" ] || return 0
+    local before_hits before_misses after_hits after_misses size hits misses rate=0
+    read -r before_hits before_misses _ <<< "$1"
+    read -r after_hits after_misses size <<< "$(ccache_counters)"
+    hits=$((after_hits - before_hits))
+    misses=$((after_misses - before_misses))
+    [ $((hits + misses)) -gt 0 ] && rate=$((100 * hits / (hits + misses)))
+    print_info "[CCACHE] hits=$hits misses=$misses hit_rate=${rate}% size_mb=$((size / 1024)) dir=$CCACHE_DIR"
+    emit_event ccache "#hits" "$hits" "#misses" "$misses" "#hit_rate" "$rate" "#size_mb" $((size / 1024)) dir "$CCACHE_DIR"
+}
+
+# The tcsh prefix every tree command runs after: tree environment, then the compiler cache
+tree_setup_command() {
+    local setup="source ME.Develop/BuildSys/TreeConfig.sh"
+    if [ -n "$CCACHE_BIN" ]; then
+        setup="$setup && setenv PATH $CCACHE_BIN:\$PATH"
+    fi
+    echo "$setup"
+}
+
+# ============================================================================
+# Tree environment snapshot
+# ============================================================================
+# Sourcing TreeConfig.sh in a fresh tcsh for every command is slow. What it
+# changes in the environment is captured once per tree into
+# $ENV_PATH/.tree_env_cache/<key>.env, keyed on the BuildSys scripts, APP_ROOT
+# and ENV_PATH, and later commands run with those changes applied to their own
+# environment. Only the difference is stored, NUL separated, so the session
+# of whoever captured it (HOME, USER, SSH_AUTH_SOCK, ...) is never replayed:
+#   NAME=value               set by TreeConfig.sh
+#   -NAME                    unset by TreeConfig.sh
+#   +NAME=prefix<RS>suffix   wrapped around the caller's value (PATH-like lists)
+# Set TREE_ENV_CACHE=false to source TreeConfig.sh for every command instead.
+TREE_ENV_KEY=""
+TREE_ENV=()
+TREE_ENV_SET=()
+TREE_ENV_UNSET=()
+TREE_ENV_PATH=""
+TREE_ENV_SKIP=" _ PWD OLDPWD SHLVL "
+CCACHE_VARS=(CCACHE_DIR CCACHE_BASEDIR CCACHE_NOHASHDIR CCACHE_UMASK)
+
+tree_env_key() {
+    # Byte order for the glob
+    local LC_ALL=C
+    {
+        cat "$ENV_PATH"/ME.Develop/BuildSys/*.sh 2>/dev/null | sha1sum
+        echo "$APP_ROOT"
+        echo "$ENV_PATH"
+        echo "diff"
+    } | sha1sum | cut -c1-16
+}
+
+# Usage: tree_env_diff <before> <after> - prints the snapshot records (see above)
+tree_env_diff() {
+    local -A before=() seen=()
+    local entry name value old
+    while IFS= read -r -d '' entry; do
+        before["${entry%%=*}"]="${entry#*=}"
+    done < "$1"
+    while IFS= read -r -d '' entry; do
+        name=${entry%%=*}
+        value=${entry#*=}
+        seen["$name"]=1
+        [[ "$TREE_ENV_SKIP" == *" $name "* ]] && continue
+        if [[ -v before["$name"] ]]; then
+            old=${before["$name"]}
+            [ "$value" = "$old" ] && continue
+            if [ -n "$old" ] && [[ "$value" == *"$old"* ]]; then
+                printf '+%s=%s\x1e%s\0' "$name" "${value%%"$old"*}" "${value#*"$old"}"
+                continue
+            fi
+        fi
+        printf '%s\0' "$entry"
+    done < "$2"
+    for name in "${!before[@]}"; do
+        [[ -v seen["$name"] || "$TREE_ENV_SKIP" == *" $name "* ]] || printf -- '-%s\0' "$name"
+    done
+}
+
+tree_env_load() {
+    [ "${TREE_ENV_CACHE:-true}" = true ] || return 1
+    local key
+    key=$(tree_env_key)
+    if [ "$key" != "$TREE_ENV_KEY" ]; then
+        local cache_dir="$ENV_PATH/.tree_env_cache"
+        local snapshot="$cache_dir/$key.env"
+        if [ -f "$snapshot" ]; then
+            print_info "Using cached tree environment (key $key)"
+        else
+            print_info "Capturing tree environment from TreeConfig.sh (key $key)..."
+            mkdir -p "$cache_dir"
+            local tmp="$snapshot.$$" unset_ccache=() var
+            for var in "${CCACHE_VARS[@]}"; do
+                unset_ccache+=(-u "$var")
+            done
+            if ! (cd "$ENV_PATH" && env "${unset_ccache[@]}" tcsh -c \
+                    "env -0 > \"$tmp.before\" && source ME.Develop/BuildSys/TreeConfig.sh > /dev/null && env -0 > \"$tmp.after\"") \
+                || [ ! -s "$tmp.after" ] || ! tree_env_diff "$tmp.before" "$tmp.after" > "$tmp"; then
+                rm -f "$tmp" "$tmp.before" "$tmp.after"
+                print_warning "Could not capture the tree environment, sourcing TreeConfig.sh for every command"
+                TREE_ENV_CACHE=false
+                return 1
+            fi
+            rm -f "$tmp.before" "$tmp.after"
+            mv "$tmp" "$snapshot"
+            # Keep the five most recent snapshots
+            ls -1t "$cache_dir"/*.env | tail -n +6 | xargs -r rm -f
+        fi
+        mapfile -d '' TREE_ENV < "$snapshot"
+        TREE_ENV_KEY="$key"
+    fi
+
+    # Applied to this run's environment every time
+    TREE_ENV_SET=()
+    TREE_ENV_UNSET=()
+    TREE_ENV_PATH="$PATH"
+    local entry name value
+    for entry in "${TREE_ENV[@]}"; do
+        case "$entry" in
+            -*)
+                TREE_ENV_UNSET+=(-u "${entry#-}")
+                continue
+                ;;
+            +*)
+                entry=${entry#+}
+                name=${entry%%=*}
+                value=${entry#*=}
+                value="${value%%$'\x1e'*}$(printenv "$name")${value#*$'\x1e'}"
+                ;;
+            *)
+                name=${entry%%=*}
+                value=${entry#*=}
+                ;;
+        esac
+        TREE_ENV_SET+=("$name=$value")
+        [ "$name" = PATH ] && TREE_ENV_PATH="$value"
+    done
+    return 0
+}
+
+# Usage: run_in_tree <command>
+# Runs a command from $ENV_PATH inside the tree environment. The command must be
+# valid for both bash (cached environment) and tcsh (TreeConfig.sh sourced).
+run_in_tree() {
+    local cmd="$1"
+    if tree_env_load; then
+        local overrides=() var
+        if [ -n "$CCACHE_BIN" ]; then
+            overrides+=("PATH=$CCACHE_BIN:$TREE_ENV_PATH")
+            for var in "${CCACHE_VARS[@]}"; do
+                overrides+=("$var=${!var}")
+            done
+        fi
+        print_command "$cmd"
+        env "${TREE_ENV_UNSET[@]}" "${TREE_ENV_SET[@]}" "${overrides[@]}" bash -c "$cmd"
+    else
+        local setup
+        setup=$(tree_setup_command)
+        print_command "$setup && $cmd"
+        tcsh -c "$setup && $cmd"
+    fi
+}
+
+# ============================================================================
+# Artifact store on the setup
+# ============================================================================
+# With ARTIFACT_STORE=true packages are staged on the setup by content, in
+# $ARTIFACT_STORE_DIR/<package_hash> (relative to the setup user's home), and the
+# setup remembers which package hash was last deployed to and installed on each
+# AVPC. Deploy and install query that state first and skip the transfer and/or
+# the burn when the target already has the requested package. The package hash
+# comes from the BKC manifest written after generate.
+ARTIFACT_STORE_DIR=${ARTIFACT_STORE_DIR:-.bkc_store}
+ARTIFACT_STORE_KEEP=${ARTIFACT_STORE_KEEP:-3}
+STORE_PRESENT=false
+STORE_DEPLOYED=""
+STORE_INSTALLED=""
+
+# Usage: package_hash <bkc_dir> - prints the package_hash of its manifest
+# The manifest is refreshed first so files changed after generate are noticed;
+# unchanged files come from the hash cache, so this is cheap.
+package_hash() {
+    local manifest="$1.manifest"
+    python3 "$SCRIPT_DIR/bkc_manifest.py" "$1" > /dev/null || return 1
+    [ -f "$manifest" ] || return 1
+    head -n 1 "$manifest" | tr ' ' '\n' | sed -n 's/^package_hash=//p'
+}
+
+# ssh joins its arguments into one remote command line, quote them for the remote shell
+remote_args() {
+    printf '%q ' "$@"
+}
+
+# Usage: artifact_status [package_hash]
+# Prints "present=<0|1>", "deployed=<hash>" and "installed=<hash>" for this AVPC
+artifact_status() {
+    ssh "${SSH_OPTS[@]}" "$SETUP_NAME" "bash -s -- $(remote_args "$ARTIFACT_STORE_DIR" "$AVPC_IP" "$1")" << 'EOF'
+store="$1"; state="$1/state/$2"
+if [ -n "$3" ] && [ -f "$store/$3.complete" ]; then echo "present=1"; else echo "present=0"; fi
+echo "deployed=$(cat "$state.deployed" 2>/dev/null)"
+echo "installed=$(cat "$state.installed" 2>/dev/null)"
+EOF
+}
+
+# Usage: artifact_status_capture [package_hash] - artifact_status into ARTIFACT_STATUS
+# The retry loop runs outside the substitution, so its messages reach the console
+# instead of being parsed as status lines
+artifact_status_capture() {
+    ARTIFACT_STATUS=$(artifact_status "$1")
+}
+
+# Usage: artifact_query [package_hash] - sets STORE_PRESENT/STORE_DEPLOYED/STORE_INSTALLED
+artifact_query() {
+    STORE_PRESENT=false
+    STORE_DEPLOYED=""
+    STORE_INSTALLED=""
+    local output key value
+    ARTIFACT_STATUS=""
+    run_with_retry "Status" artifact_status_capture "$1" || return 1
+    output=$ARTIFACT_STATUS
+    while IFS='=' read -r key value; do
+        case "$key" in
+            present) [ "$value" = 1 ] && STORE_PRESENT=true ;;
+            deployed) STORE_DEPLOYED="$value" ;;
+            installed) STORE_INSTALLED="$value" ;;
+        esac
+    done <<< "$output"
+    print_info "Artifact store: ${1:+package ${1:0:12} present=$STORE_PRESENT }deployed=${STORE_DEPLOYED:0:12} installed=${STORE_INSTALLED:0:12}"
+}
+
+# Usage: artifact_mark <deployed|installed> <package_hash>
+# An empty hash clears the record (state unknown, e.g. no manifest)
+artifact_mark() {
+    ssh "${SSH_OPTS[@]}" "$SETUP_NAME" "bash -s -- $(remote_args "$ARTIFACT_STORE_DIR" "$AVPC_IP" "$1" "$2")" << 'EOF'
+mkdir -p "$1/state" && echo "$4" > "$1/state/$2.$3"
+EOF
+}
+
+# Usage: artifact_commit <package_hash>
+# Marks a staged package complete and drops the oldest packages beyond
+# ARTIFACT_STORE_KEEP, never one that is currently deployed to an AVPC.
+artifact_commit() {
+    ssh "${SSH_OPTS[@]}" "$SETUP_NAME" "bash -s -- $(remote_args "$ARTIFACT_STORE_DIR" "$1" "$ARTIFACT_STORE_KEEP")" << 'EOF'
+cd "$1" || exit 1
+touch "$2.complete"
+deployed=" $(cat state/*.deployed 2>/dev/null | tr '\n' ' ') "
+ls -1t -- *.complete | tail -n +$(($3 + 1)) | while read -r marker; do
+    hash="${marker%.complete}"
+    case "$deployed" in *" $hash "*) continue ;; esac
+    rm -rf -- "$hash" "$marker"
+done
+EOF
+}
+
 # ============================================================================
 # Step 1: Update APP_ROOT
 # ============================================================================
+# Usage: edit_tree_file <file> <sed script>
+# Applies the sed script only when it changes the file: an already correct
+# file is left alone (no backup, no rewrite, checkpoint hashes unchanged).
+# A change is printed as a unified diff, the previous version is kept as
+# <file>.backup.<timestamp> and only the newest UPDATE_BACKUP_KEEP backups
+# are retained (0 keeps none). Returns 0 when changed, 3 when up to date.
+edit_tree_file() {
+    local file="$1" script="$2" name tmp keep=${UPDATE_BACKUP_KEEP:-5}
+    name=$(basename "$file")
+    tmp=$(mktemp "${file}.XXXXXX")
+    if ! sed "$script" "$file" > "$tmp"; then
+        rm -f "$tmp"
+        print_error "Could not edit $name"
+        return 1
+    fi
+    if cmp -s "$file" "$tmp"; then
+        rm -f "$tmp"
+        return 3
+    fi
+    diff -u --label "a/$name" --label "b/$name" "$file" "$tmp" || true
+    if [ "$keep" -gt 0 ]; then
+        cp -p "$file" "${file}.backup.$(date +%Y%m%d_%H%M%S)"
+        ls -1t "${file}".backup.* 2>/dev/null | tail -n +$((keep + 1)) | xargs -r rm -f
+    fi
+    # Rewrite in place so permissions and links of the tree file stay as they are
+    cat "$tmp" > "$file"
+    rm -f "$tmp"
+    print_info "Modified file: $file"
+}
+
 update_app_root() {
     print_step "STEP 1: Updating APP_ROOT in AppConfig.sh"
     
     local appconfig_path="$ENV_PATH/ME.Develop/BuildSys/AppConfig.sh"
     local epgconfig_path="$ENV_PATH/ME.Develop/BuildSys/EpgConfig.sh"
+    local status
     
     if [ ! -f "$appconfig_path" ]; then
         print_error "AppConfig.sh not found at: $appconfig_path"
         return 1
     fi
+    if ! grep -q "setenv APP_ROOT " "$appconfig_path"; then
+        print_warning "No 'setenv APP_ROOT' line in $appconfig_path, nothing to update"
+    fi
     
-    # Backup the original file
-    cp "$appconfig_path" "${appconfig_path}.backup.$(date +%Y%m%d_%H%M%S)"
-    print_info "Created backup of AppConfig.sh"
-    
-    # Update APP_ROOT using sed
-    sed -i "s|setenv APP_ROOT .*|setenv APP_ROOT $APP_ROOT|g" "$appconfig_path"
-    
-    print_success "APP_ROOT updated to: $APP_ROOT"
-    print_info "Modified file: $appconfig_path"
-    echo ""
-    print_info "Content of modified AppConfig.sh:"
-    echo "----------------------------------------"
-    cat "$appconfig_path"
-    echo "----------------------------------------"
-    echo ""
+    # Update APP_ROOT
+    status=0
+    edit_tree_file "$appconfig_path" "s|setenv APP_ROOT .*|setenv APP_ROOT $APP_ROOT|g" || status=$?
+    case $status in
+        0) print_success "APP_ROOT updated to: $APP_ROOT" ;;
+        3) print_success "APP_ROOT already set to: $APP_ROOT (AppConfig.sh unchanged)" ;;
+        *) return 1 ;;
+    esac
     
     # Delete comments from EpgConfig.sh
     if [ -f "$epgconfig_path" ]; then
-        print_info "Removing comments from EpgConfig.sh..."
-        cp "$epgconfig_path" "${epgconfig_path}.backup.$(date +%Y%m%d_%H%M%S)"
-        print_info "Created backup of EpgConfig.sh"
-        
-        # Remove lines starting with # (comments)
-        sed -i '/^[[:space:]]*#/d' "$epgconfig_path"
-        
-        print_success "Comments removed from EpgConfig.sh"
-        print_info "Modified file: $epgconfig_path"
-        echo ""
-        print_info "Content of modified EpgConfig.sh:"
-        echo "----------------------------------------"
-        cat "$epgconfig_path"
-        echo "----------------------------------------"
-        echo ""
+        status=0
+        edit_tree_file "$epgconfig_path" '/^[[:space:]]*#/d' || status=$?
+        case $status in
+            0) print_success "Comments removed from EpgConfig.sh" ;;
+            3) print_success "EpgConfig.sh has no comments (unchanged)" ;;
+            *) return 1 ;;
+        esac
     else
         print_warning "EpgConfig.sh not found at: $epgconfig_path"
     fi
@@ -222,26 +958,124 @@ build_project() {
     
     cd "$ENV_PATH" || exit 1
     
-    print_info "Setting up build environment and running build in tcsh..."
+    print_info "Setting up build environment and running build..."
+    ccache_setup
+    local ccache_before
+    if [ -n "$CCACHE_BIN" ]; then
+        ccache_before=$(ccache_counters)
+    fi
     
     if [ "$BUILD_TYPE" = "HW" ]; then
         print_info "Building Hardware (HW)..."
         HW_APP=${HW_APP:-GPR_APP}
         print_info "HW app: $HW_APP"
-        print_command "source ME.Develop/BuildSys/TreeConfig.sh && cd ME.Develop/applications/CV && ./wake -m r --rev 6 ht Grab --cvapp $HW_APP"
-        tcsh -c "source ME.Develop/BuildSys/TreeConfig.sh && cd ME.Develop/applications/CV && ./wake -m r --rev 6 ht Grab --cvapp $HW_APP"
+        run_in_tree "cd ME.Develop/applications/CV && ./wake -m r --rev 6 ht Grab --cvapp $HW_APP" || {
+            print_error "wake build failed"
+            return 1
+        }
     elif [ "$BUILD_TYPE" = "SW" ]; then
         print_info "Building Software (SW)..."
-        print_command "source ME.Develop/BuildSys/TreeConfig.sh && cd ME.Develop/applications/CV && ./wake -m d --rev 6 st Grab"
-        tcsh -c "source ME.Develop/BuildSys/TreeConfig.sh && cd ME.Develop/applications/CV && ./wake -m d --rev 6 st Grab"
+        run_in_tree "cd ME.Develop/applications/CV && ./wake -m d --rev 6 st Grab" || {
+            print_error "wake build failed"
+            return 1
+        }
     else
         print_error "Invalid BUILD_TYPE: $BUILD_TYPE (must be HW or SW)"
         return 1
     fi
     
+    ccache_report "$ccache_before"
     print_success "Build completed successfully"
 }
 
+# ============================================================================
+# Step 2 (matrix): Build every BUILD_MATRIX variant
+# ============================================================================
+# BUILD_MATRIX lists cells as BUILD_TYPE[:HW_APP], e.g. "HW:GPR_APP HW:CV_BPP SW".
+# Cells share the tree, so with MATRIX_JOBS=1 (default) later cells reuse the
+# incremental build state of earlier ones; higher values build cells in parallel.
+format_duration() {
+    printf '%dm%02ds' $(( $1 / 60 )) $(( $1 % 60 ))
+}
+
+run_matrix_cell() {
+    local idx="$1" cell="$2" report_dir="$3"
+    local cell_type="${cell%%:*}" cell_app=""
+    [ "$cell" != "$cell_type" ] && cell_app="${cell#*:}"
+    local start status
+    start=$(date +%s)
+    (
+        BUILD_TYPE="$cell_type"
+        [ -n "$cell_app" ] && HW_APP="$cell_app"
+        build_project
+    ) 2>&1 | tee "$report_dir/cell_$idx.log" | sed -u "s|^|[$cell] |"
+    status=${PIPESTATUS[0]}
+    echo "$cell $status $(( $(date +%s) - start ))" > "$report_dir/cell_$idx.result"
+}
+
+build_matrix() {
+    local cells=($BUILD_MATRIX)
+    local jobs=${MATRIX_JOBS:-1}
+    local report_dir="$ENV_PATH/.matrix"
+    print_step "STEP 2: Building Matrix (${#cells[@]} cells, $jobs in parallel)"
+
+    rm -rf "$report_dir"
+    mkdir -p "$report_dir"
+    # Capture the tree environment once, before the cells fork
+    tree_env_load || true
+
+    local start idx=0 cell
+    start=$(date +%s)
+    for cell in "${cells[@]}"; do
+        while [ "$(jobs -rp | wc -l)" -ge "$jobs" ]; do
+            wait -n || true
+        done
+        print_info "Starting matrix cell $cell"
+        run_matrix_cell "$idx" "$cell" "$report_dir" &
+        idx=$((idx + 1))
+    done
+    wait || true
+    local total=$(( $(date +%s) - start ))
+
+    # Aggregated report: printed, and written as JSON for the web GUI
+    local failed=0 name status duration result json_cells=""
+    print_step "BUILD MATRIX REPORT"
+    printf '%-24s %-8s %s\n' "CELL" "RESULT" "DURATION"
+    for ((idx = 0; idx < ${#cells[@]}; idx++)); do
+        if [ -f "$report_dir/cell_$idx.result" ]; then
+            read -r name status duration < "$report_dir/cell_$idx.result"
+        else
+            name="${cells[$idx]}"; status=1; duration=0
+        fi
+        if [ "$status" -eq 0 ]; then
+            result="PASS"
+        else
+            result="FAIL"
+            failed=$((failed + 1))
+        fi
+        printf '%-24s %-8s %s\n' "$name" "$result" "$(format_duration "$duration")"
+        json_cells="${json_cells:+$json_cells,}{\"cell\": \"$(json_escape "$name")\", \"result\": \"$result\", \"exit_code\": $status, \"duration_sec\": $duration, \"log\": \"$(json_escape "$report_dir/cell_$idx.log")\"}"
+    done
+    printf '%-24s %-8s %s\n' "TOTAL" "$(( ${#cells[@]} - failed ))/${#cells[@]}" "$(format_duration "$total")"
+    echo "{\"finished_at\": $(date +%s), \"duration_sec\": $total, \"parallel\": $jobs, \"failed\": $failed, \"cells\": [$json_cells]}" > "$ENV_PATH/.matrix_report.json"
+    print_info "Matrix report: $ENV_PATH/.matrix_report.json"
+    emit_event artifact kind matrix_report path "$ENV_PATH/.matrix_report.json"
+
+    if [ "$failed" -gt 0 ]; then
+        print_error "$failed of ${#cells[@]} matrix cells failed"
+        return 1
+    fi
+    print_success "All ${#cells[@]} matrix cells built successfully"
+}
+
+build_step() {
+    if [ "$BUILD_MODE" = "matrix" ]; then
+        build_matrix
+    else
+        build_project
+    fi
+}
+
 # ============================================================================
 # Step 3: Generate Deployment Package
 # ============================================================================
@@ -263,11 +1097,10 @@ generate_package() {
     
     print_info "Output path: $output_path"
     
-    print_info "Setting up build environment and running generator in tcsh..."
-    print_command "source ME.Develop/BuildSys/TreeConfig.sh && cd ME.Develop/deployment && ./generator.sh -p \"${PROJECT_NAME}_DC\" -o \"$output_path\" -m MOD_IC_EEPROM_DISABLE"
+    print_info "Setting up build environment and running generator..."
     
-    # Run generator in tcsh with environment setup
-    tcsh -c "source ME.Develop/BuildSys/TreeConfig.sh && cd ME.Develop/deployment && ./generator.sh -p \"${PROJECT_NAME}_DC\" -o \"$output_path\" -m MOD_IC_EEPROM_DISABLE"
+    # Run generator with the tree environment
+    run_in_tree "cd ME.Develop/deployment && ./generator.sh -p \"${PROJECT_NAME}_DC\" -o \"$output_path\" -m MOD_IC_EEPROM_DISABLE"
     
     # Check if command succeeded
     if [ $? -ne 0 ]; then
@@ -285,6 +1118,17 @@ generate_package() {
     echo "$output_path/bkc" > "$ENV_PATH/.last_bkc_path"
     
     print_success "Package generated at: $output_path"
+    emit_event artifact kind bkc path "$output_path/bkc"
+    
+    # Hash the package in parallel and write $output_path/bkc.manifest
+    if [ "${BKC_MANIFEST:-true}" = true ] && [ -d "$output_path/bkc" ]; then
+        print_info "Writing BKC manifest..."
+        if python3 "$SCRIPT_DIR/bkc_manifest.py" "$output_path/bkc" ${BKC_MANIFEST_JOBS:+-j "$BKC_MANIFEST_JOBS"}; then
+            emit_event artifact kind manifest path "$output_path/bkc.manifest"
+        else
+            print_warning "Could not write BKC manifest for $output_path/bkc"
+        fi
+    fi
 }
 
 # ============================================================================
@@ -315,15 +1159,114 @@ deploy_to_setup() {
     print_info "BKC path: $bkc_path"
     print_info "Connecting to setup: $SETUP_NAME"
     
+    if [ "${ARTIFACT_STORE:-false}" = true ]; then
+        deploy_from_store "$bkc_path"
+        return $?
+    fi
+    
+    # Optionally stream the BKC to the setup instead of relying on a shared path
+    if [ "${DEPLOY_STREAM:-false}" = true ]; then
+        local remote_dir="${DEPLOY_REMOTE_DIR:-/tmp/bkc_deploy}/$(basename "$(dirname "$bkc_path")")"
+        run_with_retry "Transfer" stream_bkc "$bkc_path" "$remote_dir" || return $?
+        bkc_path="$remote_dir"
+    fi
+    
     # SSH to setup and run deploy
     print_command "ssh $SETUP_NAME"
-    ssh "$SETUP_NAME" << EOF
-cd "$bkc_path" || exit 1
+    run_with_retry "Deploy" deploy_remote "$bkc_path" || return $?
+    
+    print_success "Deployment completed"
+}
+
+# Deploy through the artifact store: the package is streamed into the store
+# unless already staged, and deploy.py is skipped when the AVPC already has it
+deploy_from_store() {
+    local bkc_path="$1" hash remote_dir force="${ARTIFACT_STORE_FORCE:-false}"
+    hash=$(package_hash "$bkc_path") || hash=""
+    if [ -z "$hash" ]; then
+        print_warning "No package hash for $bkc_path, staging it outside the artifact store"
+        remote_dir="${DEPLOY_REMOTE_DIR:-/tmp/bkc_deploy}/$(basename "$(dirname "$bkc_path")")"
+    else
+        remote_dir="$ARTIFACT_STORE_DIR/$hash"
+        artifact_query "$hash" || print_warning "Artifact store status unavailable, deploying unconditionally"
+        if [ "$force" != true ] && [ "$STORE_DEPLOYED" = "$hash" ]; then
+            print_success "AVPC $AVPC_IP already has package ${hash:0:12}, skipping deploy"
+            return 0
+        fi
+    fi
+    
+    if [ -n "$hash" ] && [ "$STORE_PRESENT" = true ] && [ "$force" != true ]; then
+        print_info "Package ${hash:0:12} already staged on $SETUP_NAME, skipping transfer"
+    else
+        run_with_retry "Transfer" stream_bkc "$bkc_path" "$remote_dir" || return $?
+        if [ -n "$hash" ]; then
+            run_with_retry "Transfer" artifact_commit "$hash" || return $?
+        fi
+    fi
+    
+    # Clear the record while deploy.py runs: a failed deploy leaves the AVPC in an unknown state
+    artifact_mark deployed "" || print_warning "Could not update the artifact store state on $SETUP_NAME"
+    print_command "ssh $SETUP_NAME"
+    run_with_retry "Deploy" deploy_remote "$remote_dir" || return $?
+    if [ -n "$hash" ]; then
+        artifact_mark deployed "$hash" || print_warning "Could not record the deployed package on $SETUP_NAME"
+    fi
+    
+    print_success "Deployment completed${hash:+ (package ${hash:0:12})}"
+}
+
+# Usage: stream_bkc <bkc_dir> <remote_dir>
+# Sends the BKC as one tar stream compressed with multi-threaded zstd over a
+# single SSH channel and unpacks it on the fly; no archive is written on either side.
+stream_bkc() {
+    local bkc_dir="$1" remote_dir="$2"
+    local level=${DEPLOY_STREAM_LEVEL:-3} threads=${DEPLOY_STREAM_THREADS:-0}
+    local count_file raw_bytes start status
+
+    if ! command -v zstd > /dev/null; then
+        print_error "DEPLOY_STREAM=true but zstd is not installed locally"
+        return 1
+    fi
+    raw_bytes=$(du -sb "$bkc_dir" | cut -f1)
+    count_file=$(mktemp)
+    print_info "Streaming BKC ($((raw_bytes / 1024 / 1024)) MB) to $SETUP_NAME:$remote_dir (zstd -$level -T$threads)"
+    print_command "tar -C $bkc_dir -cf - . | zstd -$level -T$threads | ssh $SETUP_NAME 'zstd -dc | tar -xf - -C $remote_dir'"
+
+    start=$(date +%s.%N)
+    (
+        set -o pipefail
+        tar -C "$bkc_dir" -cf - . \
+            | zstd -q -"$level" -T"$threads" -c \
+            | tee >(wc -c > "$count_file") \
+            | ssh "${SSH_OPTS[@]}" "$SETUP_NAME" \
+                "rm -rf '$remote_dir' && mkdir -p '$remote_dir' && zstd -q -dc | tar -xf - -C '$remote_dir'"
+    )
+    status=$?
+    local end compressed_bytes
+    end=$(date +%s.%N)
+    # The byte counter runs in a process substitution, give it a moment to flush
+    for _ in 1 2 3 4 5 6 7 8 9 10; do
+        [ -s "$count_file" ] && break
+        sleep 0.2
+    done
+    compressed_bytes=$(cat "$count_file" 2>/dev/null)
+    rm -f "$count_file"
+    [ "$status" -eq 0 ] || return "$status"
+
+    awk -v raw="$raw_bytes" -v comp="${compressed_bytes:-0}" -v start="$start" -v end="$end" 'BEGIN {
+        t = end - start
+        if (t <= 0) t = 0.001
+        printf "[TRANSFER] raw=%.1fMB compressed=%.1fMB ratio=%.2f throughput=%.1fMB/s link=%.1fMB/s time=%.1fs\n",
+            raw / 1048576, comp / 1048576, (comp > 0 ? raw / comp : 0), raw / 1048576 / t, comp / 1048576 / t, t
+    }' | while read -r line; do print_info "$line"; done
+}
+
+deploy_remote() {
+    ssh "${SSH_OPTS[@]}" "$SETUP_NAME" << EOF
+cd "$1" || exit 1
 echo -e "${MAGENTA}[COMMAND]${NC} ./INSTALLER/deploy.py --avpc $AVPC_IP -p $AVPC_PASSWORD"
 ./INSTALLER/deploy.py --avpc $AVPC_IP -p $AVPC_PASSWORD
 EOF
-    
-    print_success "Deployment completed"
 }
 
 # ============================================================================
@@ -338,21 +1281,257 @@ install_on_setup() {
     fi
     
     print_info "Connecting to setup: $SETUP_NAME"
+    
+    # The package on the AVPC is the one last deployed there; skip the burn if it is already installed
+    local store_ok=false
+    if [ "${ARTIFACT_STORE:-false}" = true ]; then
+        if artifact_query; then
+            store_ok=true
+            if [ "${ARTIFACT_STORE_FORCE:-false}" != true ] && [ -n "$STORE_DEPLOYED" ] && [ "$STORE_INSTALLED" = "$STORE_DEPLOYED" ]; then
+                print_success "AVPC $AVPC_IP already runs package ${STORE_DEPLOYED:0:12}, skipping install"
+                return 0
+            fi
+        else
+            print_warning "Artifact store status unavailable, installing unconditionally"
+        fi
+    fi
+    
     print_info "Installing on AVPC..."
     
-    # SSH to setup, then SSH to AVPC and run installer
-    print_command "ssh $SETUP_NAME"
-    ssh "$SETUP_NAME" << EOF
+    if [ "${INSTALL_DETACHED:-false}" = true ]; then
+        install_detached || return $?
+    else
+        # SSH to setup, then SSH to AVPC and run installer
+        print_command "ssh $SETUP_NAME"
+        run_with_retry "Install" install_remote || return $?
+    fi
+    if [ "$store_ok" = true ]; then
+        artifact_mark installed "$STORE_DEPLOYED" || print_warning "Could not record the installed package on $SETUP_NAME"
+    fi
+    
+    print_success "Installation completed"
+}
+
+# The AVPC prints INSTALL_STARTED_MARK right before installer.sh. A connection
+# lost after it is not retried: the burn may still be running on the AVPC and
+# a second installer.sh would interrupt it. INSTALL_DETACHED=true follows a
+# running burn instead.
+INSTALL_STARTED_MARK="@@BKC_INSTALL_STARTED"
+
+# Usage: ... | install_watch - passes the output on without the start mark,
+# returns 0 when the mark was seen
+install_watch() {
+    local line started=1
+    while IFS= read -r line || [ -n "$line" ]; do
+        if [ "$line" = "$INSTALL_STARTED_MARK" ]; then
+            started=0
+        else
+            printf '%s\n' "$line"
+        fi
+    done
+    return $started
+}
+
+install_remote() {
+    local codes
+    ssh "${SSH_OPTS[@]}" "$SETUP_NAME" << EOF | install_watch
 echo -e "${MAGENTA}[COMMAND]${NC} sshpass -p \"****\" ssh avpc@$AVPC_IP"
-sshpass -p "$AVPC_PASSWORD" ssh avpc@$AVPC_IP << 'INNER_EOF'
+sshpass -p "$AVPC_PASSWORD" ssh -o ConnectTimeout=$SSH_CONNECT_TIMEOUT avpc@$AVPC_IP << 'INNER_EOF'
 echo -e "${MAGENTA}[COMMAND]${NC} cd zeroconfig/bkc"
 cd zeroconfig/bkc || exit 1
+echo "$INSTALL_STARTED_MARK"
 echo -e "${MAGENTA}[COMMAND]${NC} ./installer.sh --burncode -e mcue switch"
 ./installer.sh --burncode -e mcue switch
 INNER_EOF
 EOF
-    
-    print_success "Installation completed"
+    codes=("${PIPESTATUS[@]}")
+    if [ "${codes[0]}" -ne 0 ] && [ "${codes[1]}" -eq 0 ] && is_retryable "${codes[0]}"; then
+        print_error "Connection lost (exit code ${codes[0]}) after installer.sh started on $AVPC_IP, not retrying while the burn may still run; check the AVPC before installing again"
+        return 1
+    fi
+    return "${codes[0]}"
+}
+
+# ============================================================================
+# Detached install
+# ============================================================================
+# With INSTALL_DETACHED=true the installer runs detached on the AVPC (nohup,
+# output to ~/$INSTALL_REMOTE_DIR/<run>.log) instead of inside the nested SSH
+# sessions, so a dropped connection no longer loses its output or the burn.
+# The log is followed over pooled connections: a ControlMaster to the setup
+# and one from the setup to the AVPC. When a connection drops, the tail
+# reconnects and resumes at the byte it stopped at, for up to
+# INSTALL_RECONNECT_SEC. The AVPC's system log is captured in parallel the
+# same way. Both are kept in $INSTALL_LOG_DIR (newest INSTALL_LOG_KEEP runs).
+INSTALL_EXIT_MARK="@@BKC_INSTALL_EXIT"
+INSTALL_CONNECTED_MARK="@@BKC_INSTALL_CONNECTED"
+
+install_pool_opts() {
+    local control_dir="/tmp/bkc_install_$(id -u)"
+    mkdir -p -m 700 "$control_dir"
+    INSTALL_POOL_OPTS=(-o ControlMaster=auto -o ControlPath="$control_dir/%C" -o ControlPersist=120)
+}
+
+# Usage: avpc_ssh [args...] < script
+# Runs a bash script on the AVPC through the setup over the pooled connections.
+# The password goes to sshpass over stdin, ahead of the script, not on a command line.
+avpc_ssh() {
+    local inner="bash -s -- $(remote_args "$@")"
+    local hop="read -r SSHPASS; export SSHPASS; exec sshpass -e ssh -o ConnectTimeout=$SSH_CONNECT_TIMEOUT"
+    hop+=" -o ServerAliveInterval=15 -o ServerAliveCountMax=4 -o ControlMaster=auto"
+    hop+=" -o 'ControlPath=/tmp/bkc_avpc_%C' -o ControlPersist=120 avpc@$AVPC_IP $(remote_args "$inner")"
+    { printf '%s\n' "$AVPC_PASSWORD"; cat; } | ssh "${SSH_OPTS[@]}" "${INSTALL_POOL_OPTS[@]}" "$SETUP_NAME" "$hop"
+}
+
+# Usage: install_start <remote_dir> <run> <syslog true|false>
+# Starts the installer detached and sets INSTALL_RUN to the run it belongs to. A burn
+# still running (a retried start whose connection dropped, or another
+# client) is attached to instead of starting a second one.
+install_start() {
+    INSTALL_RUN=$(avpc_ssh "$@" << 'EOF'
+dir="$1"; run="$2"; syslog="$3"
+case "$dir" in /*) ;; *) dir="$HOME/$dir" ;; esac
+mkdir -p "$dir" || exit 1
+if [ -f "$dir/current" ]; then
+    read -r current pid < "$dir/current"
+    if [ ! -f "$dir/$current.rc" ] && kill -0 "$pid" 2>/dev/null; then
+        echo "$current"
+        exit 0
+    fi
+fi
+cd zeroconfig/bkc || exit 1
+nohup bash -c '
+    base="$1"
+    if [ "$2" = true ]; then
+        if command -v journalctl > /dev/null; then
+            journalctl -f -n 0 -o short-precise > "$base.syslog" 2>&1 &
+        else
+            tail -n 0 -F /var/log/syslog /var/log/messages > "$base.syslog" 2>/dev/null &
+        fi
+        syslog_pid=$!
+    fi
+    # Line-buffer the installer so the log follows it closely
+    $(command -v stdbuf > /dev/null && echo stdbuf -oL -eL) ./installer.sh --burncode -e mcue switch > "$base.log" 2>&1
+    rc=$?
+    [ -n "$syslog_pid" ] && { sleep 2; kill "$syslog_pid"; }
+    echo "$rc" > "$base.rc"
+' bkc-install "$dir/$run" "$syslog" > /dev/null 2>&1 < /dev/null &
+echo "$run $!" > "$dir/current"
+echo "$run"
+EOF
+)
+}
+
+# Usage: install_tail_session <file> <offset> <rc_file>
+# Streams <file> from byte <offset> until the run's exit code exists; stderr
+# carries the connected mark and, at the end, "<exit mark> <rc> <size>".
+install_tail_session() {
+    avpc_ssh "$1" "$2" "$3" "$INSTALL_CONNECTED_MARK" "$INSTALL_EXIT_MARK" << 'EOF'
+file="$1"; offset="$2"; rc_file="$3"
+cd "$HOME" || exit 1
+echo "$4" >&2
+if [ ! -f "$rc_file" ]; then
+    tail -c +$((offset + 1)) -F "$file" 2> /dev/null &
+    tail_pid=$!
+    trap 'kill $tail_pid 2> /dev/null' EXIT
+    trap 'exit 1' HUP TERM PIPE
+    while [ ! -f "$rc_file" ]; do sleep 1; done
+    # The caller fetches whatever tail had not printed yet, by size
+    sleep 1
+    kill $tail_pid 2> /dev/null
+    wait $tail_pid 2> /dev/null
+    offset=-1
+fi
+size=$(stat -c %s "$file" 2> /dev/null || echo 0)
+[ "$offset" -ge 0 ] && tail -c +$((offset + 1)) "$file" 2> /dev/null
+echo "$5 $(cat "$rc_file") $size" >&2
+EOF
+}
+
+# Usage: install_follow <remote_file> <rc_file> <local_file> <echo true|false>
+# Follows a remote log into a local file (and stdout) across reconnects,
+# resuming at the byte it stopped at. Returns the run's exit code.
+install_follow() {
+    local remote="$1" rc_file="$2" local_file="$3" echo_lines="$4"
+    local LC_ALL=C offset=0 status_file line mark rc size delay=2 contact
+    status_file=$(mktemp)
+    contact=$(date +%s)
+    : > "$local_file"
+    while true; do
+        # LC_ALL=C: lengths count bytes, so the offset matches the remote file
+        while true; do
+            if IFS= read -r line; then
+                offset=$((offset + ${#line} + 1))
+                printf '%s\n' "$line" >&3
+            elif [ -n "$line" ]; then
+                # A line cut by the connection: the next session continues it
+                offset=$((offset + ${#line}))
+                printf '%s' "$line" >&3
+            else
+                break
+            fi
+            [ "$echo_lines" = true ] && printf '%s\n' "$line"
+        done 3>> "$local_file" < <(install_tail_session "$remote" "$offset" "$rc_file" 2> "$status_file")
+        if grep -q "^$INSTALL_CONNECTED_MARK" "$status_file"; then
+            contact=$(date +%s)
+            delay=2
+        fi
+        read -r mark rc size < <(grep "^$INSTALL_EXIT_MARK" "$status_file")
+        if [ -n "$mark" ] && [ "$offset" -ge "$size" ]; then
+            rm -f "$status_file"
+            return "$rc"
+        fi
+        if [ -n "$mark" ]; then
+            delay=0
+        elif [ $(( $(date +%s) - contact )) -ge "${INSTALL_RECONNECT_SEC:-600}" ]; then
+            [ "$echo_lines" = true ] && print_error "[INSTALL] No connection to the AVPC for ${INSTALL_RECONNECT_SEC:-600}s: $(grep -v '^@@' "$status_file" | tail -n 1)"
+            rm -f "$status_file"
+            return 255
+        elif [ "$echo_lines" = true ]; then
+            print_warning "[INSTALL] Connection lost at byte $offset of $(basename "$remote"), reconnecting in ${delay}s"
+        fi
+        sleep "$delay"
+        delay=$(( delay < 2 ? 2 : (delay * 2 > 30 ? 30 : delay * 2) ))
+    done
+}
+
+# Runs the installer detached and follows it; see the section comment
+install_detached() {
+    local remote_dir="${INSTALL_REMOTE_DIR:-bkc_install}" syslog="${INSTALL_SYSLOG:-true}"
+    local log_dir="${INSTALL_LOG_DIR:-$OUTPUT_BASE/$PROJECT_NAME/install_logs}" keep="${INSTALL_LOG_KEEP:-20}"
+    local run status syslog_pid old
+    mkdir -p "$log_dir" || return 1
+    install_pool_opts
+    run="install_$(date +%Y%m%d_%H%M%S)"
+    print_command "ssh $SETUP_NAME -> avpc@$AVPC_IP: nohup ./installer.sh --burncode -e mcue switch > ~/$remote_dir/$run.log"
+    run_with_retry "Install" install_start "$remote_dir" "$run" "$syslog" || return $?
+    if [ "$INSTALL_RUN" != "$run" ]; then
+        print_warning "An install is already running on $AVPC_IP ($INSTALL_RUN), following it instead of starting another"
+    fi
+    # Local copies are named after this invocation, a client attached to the same run has its own
+    print_info "[INSTALL] Following ~/$remote_dir/$INSTALL_RUN.log on $AVPC_IP (local copy: $log_dir/$run.log)"
+    emit_event artifact kind install_log path "$log_dir/$run.log"
+    if [ "$syslog" = true ]; then
+        install_follow "$remote_dir/$INSTALL_RUN.syslog" "$remote_dir/$INSTALL_RUN.rc" "$log_dir/$run.syslog" false &
+        syslog_pid=$!
+        emit_event artifact kind install_syslog path "$log_dir/$run.syslog"
+    fi
+    status=0
+    install_follow "$remote_dir/$INSTALL_RUN.log" "$remote_dir/$INSTALL_RUN.rc" "$log_dir/$run.log" true || status=$?
+    if [ -n "$syslog_pid" ]; then
+        # The system log ends with the run; only a lost connection leaves it waiting
+        [ "$status" -eq 255 ] && kill "$syslog_pid" 2> /dev/null
+        wait "$syslog_pid" 2> /dev/null
+    fi
+    ssh "${INSTALL_POOL_OPTS[@]}" -O exit "$SETUP_NAME" > /dev/null 2>&1
+
+    ls -1t "$log_dir"/install_*.log 2> /dev/null | tail -n +$((keep + 1)) | while read -r old; do
+        rm -f -- "$old" "${old%.log}.syslog"
+    done
+    if [ "$status" -ne 0 ]; then
+        print_error "Installer exited with code $status (log: $log_dir/$run.log)"
+    fi
+    return "$status"
 }
 
 # ============================================================================
@@ -360,34 +1539,58 @@ EOF
 # ============================================================================
 
 print_info "Starting automation script..."
+emit_event run_start options "$*" config "$CONFIG_FILE" env_path "$ENV_PATH" "#pid" $$
 echo ""
 
+RESUME_SKIPPING=true
+SKIPPED_STEPS=()
+if [ "$RESUME" = true ]; then
+    print_info "Resume mode: using checkpoints from $CHECKPOINT_FILE"
+fi
+
+tree_lock
+
 # Execute selected steps
 if [ "$DO_UPDATE" = true ]; then
-    update_app_root || { print_error "Update failed"; exit 1; }
+    run_step update update_app_root "Update"
 fi
 
 if [ "$DO_BUILD" = true ]; then
-    build_project || { print_error "Build failed"; exit 1; }
+    run_step build build_step "Build"
 fi
 
 if [ "$DO_GENERATE" = true ]; then
-    generate_package || { print_error "Generate failed"; exit 1; }
+    run_step generate generate_package "Generate"
 fi
 
 if [ "$DO_DEPLOY" = true ]; then
-    deploy_to_setup || { print_error "Deploy failed"; exit 1; }
+    run_step deploy deploy_to_setup "Deploy"
 fi
 
 if [ "$DO_INSTALL" = true ]; then
-    install_on_setup || { print_error "Install failed"; exit 1; }
+    run_step install install_on_setup "Install"
 fi
 
+summary_line() {
+    if is_skipped "$1"; then
+        echo "  ↷ $2 (skipped, checkpoint valid)"
+    else
+        echo "  ✓ $2"
+    fi
+}
+
+# build_pipeline.py runs one step per invocation and prints the summary itself
+[ "${BUILD_SUMMARY:-true}" = true ] || exit 0
+
 print_step "ALL TASKS COMPLETED SUCCESSFULLY!"
 print_info "Summary of executed steps:"
-[ "$DO_UPDATE" = true ] && echo "  ✓ Updated APP_ROOT"
-[ "$DO_BUILD" = true ] && echo "  ✓ Built project ($BUILD_TYPE)"
-[ "$DO_GENERATE" = true ] && echo "  ✓ Generated deployment package"
-[ "$DO_DEPLOY" = true ] && echo "  ✓ Deployed to setup"
-[ "$DO_INSTALL" = true ] && echo "  ✓ Installed on setup"
+[ "$DO_UPDATE" = true ] && summary_line update "Updated APP_ROOT"
+if [ "$BUILD_MODE" = "matrix" ]; then
+    [ "$DO_BUILD" = true ] && summary_line build "Built matrix ($BUILD_MATRIX)"
+else
+    [ "$DO_BUILD" = true ] && summary_line build "Built project ($BUILD_TYPE)"
+fi
+[ "$DO_GENERATE" = true ] && summary_line generate "Generated deployment package"
+[ "$DO_DEPLOY" = true ] && summary_line deploy "Deployed to setup"
+[ "$DO_INSTALL" = true ] && summary_line install "Installed on setup"
 echo ""
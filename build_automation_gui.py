@@ -7,13 +7,26 @@ A graphical user interface with buttons for the build automation workflow
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
-import subprocess
 import os
 import threading
+import collections
+import getpass
+import argparse
 from pathlib import Path
+from build_configs import ConfigRegistry, unquote
+from build_client import BuildServerClient, ServerError, DEFAULT_URL
+from build_jobstore import ANSI_ESCAPE
+from build_pipeline import Pipeline, BUILD_SCRIPT
+from build_treelock import TreeLock, lock_mode, holders, describe
+
+# Output lines are queued by the runner thread and inserted by the Tk thread
+# in one batch per frame, so the window stays responsive at any output rate.
+LOG_FRAME_MS = int(os.environ.get('BUILD_GUI_LOG_FRAME_MS', '') or 50)
+# Scrollback kept in the log widget, older lines are trimmed
+LOG_MAX_LINES = int(os.environ.get('BUILD_GUI_LOG_MAX_LINES', '') or 20000)
 
 class BuildAutomationGUI:
-    def __init__(self, root):
+    def __init__(self, root, server=None):
         self.root = root
         self.root.title("Build Automation GUI")
         self.root.geometry("800x700")
@@ -21,8 +34,13 @@ class BuildAutomationGUI:
         
         # Get script directory
         self.script_dir = Path(__file__).parent.absolute()
-        self.build_script = self.script_dir / "build_automation.sh"
+        # Local runs go through Pipeline, which runs every step with this script
+        self.build_script = BUILD_SCRIPT
         self.config_file = self.script_dir / "build_config.cfg"
+        self.config_registry = ConfigRegistry()
+        self.log_queue = collections.deque()  # lines waiting for the next frame
+        # Client mode: jobs run on the web GUI server instead of a local subprocess
+        self.client = BuildServerClient(server) if server else None
         
         # Configure style
         style = ttk.Style()
@@ -63,6 +81,9 @@ class BuildAutomationGUI:
         
         # Load initial config
         self.load_config_info()
+        
+        # Start the log frame loop
+        self.root.after(LOG_FRAME_MS, self.drain_log)
     
     def create_config_frame(self, parent):
         """Create configuration display and selection frame"""
@@ -93,6 +114,11 @@ class BuildAutomationGUI:
         ttk.Label(config_frame, text="Build Type:").grid(row=2, column=0, sticky=tk.W, padx=(0, 10), pady=(5, 0))
         self.build_type_label = ttk.Label(config_frame, text="Loading...")
         self.build_type_label.grid(row=2, column=1, sticky=tk.W, pady=(5, 0))
+        
+        # Where jobs run
+        ttk.Label(config_frame, text="Runs On:").grid(row=3, column=0, sticky=tk.W, padx=(0, 10), pady=(5, 0))
+        engine = f"Server {self.client.url} (shared queue)" if self.client else "This machine"
+        ttk.Label(config_frame, text=engine).grid(row=3, column=1, sticky=tk.W, pady=(5, 0))
     
     def create_action_buttons(self, parent):
         """Create main action buttons"""
@@ -154,9 +180,13 @@ class BuildAutomationGUI:
         self.log_text = scrolledtext.ScrolledText(log_frame, height=15, wrap=tk.WORD)
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        # Clear log button
-        btn_clear = ttk.Button(log_frame, text="Clear Log", command=self.clear_log)
-        btn_clear.grid(row=1, column=0, pady=(5, 0))
+        # Clear log button and follow mode (keep the newest output in view)
+        log_controls = ttk.Frame(log_frame)
+        log_controls.grid(row=1, column=0, pady=(5, 0))
+        btn_clear = ttk.Button(log_controls, text="Clear Log", command=self.clear_log)
+        btn_clear.grid(row=0, column=0, padx=(0, 10))
+        self.follow_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(log_controls, text="Follow", variable=self.follow_var).grid(row=0, column=1)
     
     def create_tooltip(self, widget, text):
         """Create a simple tooltip"""
@@ -170,17 +200,13 @@ class BuildAutomationGUI:
     def load_config_info(self):
         """Load and display configuration information"""
         try:
-            if self.config_file.exists():
-                config_data = {}
-                with open(self.config_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#') and '=' in line:
-                            key, value = line.split('=', 1)
-                            config_data[key.strip()] = value.strip()
-                
-                self.project_label.config(text=config_data.get('PROJECT_NAME', 'N/A'))
-                self.build_type_label.config(text=config_data.get('BUILD_TYPE', 'N/A'))
+            entry = self.config_registry.load(self.config_file)
+            if entry:
+                values = entry['values']
+                self.project_label.config(text=values.get('PROJECT_NAME', 'N/A'))
+                self.build_type_label.config(text=values.get('BUILD_TYPE', 'N/A'))
+                for error in entry['errors']:
+                    self.log_message(f"Config {entry['name']}: {error}", "error")
             else:
                 self.project_label.config(text="Config file not found")
                 self.build_type_label.config(text="N/A")
@@ -191,7 +217,7 @@ class BuildAutomationGUI:
         """Open file dialog to select config file"""
         filename = filedialog.askopenfilename(
             title="Select Configuration File",
-            initialdir=self.script_dir,
+            initialdir=self.config_registry.root,
             filetypes=[("Config files", "*.cfg"), ("All files", "*.*")]
         )
         if filename:
@@ -219,13 +245,31 @@ class BuildAutomationGUI:
             messagebox.showerror("Error", f"Configuration file not found:\n{self.config_file}")
     
     def log_message(self, message, msg_type="info"):
-        """Add message to log"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.update()
+        """Add message to log (safe to call from any thread, shown on the next frame)"""
+        self.log_queue.append(message)
+    
+    def drain_log(self):
+        """Insert the lines queued since the last frame in one batch, then trim the scrollback"""
+        try:
+            count = len(self.log_queue)
+            if count:
+                lines = [self.log_queue.popleft() for _ in range(count)]
+                skipped = max(0, count - LOG_MAX_LINES)
+                if skipped:
+                    # More than the scrollback arrived in one frame: only the tail would survive trimming
+                    lines = [f"... {skipped} lines skipped ..."] + lines[skipped:]
+                self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+                excess = int(self.log_text.index('end-1c').split('.')[0]) - 1 - LOG_MAX_LINES
+                if excess > 0:
+                    self.log_text.delete('1.0', f'{excess + 1}.0')
+                if self.follow_var.get():
+                    self.log_text.see(tk.END)
+        finally:
+            self.root.after(LOG_FRAME_MS, self.drain_log)
     
     def clear_log(self):
         """Clear the log text"""
+        self.log_queue.clear()
         self.log_text.delete(1.0, tk.END)
     
     def execute_command(self, options, description):
@@ -234,8 +278,8 @@ class BuildAutomationGUI:
         if not messagebox.askyesno("Confirm", f"Execute: {description}?"):
             return
         
-        # Check if build script exists
-        if not self.build_script.exists():
+        # Check if build script exists (client mode: it runs on the server)
+        if not self.client and not self.build_script.exists():
             messagebox.showerror("Error", f"Build script not found:\n{self.build_script}")
             return
         
@@ -247,38 +291,46 @@ class BuildAutomationGUI:
         self.log_message(f"\n{'='*60}")
         self.log_message(f"Executing: {description}")
         self.log_message(f"Config: {self.config_file}")
-        self.log_message(f"Command: {self.build_script} -c {self.config_file} {options}")
+        if self.client:
+            self.log_message(f"Server: {self.client.url}")
+        else:
+            self.log_message(f"Command: build_pipeline.py -c {self.config_file} {options}")
         self.log_message(f"{'='*60}\n")
+        if not self.client:
+            self.report_tree_lock(options)
         
         # Execute in separate thread
-        thread = threading.Thread(target=self.run_command, args=(options, description))
+        target = self.run_remote if self.client else self.run_command
+        thread = threading.Thread(target=target, args=(options, description))
         thread.daemon = True
         thread.start()
     
+    def report_tree_lock(self, options):
+        """Tell the user when the run will wait for another job on the same tree"""
+        entry = self.config_registry.load(self.config_file)
+        env_path = entry and unquote(entry['values'].get('ENV_PATH', ''))
+        if not env_path:
+            return
+        mode = lock_mode(options)
+        if not TreeLock(env_path, mode).available():
+            self.status_var.set(f"Waiting for {env_path}...")
+            self.log_message(f"{env_path} is in use, the run waits for the {mode} lock:")
+            for holder in holders(env_path):
+                self.log_message(f"  {describe(holder)}")
+    
     def run_command(self, options, description):
-        """Run the command in a separate thread"""
+        """Run the steps with the Python engine in this (worker) thread"""
         try:
-            cmd = [str(self.build_script), "-c", str(self.config_file)] + options.split()
-            
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            # Read output line by line
-            for line in process.stdout:
-                self.root.after(0, self.log_message, line.rstrip())
-            
-            process.wait()
+            # Output lines are queued for drain_log; the log widget shows plain text
+            pipeline = Pipeline(self.config_file, options,
+                                output=lambda line: self.log_queue.append(ANSI_ESCAPE.sub('', line)))
+            returncode = pipeline.run()
             
             # Show result
-            if process.returncode == 0:
+            if returncode == 0:
                 self.root.after(0, self.show_success, description)
             else:
-                self.root.after(0, self.show_error, description, process.returncode)
+                self.root.after(0, self.show_error, description, returncode)
         
         except Exception as e:
             self.root.after(0, self.show_error, description, str(e))
@@ -288,6 +340,32 @@ class BuildAutomationGUI:
             self.root.after(0, self.enable_all_buttons)
             self.root.after(0, self.status_var.set, "Ready")
     
+    def run_remote(self, options, description):
+        """Client mode: submit the job to the server and follow its output"""
+        try:
+            # The server resolves configs by their name in its registry
+            try:
+                config = self.config_file.absolute().relative_to(self.config_registry.root).as_posix()
+            except ValueError:
+                config = str(self.config_file)
+            job = self.client.submit(options, description, config=config, user=getpass.getuser())
+            self.root.after(0, self.status_var.set, f"Job #{job['job_id']} {job['state']}: {description}")
+            # The server log is colored for the web page, Tk shows plain text
+            record = self.client.follow(job['job_id'],
+                                        lambda lines: self.log_queue.extend(ANSI_ESCAPE.sub('', line) for line in lines))
+            
+            if record['state'] == 'finished':
+                self.root.after(0, self.show_success, description)
+            else:
+                self.root.after(0, self.show_error, description, f"job #{record['id']} {record['state']}")
+        
+        except (ServerError, ValueError, KeyError) as e:
+            self.root.after(0, self.show_error, description, str(e))
+        
+        finally:
+            self.root.after(0, self.enable_all_buttons)
+            self.root.after(0, self.status_var.set, "Ready")
+    
     def show_success(self, description):
         """Show success message"""
         self.log_message(f"\n✓ {description} completed successfully!\n")
@@ -323,8 +401,15 @@ class BuildAutomationGUI:
             self.enable_widget_recursive(child)
 
 def main():
+    parser = argparse.ArgumentParser(description="Build Automation GUI")
+    parser.add_argument('--server', nargs='?', const=DEFAULT_URL,
+                        default=os.environ.get('BUILD_GUI_SERVER') or None,
+                        help=f"Run jobs on the web GUI server at this URL (default: {DEFAULT_URL}) "
+                             "instead of locally (env: BUILD_GUI_SERVER)")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = BuildAutomationGUI(root)
+    app = BuildAutomationGUI(root, server=args.server)
     root.mainloop()
 
 if __name__ == "__main__":
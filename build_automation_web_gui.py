@@ -1,19 +1,104 @@
 #!/usr/bin/env python3
 """Build Automation Web GUI"""
-from flask import Flask, render_template_string, jsonify, request
-import subprocess, os, threading, queue, signal, sys, shutil, shlex
+import time
+STARTUP_T0 = time.perf_counter()
+startup_phases = []  # (phase, ms) recorded while the server starts
+
+def startup_phase(name, started):
+    """Record the duration of a startup phase, returns the start of the next one"""
+    now = time.perf_counter()
+    startup_phases.append((name, round((now - started) * 1000, 1)))
+    return now
+
+_t = STARTUP_T0
+from flask import Flask, jsonify, request, send_from_directory
+_t = startup_phase('import flask', _t)
+import os, threading, signal, sys, shutil, json, hashlib, gzip
 from pathlib import Path
 from datetime import datetime
+from build_scheduler import JobScheduler, Job, classify_options
+from build_jobstore import JobStore, StepTracker, step_flags
+from build_output import OutputLog, FORMATS, MIMETYPES, MAX_BYTES, MAX_WAIT_SEC, encode
+from build_configs import ConfigRegistry, SECRET_KEYS, summary, unquote, update_text
+from build_treelock import TreeLock, lock_mode, holders
+from build_health import HealthProber
+from build_gc import GarbageCollector
+from build_profiler import Profiler, ENABLED as PROFILE_ENABLED, ALLOW as PROFILE_ALLOW
+# subprocess, shlex and bkc_manifest are imported where they are used
+_t = startup_phase('import build modules', _t)
 
-app = Flask(__name__)
+# Static assets are served by static_asset() under content-hashed URLs
+app = Flask(__name__, static_folder=None)
 script_dir = Path(__file__).parent.absolute()
-build_script = script_dir / "build_automation.sh"
+# Engine of the jobs: build_automation.sh (script) or build_pipeline.py (pipeline), both take the same options
+ENGINE = os.environ.get('WEB_GUI_ENGINE', 'script')
+build_script = script_dir / ("build_pipeline.py" if ENGINE == 'pipeline' else "build_automation.sh")
 config_file = script_dir / "build_config.cfg"
+config_registry = ConfigRegistry()
+static_dir = script_dir / "static"
 current_process = None
-output_queue = queue.Queue()
-is_running = False
+output_queue = OutputLog()
+# Opt-in request timing, output rates and sampling profiler, switched through /admin/profile
+profiler = Profiler(output_queue)
+app.wsgi_app = profiler.middleware(app.wsgi_app)
+scheduler = JobScheduler()
+_t = startup_phase('start scheduler', _t)
+job_store = JobStore()
+_t = startup_phase('open job store', _t)
+# What a deploy/install job does when its setup or AVPC is down: warn, fail (before
+# building), wait (stay queued while other jobs run) or off
+HEALTH_POLICY = os.environ.get('WEB_GUI_HEALTH_POLICY', 'warn')
+# Follow job progress through the script's --events stream instead of its output text
+USE_EVENTS = os.environ.get('WEB_GUI_EVENTS', 'true').lower() not in ('0', 'false', 'no', 'off')
+
+# Background services (health prober, garbage collector) log to the output and to this file
+services_log = job_store.root / 'services.log'
+
+def service_log(message):
+    """Record a message of a background service in services_log and the output"""
+    try:
+        with open(services_log, 'a') as f:
+            f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {message}\n")
+    except OSError:
+        pass
+    output_queue.put(color_text(message, 'yellow'))
+
+def health_targets():
+    """(SETUP_NAME, AVPC_IP, AVPC_PASSWORD) of every config the server can run"""
+    entries = config_registry.scan() + [config_registry.load(config_file)]
+    for entry in entries:
+        if entry:
+            values = entry['values']
+            yield (unquote(values.get('SETUP_NAME', '')), unquote(values.get('AVPC_IP', '')),
+                   unquote(values.get('AVPC_PASSWORD', '')))
+
+health = HealthProber(health_targets, log=service_log)
+
+def gc_configs():
+    """(path, unquoted values) of every config the server can run, for the garbage collector"""
+    for entry in config_registry.scan() + [config_registry.load(config_file)]:
+        if entry:
+            yield entry['path'], {key: unquote(value) for key, value in entry['values'].items()}
+
+gc = GarbageCollector(gc_configs, job_store.env_destinations, log=service_log)
+
+def tree_lock_hold(job):
+    """Keep jobs queued while a run outside this server (Tk GUI, command line) holds their tree"""
+    if job.tree and not TreeLock(job.tree, job.tree_mode).available():
+        return f"waiting for {job.tree} (locked outside the server)"
+
+def health_hold(job):
+    """WEB_GUI_HEALTH_POLICY=wait: keep deploy/install jobs queued while their target is down"""
+    if HEALTH_POLICY == 'wait' and job.setup:
+        reason = health.down(job.setup, job.avpc)
+        if reason:
+            return f"waiting for the target: {reason}"
+
+scheduler.add_hold(tree_lock_hold)
+scheduler.add_hold(health_hold)
 current_command = ''
 current_command_plain = ''
+last_ccache_stats = None
 
 # Simple ANSI color helper for log messages
 ANSI_CODES = {
@@ -48,71 +133,7 @@ HTML_TEMPLATE = r"""<!DOCTYPE html>
 <title>Build Automation GUI</title>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
-<style>
-* {margin:0;padding:0;box-sizing:border-box}
-body{font-family:Arial,sans-serif;background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);min-height:100vh;padding:20px}
-.container{max-width:1200px;margin:0 auto;background:white;border-radius:15px;box-shadow:0 20px 60px rgba(0,0,0,0.3);overflow:hidden}
-.header{background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);color:white;padding:30px;text-align:center}
-.header h1{font-size:2.5em;margin-bottom:10px}
-.config-section{padding:25px;background:#f8f9fa;border-bottom:2px solid #e9ecef}
-.config-header{display:flex;justify-content:space-between;align-items:center;margin-bottom:15px}
-.btn-edit-config{padding:10px 20px;background:#667eea;color:white;border:none;border-radius:5px;cursor:pointer}
-.config-grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(250px,1fr));gap:15px}
-.config-item{display:flex;flex-direction:column}
-.config-label{font-weight:600;color:#6c757d;font-size:0.9em;margin-bottom:5px}
-.config-value{color:#212529;font-family:monospace;background:white;padding:8px 12px;border-radius:5px;border:1px solid #dee2e6}
-.section{padding:25px}
-.section-title{font-size:1.2em;font-weight:bold;color:#495057;margin-bottom:20px;padding-bottom:10px;border-bottom:2px solid #667eea}
-.button-grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:15px;margin-bottom:20px}
-.btn{padding:15px 25px;font-size:1em;font-weight:600;border:none;border-radius:8px;cursor:pointer;transition:all 0.3s ease;box-shadow:0 4px 6px rgba(0,0,0,0.1);color:white}
-.btn:hover{transform:translateY(-2px);box-shadow:0 6px 12px rgba(0,0,0,0.15)}
-.btn:disabled{opacity:0.6;cursor:not-allowed;transform:none}
-.btn-update{background:linear-gradient(135deg,#667eea 0%,#764ba2 100%)}
-/* smaller variant for less prominent actions */
-.btn-small{padding:8px 14px;font-size:0.9em;border-radius:6px;box-shadow:none}
-
-.btn-build{background:linear-gradient(135deg,#f093fb 0%,#f5576c 100%)}
-.btn-generate{background:linear-gradient(135deg,#4facfe 0%,#00f2fe 100%)}
-.btn-deploy{background:linear-gradient(135deg,#43e97b 0%,#38f9d7 100%)}
-.btn-install{background:linear-gradient(135deg,#fa709a 0%,#fee140 100%)}
-.btn-combined{background:linear-gradient(135deg,#30cfd0 0%,#330867 100%)}
-.btn-all{background:linear-gradient(135deg,#ff0844 0%,#ffb199 100%);font-size:1.1em}
-.log-section{background:#1e1e1e;color:#d4d4d4;padding:20px;border-radius:8px;height:400px;overflow-y:auto;font-family:monospace;font-size:0.9em;line-height:1.5}
-.log-line{margin:2px 0;word-wrap:break-word;white-space:pre-wrap}
-.log-header{display:flex;justify-content:space-between;align-items:center;margin-bottom:10px}
-.current-command{font-family:monospace;font-size:0.9em;padding:6px 10px;border-radius:6px;background:#1e1e1e;color:#ffc107;max-width:60%;overflow:auto;white-space:nowrap;text-overflow:ellipsis;margin-left:15px} 
-.btn-clear{padding:8px 16px;background:#dc3545;color:white;border:none;border-radius:5px;cursor:pointer}
-.status-bar{background:#343a40;color:white;padding:15px 25px;display:flex;justify-content:space-between;align-items:center}
-.status-indicator{display:flex;align-items:center;gap:10px}
-.status-dot{width:12px;height:12px;border-radius:50%;background:#28a745}
-.status-dot.running{background:#ffc107;animation:pulse 1.5s infinite}
-@keyframes pulse{0%,100%{opacity:1}50%{opacity:0.5}}
-.spinner{display:none;width:20px;height:20px;border:3px solid rgba(255,255,255,0.3);border-top:3px solid white;border-radius:50%;animation:spin 1s linear infinite}
-.spinner.active{display:inline-block}
-@keyframes spin{0%{transform:rotate(0deg)}100%{transform:rotate(360deg)}}
-.modal{display:none;position:fixed;z-index:1000;left:0;top:0;width:100%;height:100%;background:rgba(0,0,0,0.5);align-items:center;justify-content:center}
-.modal.active{display:flex}
-.modal-content{background:white;padding:30px;border-radius:10px;max-width:500px;text-align:center}
-.modal-content h2{margin-bottom:15px}
-.modal-content p{margin-bottom:25px}
-.modal-buttons{display:flex;gap:10px;justify-content:center}
-.modal-btn{padding:10px 30px;border:none;border-radius:5px;cursor:pointer;font-size:1em;font-weight:600}
-.modal-btn-yes{background:#28a745;color:white}
-.modal-btn-no{background:#6c757d;color:white}
-.edit-modal{display:none;position:fixed;z-index:1000;left:0;top:0;width:100%;height:100%;background:rgba(0,0,0,0.5);align-items:center;justify-content:center;overflow-y:auto;padding:20px}
-.edit-modal.active{display:flex}
-.edit-modal-content{background:white;padding:30px;border-radius:10px;max-width:700px;width:100%;max-height:90vh;overflow-y:auto}
-.form-group{margin-bottom:20px}
-.form-label{display:block;font-weight:600;margin-bottom:8px}
-.form-input{width:100%;padding:10px;border:2px solid #dee2e6;border-radius:5px;font-family:monospace}
-.edit-buttons{display:flex;gap:10px;justify-content:flex-end;margin-top:25px}
-.btn-save{padding:12px 30px;background:#28a745;color:white;border:none;border-radius:5px;cursor:pointer}
-.btn-cancel{padding:12px 30px;background:#6c757d;color:white;border:none;border-radius:5px;cursor:pointer}
-.btn-stop{display:none;padding:12px 30px;background:#dc3545;color:white;border:none;border-radius:5px;cursor:pointer;animation:pulse-red 1.5s infinite}
-.btn-stop.active{display:inline-block}
-@keyframes pulse-red{0%,100%{opacity:1}50%{opacity:0.7}}
-.status-actions{display:flex;gap:10px;align-items:center}
-</style>
+<link rel="stylesheet" href="{{ asset_url('web_gui.css') }}">
 </head>
 <body>
 <div class="container">
@@ -142,7 +163,24 @@ body{font-family:Arial,sans-serif;background:linear-gradient(135deg,#667eea 0%,#
 <div class="config-label">Zero Config Path</div>
 <div class="config-value" id="zero-config-path">{{ zero_config_path }}</div>
 </div>
+<div class="config-item">
+<div class="config-label">Run With</div>
+<select class="config-value" id="config-select" title="Config the buttons below run with"><option value="">{{ config_file }} (default)</option></select>
+</div>
+<div class="config-item">
+<div class="config-label">Compiler Cache (last build)</div>
+<div class="config-value" id="ccache-stats">{{ ccache_stats }}</div>
+</div>
+</div>
+</div>
+<div class="section health-section">
+<div class="section-title">🩺 Setup Health <button class="btn-clear" onclick="checkHealthNow()">Check Now</button></div>
+<div class="health-list" id="health-list">Waiting for the first probe...</div>
 </div>
+<div class="section gc-section">
+<div class="section-title">🧹 Disk Cleanup <button class="btn-clear" onclick="runGc(true)">Dry Run</button> <button class="btn-clear" id="gc-clean-btn" onclick="runGc(false)">Clean Now</button></div>
+<div class="gc-summary" id="gc-summary">Waiting for the first pass...</div>
+<div class="gc-list" id="gc-list"></div>
 </div>
 <div class="section">
 <div class="section-title">🔧 Individual Operations</div>
@@ -163,8 +201,12 @@ body{font-family:Arial,sans-serif;background:linear-gradient(135deg,#667eea 0%,#
 <button class="btn btn-combined" onclick="executeCommand('-g -d','Generate + Deploy')">Generate + Deploy</button>
 <button class="btn btn-combined" onclick="executeCommand('-d -i','Deploy + Install')">Deploy + Install</button>
 <button class="btn btn-combined" onclick="executeCommand('-u -b -g','Update + Build + Generate')">Update + Build + Generate</button>
+<button class="btn btn-combined" onclick="executeCommand('-m','Build Matrix')">🧮 Build Matrix</button>
 <button class="btn btn-all" onclick="executeCommand('-a','Execute All Steps')">⚡ Execute All Steps</button>
 </div>
+<label class="resume-option" title="Skip steps already completed with unchanged inputs and continue from the first failed or invalidated step">
+<input type="checkbox" id="resume-checkpoint"> 🔁 Resume from checkpoint (skip steps that are already done)
+</label>
 </div>
 <div class="section">
 <div class="log-header">
@@ -197,7 +239,7 @@ body{font-family:Arial,sans-serif;background:linear-gradient(135deg,#667eea 0%,#
 </div>
 <div class="edit-modal" id="edit-modal">
 <div class="edit-modal-content">
-<h2>✏️ Edit Configuration</h2>
+<h2>✏️ Edit Configuration: <span id="edit-config-name"></span></h2>
 <form id="config-form">
 <div class="form-group">
 <label class="form-label">APP_ROOT</label>
@@ -230,6 +272,12 @@ body{font-family:Arial,sans-serif;background:linear-gradient(135deg,#667eea 0%,#
 <option value="CV_BPP">CV_BPP</option>
 </select>
 </div>
+<div class="form-group"><label class="form-label">BUILD_MATRIX (BUILD_TYPE[:HW_APP] cells, e.g. HW:GPR_APP HW:CV_BPP SW)</label>
+<input type="text" class="form-input" id="edit-build-matrix">
+</div>
+<div class="form-group"><label class="form-label">MATRIX_JOBS (matrix cells built in parallel)</label>
+<input type="text" class="form-input" id="edit-matrix-jobs" placeholder="1">
+</div>
 <div class="form-group">
 <label class="form-label">OUTPUT_BASE</label>
 <input type="text" class="form-input" id="edit-output-base">
@@ -267,314 +315,70 @@ body{font-family:Arial,sans-serif;background:linear-gradient(135deg,#667eea 0%,#
 </div>
 </div>
 </div>
-<script>
-let pendingCommand = null;
-let pendingDescription = null;
-let logUpdateInterval = null;
-
-function executeCommand(options, description) {
-    pendingCommand = options;
-    pendingDescription = description;
-    document.getElementById('confirm-message').textContent = 'Are you sure you want to execute: ' + description + '?';
-    document.getElementById('confirm-modal').classList.add('active');
-}
-
-function confirmNo() {
-    document.getElementById('confirm-modal').classList.remove('active');
-    pendingCommand = null;
-    pendingDescription = null;
-}
-
-function confirmYes() {
-    document.getElementById('confirm-modal').classList.remove('active');
-    if (pendingCommand) {
-        runCommand(pendingCommand, pendingDescription);
-    }
-}
-
-function runCommand(options, description) {
-    setStatus('running', 'Executing: ' + description + '...');
-    disableButtons(true);
-    showStopButton(true);
-    
-    fetch('/execute', {
-        method: 'POST',
-        headers: {'Content-Type': 'application/json'},
-        body: JSON.stringify({options: options, description: description})
-    })
-    .then(r => r.json())
-    .then(data => {
-        if (data.success) {
-            logUpdateInterval = setInterval(updateLog, 500);
-        } else {
-            addLog('Error: ' + data.message);
-            setStatus('ready', 'Ready');
-            disableButtons(false);
-        }
-    });
-}
-
-function updateLog() {
-    fetch('/get_output')
-    .then(r => r.json())
-    .then(data => {
-        if (data.output) {
-            data.output.forEach(line => addLog(line));
-        }
-        // Render the current command in the Execution Log header (ANSI -> HTML)
-        try {
-            const cmdEl = document.getElementById('current-command');
-            const cmdText = data.current_command || '';
-            // Hide the element if empty (no visible command), otherwise show it
-            if (!cmdText || cmdText.trim() === '') {
-                cmdEl.style.display = 'none';
-                cmdEl.innerHTML = '';
-                cmdEl.title = '';
-            } else {
-                cmdEl.style.display = '';
-                cmdEl.innerHTML = ansiToHtml(cmdText);
-                cmdEl.title = data.current_command_plain || '';
-            }
-        } catch (e) {}
-        if (data.finished) {
-            clearInterval(logUpdateInterval);
-            setStatus('ready', data.status);
-            disableButtons(false);
-            showStopButton(false);
-            if (data.success) {
-                alert('✓ ' + data.description + ' completed successfully!');
-            } else if (data.stopped) {
-                alert('⏹ ' + data.description + ' was stopped by user.');
-            } else {
-                alert('✗ ' + data.description + ' failed!');
-            }
-        }
-    });
-}
-
-function escapeHtml(s) {
-    return s.replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;');
-}
-
-function ansiToHtml(text) {
-    // Normalize common escaped forms to actual ESC character so regex matches reliably
-    try {
-        // Replace literal backslash-x sequences (\x1b) and backslash-u sequences (\u001b) with an actual ESC
-        text = text.replace(/\\x1b/g, '\x1b').replace(/\\u001b/g, '\x1b');
-        // Some inputs may include the ESC char as the visible glyph '\u001b' already, leave as-is
-    } catch (e) {}
-
-    text = escapeHtml(text);
-
-    // Replace actual ESC sequences like \x1b[0;34m or \u001b[0;34m
-    const ansiRegex = /\x1b\[([0-9;]+)m/g;
-    text = text.replace(ansiRegex, function(_, codes) {
-        let parts = codes.split(';').map(Number);
-        // Treat 0 as reset; if it's the only code, close span; otherwise remove it and continue
-        if (parts.length === 1 && parts[0] === 0) return '</span>';
-        if (parts.includes(0)) parts = parts.filter(p => p !== 0);
-        let styles = [];
-        parts.forEach(code => {
-            if (code === 1) styles.push('font-weight:bold');
-            else if (code >= 30 && code <= 37) {
-                const cols = ['black','red','green','yellow','blue','magenta','cyan','white'];
-                styles.push('color:' + cols[code-30]);
-            } else if (code >= 90 && code <= 97) {
-                const cols = ['grey','red','green','yellow','blue','magenta','cyan','white'];
-                styles.push('color:' + cols[code-90]);
-            }
-        });
-        if (styles.length) return '<span style="' + styles.join(';') + '">';
-        return '';
-    });
-    return text;
-}
-
-function addLog(msg) {
-    const logDiv = document.getElementById('log-output');
-    const line = document.createElement('div');
-    line.className = 'log-line';
-    line.innerHTML = ansiToHtml(msg);
-    logDiv.appendChild(line);
-    logDiv.scrollTop = logDiv.scrollHeight;
-}
-
-function clearLog() {
-    document.getElementById('log-output').innerHTML = '';
-}
-
-function setStatus(state, text) {
-    const dot = document.getElementById('status-dot');
-    const statusText = document.getElementById('status-text');
-    const spinner = document.getElementById('spinner');
-    statusText.textContent = text;
-    if (state === 'running') {
-        dot.classList.add('running');
-        spinner.classList.add('active');
-    } else {
-        dot.classList.remove('running');
-        spinner.classList.remove('active');
-    }
-}
-
-function disableButtons(disabled) {
-    document.querySelectorAll('.btn, .btn-edit-config').forEach(btn => btn.disabled = disabled);
-}
-
-function showStopButton(show) {
-    const stopBtn = document.getElementById('btn-stop');
-    if (show) {
-        stopBtn.classList.add('active');
-    } else {
-        stopBtn.classList.remove('active');
-    }
-}
-
-function stopExecution() {
-    if (!confirm('Are you sure you want to stop the current execution?')) {
-        return;
-    }
-    addLog('');
-    addLog('⏹ Stop requested by user...');
-    
-    fetch('/stop_execution', {method: 'POST'})
-    .then(r => r.json())
-    .then(data => {
-        if (data.success) {
-            addLog('⏹ Stop signal sent successfully');
-        } else {
-            addLog('Error stopping execution: ' + data.message);
-        }
-    })
-    .catch(err => addLog('Error: ' + err));
-}
-
-function openConfigEditor() {
-    fetch('/get_full_config')
-    .then(r => r.json())
-    .then(data => {
-        document.getElementById('edit-app-root').value = data.APP_ROOT || '';
-        document.getElementById('edit-project-name').value = data.PROJECT_NAME || '';
-        document.getElementById('edit-setup-name').value = data.SETUP_NAME || '';
-        document.getElementById('edit-env-path').value = data.ENV_PATH || '';
-        document.getElementById('edit-zero-config-path').value = data.ZERO_CONFIG_PATH || '';
-        document.getElementById('edit-build-type').value = data.BUILD_TYPE || 'HW';
-        document.getElementById('edit-hw-app').value = data.HW_APP || 'GPR_APP';
-        document.getElementById('edit-output-base').value = data.OUTPUT_BASE || '';
-        document.getElementById('edit-avpc-ip').value = data.AVPC_IP || '';
-        document.getElementById('edit-avpc-password').value = data.AVPC_PASSWORD || '';
-        document.getElementById('edit-modal').classList.add('active');
-    })
-    .catch(err => alert('Error loading configuration: ' + err));
-}
-
-function closeConfigEditor() {
-    document.getElementById('edit-modal').classList.remove('active');
-}
+<script src="{{ asset_url('web_gui.js') }}"></script>
+</body>
+</html>"""
 
-function saveConfig() {
-    const formData = {
-        APP_ROOT: document.getElementById('edit-app-root').value,
-        PROJECT_NAME: document.getElementById('edit-project-name').value,
-        SETUP_NAME: document.getElementById('edit-setup-name').value,
-        ENV_PATH: document.getElementById('edit-env-path').value,
-        ZERO_CONFIG_PATH: document.getElementById('edit-zero-config-path').value,
-        BUILD_TYPE: document.getElementById('edit-build-type').value,
-        HW_APP: document.getElementById('edit-hw-app').value,
-        OUTPUT_BASE: document.getElementById('edit-output-base').value,
-        AVPC_IP: document.getElementById('edit-avpc-ip').value,
-        AVPC_PASSWORD: document.getElementById('edit-avpc-password').value
-    };
-    
-    if (!confirm('Save configuration changes?')) {
-        return;
-    }
-    
-    fetch('/save_config', {
-        method: 'POST',
-        headers: {'Content-Type': 'application/json'},
-        body: JSON.stringify(formData)
-    })
-    .then(r => r.json())
-    .then(data => {
-        if (data.success) {
-            alert('✓ Configuration saved successfully!');
-            closeConfigEditor();
-            refreshConfig();
-        } else {
-            alert('Error saving configuration: ' + data.message);
-        }
-    })
-    .catch(err => alert('Error saving configuration: ' + err));
-}
+ASSET_MAX_AGE = 365 * 24 * 3600
+index_template = None
+asset_digests = {}
 
-function refreshConfig() {
-    fetch('/get_config')
-    .then(r => r.json())
-    .then(config => {
-        document.getElementById('config-file').textContent = config.config_file;
-        document.getElementById('project-name').textContent = config.project_name;
-        document.getElementById('build-type').textContent = config.build_type;
-        document.getElementById('zero-config-path').textContent = config.zero_config_path || '';
-    });
-}
+def asset_url(filename):
+    """URL of a static asset with its content hash, so browsers can cache it forever"""
+    digest = asset_digests.get(filename)
+    if digest is None:
+        digest = hashlib.sha256((static_dir / filename).read_bytes()).hexdigest()[:12]
+        asset_digests[filename] = digest
+    return f"/static/{digest}/{filename}"
 
-function openEnvCreator() {
-    document.getElementById('env-creator-modal').classList.add('active');
-}
+@app.route('/')
+def index():
+    global index_template
+    # Compiled once on first use instead of on every request
+    if index_template is None:
+        index_template = app.jinja_env.from_string(HTML_TEMPLATE)
+    response = app.make_response(index_template.render(asset_url=asset_url, **load_config()))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-function closeEnvCreator() {
-    document.getElementById('env-creator-modal').classList.remove('active');
-}
+GZIP_LEVEL = int(os.environ.get('WEB_GUI_GZIP_LEVEL', '') or 5)
+GZIP_MIN_BYTES = 1024
+GZIP_MIMETYPES = ('text/', 'application/json', 'application/javascript', 'application/octet-stream')
 
-function createEnvironment(envType) {
-    const destPath = document.getElementById('env-dest-path').value.trim();
-    
-    if (!destPath) {
-        alert('Please enter a destination path');
-        return;
-    }
-    
-    closeEnvCreator();
-    setStatus('running', 'Creating ' + envType + ' environment...');
-    disableButtons(true);
-    showStopButton(true);
-    
-    fetch('/create_environment', {
-        method: 'POST',
-        headers: {'Content-Type': 'application/json'},
-        body: JSON.stringify({env_type: envType, dest_path: destPath})
-    })
-    .then(r => r.json())
-    .then(data => {
-        if (data.success) {
-            logUpdateInterval = setInterval(updateLog, 500);
-        } else {
-            addLog('Error: ' + data.message);
-            setStatus('ready', 'Ready');
-            disableButtons(false);
-            showStopButton(false);
-        }
-    });
-}
+@app.before_request
+def profile_endpoint():
+    """Name the request for the profiler's per-endpoint timings"""
+    if profiler.timing:
+        request.environ['profile.endpoint'] = request.endpoint
 
-setInterval(() => {
-    fetch('/get_config')
-    .then(r => r.json())
-    .then(data => {
-        document.getElementById('config-file').textContent = data.config_file;
-        document.getElementById('project-name').textContent = data.project_name;
-        document.getElementById('build-type').textContent = data.build_type;
-        document.getElementById('zero-config-path').textContent = data.zero_config_path || '';
-    });
-}, 30000);
-</script>
-</body>
-</html>"""
+@app.after_request
+def compress_response(response):
+    """gzip bodies for clients that accept it (WEB_GUI_GZIP_LEVEL=0 disables it)"""
+    if (GZIP_LEVEL <= 0 or response.status_code != 200 or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '')
+            or not (response.mimetype or '').startswith(GZIP_MIMETYPES)):
+        return response
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-gzip", weak)
+    return response
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE, **load_config())
+@app.route('/static/<digest>/<path:filename>')
+def static_asset(digest, filename):
+    response = send_from_directory(static_dir, filename)
+    if digest == asset_url(filename).split('/')[2]:
+        response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    else:
+        # Stale URL from a page rendered before a restart: serve the current file uncached
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/get_config')
 def get_config():
@@ -582,17 +386,20 @@ def get_config():
 
 @app.route('/get_full_config')
 def get_full_config():
-    config_data = {}
-    try:
-        if config_file.exists():
-            with open(config_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        config_data[key.strip()] = value.strip()
-    except Exception as e:
-        print(f"Error loading config: {e}")
+    """Settings of ?config=<registry name> (default: build_config.cfg) for the editor.
+
+    Secrets are left out, `secrets_set` names the ones that have a value.
+    """
+    path = config_file
+    if request.args.get('config'):
+        path = config_registry.resolve(request.args['config'])
+        if not path:
+            return jsonify({'success': False, 'message': f"Unknown config: {request.args['config']}"}), 404
+    config_data = read_full_config_dict(path)
+    config_data['secrets_set'] = []
+    for key in SECRET_KEYS:
+        if unquote(config_data.pop(key, '')):
+            config_data['secrets_set'].append(key)
     return jsonify(config_data)
 
 
@@ -600,89 +407,427 @@ def get_full_config():
 def save_config_route():
     try:
         data = request.json
+        # Secrets are not sent to the editor, an empty one keeps the stored value
+        for key in SECRET_KEYS:
+            if not data.get(key):
+                data.pop(key, None)
+        if data.get('config'):
+            # A registry config: edited in place, no backup
+            name = data.pop('config')
+            result = config_registry.bulk_update([name], data)[0]
+            return jsonify({'success': result['success'],
+                            'message': result.get('message') or f'Configuration {name} saved'})
+        data.pop('config', None)
         if config_file.exists():
             backup_file = config_file.parent / f"{config_file.name}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             shutil.copy2(config_file, backup_file)
         
-        with open(config_file, 'w') as f:
-            f.write("# Build Configuration File\n\n")
-            for key in ['APP_ROOT', 'PROJECT_NAME', 'SETUP_NAME', 'ENV_PATH', 'ZERO_CONFIG_PATH', 'BUILD_TYPE', 'HW_APP', 'OUTPUT_BASE', 'AVPC_IP', 'AVPC_PASSWORD']:
-                f.write(f"{key}={data.get(key, '')}\n\n")
+        write_config_entries(data)
         
         return jsonify({'success': True, 'message': 'Configuration saved successfully'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/configs')
+def list_configs():
+    """Configs in the registry: ?KEY=pattern filters (fnmatch), ?q=text, ?valid=1|0"""
+    filters = {key: value for key, value in request.args.items() if key.isupper()}
+    valid = request.args.get('valid')
+    entries = config_registry.query(filters, request.args.get('q'),
+                                    None if valid is None else valid in ('1', 'true'))
+    return jsonify({'root': str(config_registry.root), 'default': config_name(config_file),
+                    'configs': [summary(entry) for entry in entries]})
+
+@app.route('/configs/<path:name>')
+def get_config_entry(name):
+    entry = config_registry.get(name)
+    if not entry:
+        return jsonify({'success': False, 'message': f'Unknown config: {name}'}), 404
+    return jsonify(summary(entry, full=True))
+
+@app.route('/configs/bulk', methods=['POST'])
+def bulk_edit_configs():
+    """Apply {"set": {...}, "unset": [...]} to the configs named in "names" or
+    matching "filter" ({KEY: pattern}); "dry_run" reports without writing"""
+    data = request.json or {}
+    names = data.get('names')
+    if names is None:
+        if not data.get('filter'):
+            return jsonify({'success': False, 'message': 'names or filter required'}), 400
+        names = [entry['name'] for entry in config_registry.query(data['filter'])]
+    results = config_registry.bulk_update(names, data.get('set'), data.get('unset', ()),
+                                          dry_run=bool(data.get('dry_run')))
+    return jsonify({'success': all(r['success'] for r in results), 'results': results})
+
+def config_name(path):
+    """Registry name of a config path (the path itself when it is outside the registry)"""
+    try:
+        return Path(path).relative_to(config_registry.root).as_posix()
+    except ValueError:
+        return str(path)
+
 @app.route('/execute', methods=['POST'])
 def execute():
-    global current_process, is_running, output_queue
-    if is_running:
-        return jsonify({'success': False, 'message': 'Another command is already running'})
-    
-    data = request.json
-    while not output_queue.empty():
-        output_queue.get()
-    
-    thread = threading.Thread(target=run_command, args=(data.get('options', ''), data.get('description', '')))
-    thread.daemon = True
-    thread.start()
-    
-    return jsonify({'success': True})
+    data = request.json or {}
+    target = config_file
+    if data.get('config'):
+        entry = config_registry.get(data['config'])
+        if not entry:
+            return jsonify({'success': False, 'message': f"Unknown config: {data['config']}"}), 404
+        if entry['errors']:
+            return jsonify({'success': False, 'message': f"Invalid config {entry['name']}: " + '; '.join(entry['errors'])}), 400
+        target = Path(entry['path'])
+    job = new_build_job(data.get('options', ''), data.get('description', ''),
+                        request_user(data), data.get('priority', 'normal'), config_path=target)
+    output_seq = submit_job(job)
+    return jsonify({'success': True, 'job_id': job.id, 'state': job.state, 'output_seq': output_seq})
 
 @app.route('/create_environment', methods=['POST'])
 def create_environment():
-    global current_process, is_running, output_queue
-    if is_running:
-        return jsonify({'success': False, 'message': 'Another command is already running'})
-    
-    data = request.json
+    data = request.json or {}
     env_type = data.get('env_type', '')
     dest_path = data.get('dest_path', '')
-    
-    while not output_queue.empty():
-        output_queue.get()
-    
-    thread = threading.Thread(target=run_env_creation, args=(env_type, dest_path))
-    thread.daemon = True
-    thread.start()
-    
-    return jsonify({'success': True})
+    job = new_env_job(env_type, dest_path, request_user(data), data.get('priority', 'normal'))
+    output_seq = submit_job(job)
+    return jsonify({'success': True, 'job_id': job.id, 'state': job.state, 'output_seq': output_seq})
+
+@app.route('/get_matrix_report')
+def get_matrix_report():
+    env_path = read_full_config_dict().get('ENV_PATH', '')
+    report = Path(env_path) / '.matrix_report.json' if env_path else None
+    if not report or not report.exists():
+        return jsonify({'success': False, 'message': 'No build matrix report found'})
+    try:
+        return jsonify({'success': True, 'report': json.loads(report.read_text())})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid matrix report: {e}'})
+
+@app.route('/get_manifest')
+def get_manifest():
+    """Manifest of a BKC package: ?path=<bkc dir> (default: last generated), &entries=1, &build=1.
+
+    Only known BKC packages are served (see known_bkc_paths). build=1 queues a
+    job that writes a missing manifest and returns it; poll again once it is done.
+    """
+    bkc_path = request.args.get('path') or current_bkc_path()
+    if not bkc_path:
+        return jsonify({'success': False, 'message': 'No BKC package generated yet'})
+    if os.path.realpath(bkc_path) not in known_bkc_paths():
+        return jsonify({'success': False, 'message': f'Not a known BKC package: {bkc_path}'}), 403
+    import bkc_manifest
+    manifest = bkc_manifest.manifest_path_for(bkc_path)
+    try:
+        if not manifest.exists():
+            if request.args.get('build') != '1':
+                return jsonify({'success': False, 'message': f'No manifest for {bkc_path} (use build=1 to create it)'})
+            job = next((job for job in list(scheduler.pending) + scheduler.running_jobs()
+                        if job.target is run_manifest_build and job.args == (bkc_path,)), None)
+            output_seq = output_queue.next
+            if not job:
+                job = new_manifest_job(bkc_path, request_user(request.args))
+                output_seq = submit_job(job)
+            return jsonify({'success': False, 'building': True, 'job_id': job.id, 'state': job.state,
+                            'output_seq': output_seq, 'bkc_path': bkc_path,
+                            'message': f'Building the manifest for {bkc_path} (job #{job.id})'}), 202
+        result = bkc_manifest.read_manifest(manifest, with_entries=request.args.get('entries') == '1')
+        result['success'] = True
+        result['bkc_path'] = bkc_path
+        return jsonify(result)
+    except (OSError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+def known_bkc_paths():
+    """Real paths of the BKC packages the configs point at: .last_bkc_path of their
+    tree and ZERO_CONFIG_PATH (absolute paths only), for the global config and every
+    registry config"""
+    confs = [read_full_config_dict()] + [entry['values'] for entry in config_registry.scan()]
+    paths = set()
+    for conf in confs:
+        env_path = unquote(conf.get('ENV_PATH', ''))
+        last_bkc = Path(env_path) / '.last_bkc_path' if env_path else None
+        try:
+            if last_bkc and last_bkc.is_file():
+                paths.add(last_bkc.read_text().strip())
+        except OSError:
+            pass
+        paths.add(unquote(conf.get('ZERO_CONFIG_PATH', '')))
+    return {os.path.realpath(path) for path in paths if os.path.isabs(path)}
+
+def current_bkc_path():
+    """BKC directory of the last generate step (.last_bkc_path, falling back to ZERO_CONFIG_PATH)"""
+    conf = read_full_config_dict()
+    env_path = unquote(conf.get('ENV_PATH', ''))
+    last_bkc = Path(env_path) / '.last_bkc_path' if env_path else None
+    if last_bkc and last_bkc.exists():
+        return last_bkc.read_text().strip()
+    return unquote(conf.get('ZERO_CONFIG_PATH', ''))
+
+@app.route('/jobs')
+def list_jobs():
+    snapshot = scheduler.snapshot()
+    snapshot['history'] = job_store.recent()
+    # Who holds the trees of queued and running jobs (also runs outside this server)
+    trees = {job['tree'] for job in snapshot['running'] + snapshot['pending'] if job['tree']}
+    snapshot['tree_locks'] = {tree: holders(tree) for tree in trees}
+    return jsonify(snapshot)
+
+@app.route('/health')
+def health_status():
+    """Reachability of every setup and AVPC in the configs, as last probed"""
+    return jsonify({'policy': HEALTH_POLICY, 'interval': health.interval, 'ttl': health.ttl,
+                    'targets': health.snapshot()})
+
+@app.route('/health/check', methods=['POST'])
+def health_check_now():
+    """Probe every target now instead of waiting for the next round"""
+    health.probe_all()
+    return health_status()
+
+@app.route('/gc')
+def gc_status():
+    """Reclaimed space, the last pass and the latest removals of the garbage collector"""
+    return jsonify(gc.snapshot())
+
+@app.route('/gc/run', methods=['POST'])
+def gc_run_now():
+    """Run a pass now; {"dry_run": true} only reports what it would remove (always
+    the case while WEB_GUI_GC_DRY_RUN is on)"""
+    data = request.get_json(silent=True) or {}
+    report = gc.run(dry_run=data.get('dry_run'))
+    return jsonify(dict(gc.snapshot(), report=report))
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """Profiler state; POST switches it: {"timing": bool, "sampling": bool,
+    "interval_ms": n, "seconds": n, "reset": bool} (all optional)"""
+    if request.remote_addr not in PROFILE_ALLOW:
+        return jsonify({'success': False, 'message': 'Profiling is not allowed from this address'}), 403
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            interval_ms = float(data.get('interval_ms') or 0) or None
+            seconds = float(data.get('seconds') or 0) or None
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'interval_ms and seconds must be numbers'}), 400
+        if data.get('reset'):
+            profiler.reset()
+        if 'timing' in data:
+            profiler.set_timing(data['timing'])
+        if data.get('sampling'):
+            profiler.start_sampling(interval_ms, seconds)
+        elif 'sampling' in data:
+            profiler.stop_sampling()
+    return jsonify(profiler.snapshot())
+
+@app.route('/admin/profile/stacks')
+def admin_profile_stacks():
+    """Sampled stacks in collapsed format (flamegraph.pl, speedscope); ?reset=1 clears them"""
+    if request.remote_addr not in PROFILE_ALLOW:
+        return jsonify({'success': False, 'message': 'Profiling is not allowed from this address'}), 403
+    return app.response_class(profiler.collapsed(reset=request.args.get('reset') == '1'), mimetype='text/plain')
+
+@app.route('/jobs/<int:job_id>')
+def job_details(job_id):
+    record = job_store.get(job_id)
+    if not record:
+        return jsonify({'success': False, 'message': f'Unknown job: {job_id}'}), 404
+    record['output'] = job_store.read_log(job_id, tail=request.args.get('tail', 200, type=int))
+    return jsonify(record)
+
+@app.route('/jobs/<int:job_id>/output')
+def job_output(job_id):
+    """Output of one job, from its log file, in the text format of /get_output.
+
+    ?offset=<byte> continues from the `next` of the previous response (0 to start),
+    ?wait=<ms> holds the request until output arrives, ?max_bytes caps the batch.
+    Unlike /get_output it never contains the output of other jobs.
+    """
+    record = job_store.get(job_id)
+    if not record:
+        return jsonify({'success': False, 'message': f'Unknown job: {job_id}'}), 404
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        wait = min(int(request.args.get('wait', 0)) / 1000, MAX_WAIT_SEC)
+        max_bytes = min(int(request.args.get('max_bytes', 0)) or MAX_BYTES, MAX_BYTES)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'offset, wait and max_bytes must be integers'}), 400
+    path = record['log_file']
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            size = os.path.getsize(path)
+        except (OSError, TypeError):
+            size = 0
+        if size > offset or time.monotonic() >= deadline:
+            break
+        time.sleep(0.1)
+    data = b''
+    if size > offset:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(max_bytes)
+        # Whole lines only, unless a single line is longer than the batch
+        end = data.rfind(b'\n') + 1
+        data = data[:end or len(data)]
+    lines = data.decode('utf-8', 'replace').split('\n') if data else []
+    if lines and lines[-1] == '':
+        lines.pop()
+    end = offset + len(data)
+    meta = {'first': offset, 'next': end, 'count': len(lines), 'more': end < size, 'dropped': 0,
+            'state': record['state']}
+    return app.response_class(encode(lines, meta, 'text'), mimetype=MIMETYPES['text'])
+
+def request_user(data):
+    return data.get('user') or request.remote_user or request.remote_addr or 'anonymous'
+
+def new_build_job(options, description, user, priority='normal', resumed_from=None, config_path=None):
+    """Create the durable record and the scheduler job for a build_automation.sh run.
+
+    config_path selects the config the run uses (default: the global config_file).
+    """
+    config_path = str(config_path or config_file)
+    resource_class = classify_options(options)
+    conf = read_full_config_dict(config_path)
+    tree = tree_path(conf.get('ENV_PATH'))
+    setup, avpc = deploy_target(options, conf)
+    job_id = job_store.create('build', options=options, description=description,
+                              config_file=config_path, user=user, priority=priority,
+                              resource_class=resource_class, tree=tree, resumed_from=resumed_from)
+    return Job(run_command, args=(options, description, config_path), description=description,
+               resource_class=resource_class, user=user, priority=priority, tree=tree,
+               tree_mode=lock_mode(options), setup=setup, avpc=avpc, job_id=job_id)
+
+def tree_path(env_path):
+    """Real path of an ENV_PATH value, so jobs on the same tree compare equal (None without one)"""
+    env_path = unquote(env_path or '')
+    return os.path.realpath(env_path) if env_path else None
+
+def deploy_target(options, conf):
+    """(SETUP_NAME, AVPC_IP) of a job that deploys or installs, (None, None) otherwise"""
+    if not {'-d', '-i'} & set(step_flags(options)):
+        return None, None
+    return unquote(conf.get('SETUP_NAME', '')) or None, unquote(conf.get('AVPC_IP', '')) or None
+
+def new_env_job(env_type, dest_path, user, priority='normal'):
+    description = f"Create {env_type} Environment"
+    job_id = job_store.create('env', args=(env_type, dest_path), description=description,
+                              user=user, priority=priority, resource_class='clone')
+    return Job(run_env_creation, args=(env_type, dest_path), description=description,
+               resource_class='clone', user=user, priority=priority, job_id=job_id)
+
+def new_manifest_job(bkc_path, user, priority='normal'):
+    description = f"Build manifest of {bkc_path}"
+    job_id = job_store.create('manifest', args=(bkc_path,), description=description,
+                              user=user, priority=priority, resource_class='generate')
+    return Job(run_manifest_build, args=(bkc_path,), description=description,
+               resource_class='generate', user=user, priority=priority, job_id=job_id)
+
+def submit_job(job):
+    """Hand a job to the scheduler, returns the output sequence its log starts at.
+
+    A fresh log is started when nothing else is queued.
+    """
+    if not scheduler.has_active():
+        output_queue.clear()
+    output_seq = output_queue.next
+    scheduler.submit(job)
+    reason = job.state == 'pending' and scheduler.held(job)
+    if reason:
+        output_queue.put(color_text(f"⏳ Queued: {job.description} (job #{job.id}) - {reason}", 'yellow'))
+    elif job.state == 'pending' and scheduler.running_jobs():
+        output_queue.put(color_text(f"⏳ Queued: {job.description} (job #{job.id}, {job.resource_class}) - waiting for capacity", 'yellow'))
+    return output_seq
+
+def record_job_state(job):
+    """Scheduler listener: mirror job state changes into the job store"""
+    job_store.update(job.id, state=job.state, started_at=job.started_at, finished_at=job.finished_at)
+
+scheduler.add_listener(record_job_state)
+
+def recover_jobs():
+    """Resubmit jobs that were queued or running when the server last stopped"""
+    for record, options in job_store.recover():
+        if record['kind'] == 'build':
+            if record['state'] == 'pending':
+                setup, avpc = deploy_target(options, read_full_config_dict(record['config_file']))
+                job = Job(run_command, args=(options, record['description'], record['config_file']),
+                          description=record['description'],
+                          resource_class=record['resource_class'], user=record['user'],
+                          priority=record['priority'], tree=tree_path(record['tree']), tree_mode=lock_mode(options),
+                          setup=setup, avpc=avpc, job_id=record['id'])
+            else:
+                description = f"{record['description']} (resumed from job #{record['id']})"
+                job = new_build_job(options, description, record['user'], record['priority'],
+                                    resumed_from=record['id'], config_path=record['config_file'])
+                print(f"Resuming job #{record['id']} as job #{job.id}: {options}")
+        elif record['kind'] == 'manifest':
+            job = Job(run_manifest_build, args=tuple(record['args']), description=record['description'],
+                      resource_class='generate', user=record['user'], priority=record['priority'],
+                      job_id=record['id'])
+        else:
+            job = Job(run_env_creation, args=tuple(record['args']), description=record['description'],
+                      resource_class='clone', user=record['user'], priority=record['priority'],
+                      job_id=record['id'])
+        submit_job(job)
 
 @app.route('/get_output')
 def get_output():
-    global is_running
-    output_lines = []
-    while not output_queue.empty():
-        output_lines.append(output_queue.get())
+    """New output and run status.
+
+    ?since=<seq> returns the lines from that sequence on (every viewer sees every
+    line; without it lines are handed out once, to whichever viewer asks first).
+    ?format=json|text|binary selects the wire format (see build_output.py),
+    ?wait=<ms> holds the request until output arrives, ?max_bytes caps the batch.
+    """
+    fmt = request.args.get('format', 'json')
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'message': f'Unknown format: {fmt}'}), 400
+    try:
+        since = int(request.args['since']) if 'since' in request.args else None
+        wait = int(request.args.get('wait', 0)) / 1000
+        max_bytes = int(request.args.get('max_bytes', 0)) or None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'since, wait and max_bytes must be integers'}), 400
+    
+    # Checked before reading: once no job is active, all of its output is in the log
+    active = scheduler.has_active()
+    lines, meta = output_queue.read(since, max_bytes=max_bytes, wait=wait if active else 0)
     
     stopped = False
     if current_process and hasattr(current_process, 'stopped'):
         stopped = current_process.stopped
     
-    return jsonify({
-        'output': output_lines,
-        'finished': not is_running,
+    meta.update({
+        'finished': not active,
         'success': getattr(current_process, 'returncode', 0) == 0 if current_process else False,
         'stopped': stopped,
-        'status': 'Ready' if not is_running else 'Running...',
+        'status': 'Ready' if not active else 'Running...',
         'description': getattr(current_process, 'description', ''),
         'current_command': current_command,
-        'current_command_plain': current_command_plain
+        'current_command_plain': current_command_plain,
+        'ccache': last_ccache_stats
     })
+    response = app.response_class(encode(lines, meta, fmt), mimetype=MIMETYPES[fmt])
+    response.headers['X-Output-Next'] = str(meta['next'])
+    return response
 
 @app.route('/stop_execution', methods=['POST'])
 def stop_execution():
-    global current_process, is_running
     try:
-        if current_process and is_running:
+        if scheduler.has_active():
             output_queue.put('')
             output_queue.put('⏹ Stopping execution...')
-            current_process.stopped = True
-            current_process.terminate()
-            import time
-            time.sleep(1)
-            if current_process.poll() is None:
-                current_process.kill()
+            for job in scheduler.cancel_pending():
+                output_queue.put(f'⏹ Cancelled queued job #{job.id}: {job.description}')
+            for job in scheduler.running_jobs():
+                proc = job.process
+                if proc is None:
+                    continue
+                proc.stopped = True
+                signal_process_group(proc, signal.SIGTERM)
+                time.sleep(1)
+                if proc.poll() is None:
+                    signal_process_group(proc, signal.SIGKILL)
             output_queue.put('⏹ Execution stopped by user')
             return jsonify({'success': True, 'message': 'Execution stopped'})
         else:
@@ -690,12 +835,25 @@ def stop_execution():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+def signal_process_group(proc, sig):
+    # Runners start in their own session so the whole build tree is signalled
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def format_ccache_stats(stats):
+    if not stats:
+        return '—'
+    return f"{stats.get('hits', 0)} hits / {stats.get('misses', 0)} misses ({stats.get('hit_rate', 0)}%), {stats.get('size_mb', 0)} MB"
+
 def load_config():
     config_data = {
         'config_file': str(config_file.name),
         'project_name': 'N/A',
         'build_type': 'N/A',
-        'zero_config_path': ''
+        'zero_config_path': '',
+        'ccache_stats': format_ccache_stats(last_ccache_stats)
     }
     try:
         if config_file.exists():
@@ -717,11 +875,12 @@ def load_config():
     return config_data
 
 
-def read_full_config_dict():
+def read_full_config_dict(path=None):
     data = {}
+    path = Path(path or config_file)
     try:
-        if config_file.exists():
-            with open(config_file, 'r') as f:
+        if path.exists():
+            with open(path, 'r') as f:
                 for line in f:
                     line = line.strip()
                     if line and not line.startswith('#') and '=' in line:
@@ -732,27 +891,53 @@ def read_full_config_dict():
     return data
 
 
-def write_full_config_dict(conf):
+def write_full_config_dict(values):
+    """Set keys of the global config, after a backup of the file"""
     try:
         if config_file.exists():
             backup_file = config_file.parent / f"{config_file.name}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             shutil.copy2(config_file, backup_file)
-        with open(config_file, 'w') as f:
-            f.write("# Build Configuration File\n\n")
-            for key in ['APP_ROOT', 'PROJECT_NAME', 'SETUP_NAME', 'ENV_PATH', 'ZERO_CONFIG_PATH', 'BUILD_TYPE', 'HW_APP', 'OUTPUT_BASE', 'AVPC_IP', 'AVPC_PASSWORD']:
-                f.write(f"{key}={conf.get(key, '')}\n\n")
+        write_config_entries(values)
     except Exception:
         pass
 
 
-def run_command(options, description):
-    global current_process, is_running, current_command, current_command_plain
-    is_running = True
+def write_config_entries(values):
+    """Set keys of the global config in place, keeping its other lines (comments, other settings)"""
+    text = config_file.read_text() if config_file.exists() else "# Build Configuration File\n\n"
+    config_file.write_text(update_text(text, values))
+
+
+def read_events(fd, tracker):
+    """Feed the NDJSON events of a build_automation.sh run to its StepTracker"""
+    with os.fdopen(fd, 'r', errors='replace') as events:
+        for line in events:
+            try:
+                tracker.event(json.loads(line))
+            except ValueError:
+                continue
+
+
+def run_command(options, description, config_path=None, job=None):
+    global current_process, current_command, current_command_plain, last_ccache_stats
+    import subprocess, shlex
+    process = None
     output_queue.put("")
     output_queue.put("=" * 60)
     output_queue.put(color_text(f"Executing: {description}", 'cyan'))
-    output_queue.put(color_text(f"Config: {config_file}", 'blue'))
-    cmd = [str(build_script), "-c", str(config_file)] + options.split()
+    config_path = config_path or str(config_file)
+    output_queue.put(color_text(f"Config: {config_path}", 'blue'))
+    if job and job.setup and HEALTH_POLICY != 'off':
+        # Fail fast: find out the target is down now, not after the build
+        password = unquote(read_full_config_dict(config_path).get('AVPC_PASSWORD', ''))
+        reason = health.check(job.setup, job.avpc, password)
+        if reason and HEALTH_POLICY == 'fail':
+            output_queue.put(color_text(f"✗ Not starting: {reason} (WEB_GUI_HEALTH_POLICY=fail)", 'red'))
+            job.state, job.error = 'failed', reason
+            return
+        if reason:
+            output_queue.put(color_text(f"⚠ {reason}, deploy/install will likely fail", 'yellow'))
+    cmd = [str(build_script), "-c", config_path] + options.split()
     cmd_str = ' '.join(shlex.quote(x) for x in cmd)
     # log and display the exact shell command
     log_shell_command(cmd_str)
@@ -760,68 +945,117 @@ def run_command(options, description):
     output_queue.put("=" * 60)
     output_queue.put("")
     
+    tracker = StepTracker(job_store, job.id) if job else None
+    log = None
+    events_reader = None
+    
     try:
-        current_process = subprocess.Popen(
+        if job:
+            # Line buffered: /jobs/<id>/output follows the file while the job runs
+            log = open(job_store.get(job.id)['log_file'], 'a', buffering=1)
+            log.write(f"$ {cmd_str}\n")
+        pass_fds = ()
+        if tracker and USE_EVENTS:
+            # The event stream gets its own pipe, added after the displayed command
+            events_r, events_w = os.pipe()
+            cmd.append(f"--events={events_w}")
+            pass_fds = (events_w,)
+        process = current_process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             universal_newlines=True,
-            bufsize=1
+            bufsize=1,
+            start_new_session=True,
+            pass_fds=pass_fds
         )
-        current_process.description = description
-        current_process.stopped = False
+        if pass_fds:
+            os.close(events_w)
+            events_reader = threading.Thread(target=read_events, args=(events_r, tracker), daemon=True)
+            events_reader.start()
+        process.description = description
+        process.stopped = False
+        if job:
+            job.process = process
+            job_store.update(job.id, pid=process.pid)
         
-        for line in current_process.stdout:
+        for line in process.stdout:
             # Pass through subprocess output (may contain its own ANSI colors)
-            output_queue.put(line.rstrip())
-            if hasattr(current_process, 'stopped') and current_process.stopped:
+            line = line.rstrip()
+            output_queue.put(line)
+            if log:
+                log.write(line + "\n")
+                if not events_reader:
+                    tracker.feed(line)
+                if tracker.ccache:
+                    last_ccache_stats = tracker.ccache
+            if hasattr(process, 'stopped') and process.stopped:
                 break
         
-        current_process.wait()
+        process.wait()
+        if events_reader:
+            # The pipe closes when the script exits; its last events are in
+            events_reader.join(timeout=5)
+            if tracker.ccache:
+                last_ccache_stats = tracker.ccache
+        if tracker:
+            tracker.finish(process.returncode == 0)
+            job_store.update(job.id, returncode=process.returncode)
         
-        if hasattr(current_process, 'stopped') and current_process.stopped:
+        if hasattr(process, 'stopped') and process.stopped:
             output_queue.put("")
             output_queue.put(color_text(f"⏹ {description} was stopped by user", 'yellow'))
             output_queue.put("")
-        elif current_process.returncode == 0:
+        elif process.returncode == 0:
             output_queue.put("")
             output_queue.put(color_text(f"✓ {description} completed successfully!", 'green'))
             output_queue.put("")
             # If this was a generate invocation and it succeeded, try to read the canonical bkc path
             if '-g' in options.split():
                 try:
-                    conf = read_full_config_dict()
-                    env_path = conf.get('ENV_PATH') or conf.get('env_path') or ''
-                    if env_path:
+                    # The job's own config: a registry config never changes the default one
+                    conf = read_full_config_dict(config_path)
+                    env_path = unquote(conf.get('ENV_PATH') or conf.get('env_path') or '')
+                    # The bkc artifact event names the package; fall back to the script's record
+                    bkc_path = tracker.artifacts.get('bkc') if tracker else None
+                    if not bkc_path and env_path:
                         last_bkc = Path(env_path) / '.last_bkc_path'
                         if last_bkc.exists():
                             bkc_path = last_bkc.read_text().strip()
-                            if bkc_path:
-                                conf['ZERO_CONFIG_PATH'] = bkc_path
-                                write_full_config_dict(conf)
-                                output_queue.put(color_text(f"Saved ZERO_CONFIG_PATH: {bkc_path}", 'green'))
+                    if bkc_path:
+                        if Path(config_path).resolve() == config_file.resolve():
+                            write_full_config_dict({'ZERO_CONFIG_PATH': bkc_path})
+                        else:
+                            result = config_registry.bulk_update([config_name(config_path)],
+                                                                 {'ZERO_CONFIG_PATH': bkc_path})[0]
+                            if not result['success']:
+                                raise RuntimeError(result['message'])
+                        output_queue.put(color_text(f"Saved ZERO_CONFIG_PATH: {bkc_path} ({config_name(config_path)})", 'green'))
                 except Exception as e:
                     output_queue.put(color_text(f"✗ Failed to save ZERO_CONFIG_PATH: {str(e)}", 'red'))
                 output_queue.put("")
         else:
             output_queue.put("")
-            output_queue.put(color_text(f"✗ {description} failed with exit code {current_process.returncode}", 'red'))
+            output_queue.put(color_text(f"✗ {description} failed with exit code {process.returncode}", 'red'))
             output_queue.put("")
     except Exception as e:
         output_queue.put("")
         output_queue.put(color_text(f"✗ Error: {str(e)}", 'red'))
         output_queue.put("")
-        if current_process:
-            current_process.returncode = 1
+        if process:
+            process.returncode = 1
     finally:
+        if log:
+            log.close()
         # clear current command when done
         current_command = ''
         current_command_plain = ''
-        is_running = False
+        finish_job(job, process)
 
-def run_env_creation(env_type, dest_path):
-    global current_process, is_running, current_command, current_command_plain
-    is_running = True
+def run_env_creation(env_type, dest_path, job=None):
+    global current_process, current_command, current_command_plain
+    import subprocess, shlex
+    process = None
     output_queue.put("")
     output_queue.put("=" * 60)
     output_queue.put(f"Creating {env_type} Environment")
@@ -832,7 +1066,6 @@ def run_env_creation(env_type, dest_path):
         # Validate destination path
         if not dest_path:
             output_queue.put("✗ Destination path is required")
-            is_running = False
             return
         
         dest_root = Path(dest_path).expanduser().resolve()
@@ -874,7 +1107,6 @@ def run_env_creation(env_type, dest_path):
             branch = 'bundle_master'
         else:
             output_queue.put(f"✗ Unknown environment type: {env_type}")
-            is_running = False
             return
 
         output_queue.put(f"Repository: {repo_url}")
@@ -890,7 +1122,7 @@ def run_env_creation(env_type, dest_path):
         log_shell_command(cmd_str)
         output_queue.put(color_text(f"CWD: {clone_path}", 'magenta'))
         
-        current_process = subprocess.Popen(
+        process = current_process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
@@ -898,47 +1130,125 @@ def run_env_creation(env_type, dest_path):
             bufsize=1,
             cwd=str(clone_path)
         )
-        current_process.description = f"Create {env_type} Environment"
-        current_process.stopped = False
+        process.description = f"Create {env_type} Environment"
+        process.stopped = False
+        if job:
+            job.process = process
         
-        for line in current_process.stdout:
+        for line in process.stdout:
             output_queue.put(line.rstrip())
-            if hasattr(current_process, 'stopped') and current_process.stopped:
+            if hasattr(process, 'stopped') and process.stopped:
                 break
         
-        current_process.wait()
+        process.wait()
         
-        if hasattr(current_process, 'stopped') and current_process.stopped:
+        if hasattr(process, 'stopped') and process.stopped:
             output_queue.put("")
             output_queue.put(f"⏹ Environment creation was stopped by user")
             output_queue.put("")
-        elif current_process.returncode == 0:
+        elif process.returncode == 0:
             output_queue.put("")
             output_queue.put(f"✓ {env_type} environment created successfully!")
             output_queue.put(f"Location: {clone_path}")
             output_queue.put("")
         else:
             output_queue.put("")
-            output_queue.put(f"✗ Environment creation failed with exit code {current_process.returncode}")
+            output_queue.put(f"✗ Environment creation failed with exit code {process.returncode}")
             output_queue.put("")
     except Exception as e:
         output_queue.put("")
         output_queue.put(f"✗ Error: {str(e)}")
         output_queue.put("")
-        if current_process:
-            current_process.returncode = 1
+        if process:
+            process.returncode = 1
     finally:
         # clear current command when done
         current_command = ''
         current_command_plain = ''
-        is_running = False
+        finish_job(job, process)
+
+def run_manifest_build(bkc_path, job=None):
+    """Hash a BKC package and write its manifest (scheduler target of /get_manifest?build=1)"""
+    import bkc_manifest
+    log = open(job_store.get(job.id)['log_file'], 'a', buffering=1) if job else None
+
+    def put(line):
+        output_queue.put(line)
+        if log:
+            log.write(line + "\n")
+
+    put(f"Building the manifest of {bkc_path}")
+    try:
+        bkc_manifest.build_manifest(bkc_path, log=put)
+    except (OSError, ValueError) as e:
+        put(f"✗ Manifest failed: {e}")
+        raise
+    finally:
+        if log:
+            log.close()
+
+def finish_job(job, process):
+    """Record the outcome of a finished runner on its scheduler job"""
+    if job is None:
+        return
+    if process is None or process.returncode is None:
+        job.state = 'failed'
+    elif getattr(process, 'stopped', False):
+        job.state = 'stopped'
+    elif process.returncode != 0:
+        job.state = 'failed'
+    else:
+        job.state = 'finished'
 
 def signal_handler(sig, frame):
     print('\n\nShutting down server...')
     sys.exit(0)
 
+def process_age_ms():
+    """Milliseconds since this process started (Linux), None when unknown"""
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        return round((uptime - start_ticks / os.sysconf('SC_CLK_TCK')) * 1000, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def startup_report():
+    """Startup time per phase against WEB_GUI_STARTUP_BUDGET_MS"""
+    budget = int(os.environ.get('WEB_GUI_STARTUP_BUDGET_MS', '') or 1500)
+    total = round((time.perf_counter() - STARTUP_T0) * 1000, 1)
+    return {'total_ms': total, 'process_age_ms': process_age_ms(), 'budget_ms': budget,
+            'over_budget': total > budget, 'phases': dict(startup_phases)}
+
+def print_startup_report(report):
+    print(f"Startup: {report['total_ms']} ms in the server, {report['process_age_ms']} ms since process start "
+          f"(budget {report['budget_ms']} ms)")
+    for phase, ms in report['phases'].items():
+        print(f"  {phase:<22} {ms:>8} ms")
+    if report['over_budget']:
+        print(f"WARNING: startup took {report['total_ms']} ms, over the {report['budget_ms']} ms budget")
+
+startup_info = None
+
+@app.route('/startup')
+def startup():
+    return jsonify(startup_info)
+
 if __name__ == '__main__':
     signal.signal(signal.SIGINT, signal_handler)
+    _t = time.perf_counter()
+    recover_jobs()
+    last_ccache_stats = next((r['ccache'] for r in job_store.recent() if r['ccache']), None)
+    _t = startup_phase('recover jobs', _t)
+    health.start()
+    _t = startup_phase('start health prober', _t)
+    gc.start()
+    _t = startup_phase('start garbage collector', _t)
+    profiler.set_timing(PROFILE_ENABLED)
+    startup_info = startup_report()
+    print_startup_report(startup_info)
     print("\n" + "=" * 60)
     print("Build Automation Web GUI")
     print("=" * 60)
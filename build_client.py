@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+Build Server Client
+HTTP client of the web GUI job engine (build_automation_web_gui.py).
+
+Used by the Tk GUI in client mode: jobs are submitted to the server's
+scheduler instead of started locally, so there is one queue and one
+execution engine for every front end, and the server keeps two builds off
+the same ENV_PATH. A job's output is followed from its own log
+(/jobs/<id>/output, the long-poll text format of build_output.py), so the
+output of other jobs never shows up in it.
+"""
+
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from build_output import decode
+
+
+DEFAULT_URL = 'http://localhost:8080'
+# Job states after which nothing more happens to a job
+DONE_STATES = ('finished', 'failed', 'stopped', 'cancelled', 'interrupted', 'resumed')
+
+
+class ServerError(Exception):
+    pass
+
+
+class BuildServerClient:
+    def __init__(self, url=None, timeout=10):
+        self.url = (url or DEFAULT_URL).rstrip('/')
+        self.timeout = timeout
+
+    def request(self, path, data=None, params=None, timeout=None):
+        """Response body of a GET (or a JSON POST when data is given), as bytes"""
+        url = self.url + path
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        body = headers = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers = {'Content-Type': 'application/json'}
+        req = urllib.request.Request(url, data=body, headers=headers or {})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout or self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            # The API answers errors with {"success": false, "message": ...}
+            try:
+                message = json.loads(e.read()).get('message') or str(e)
+            except ValueError:
+                message = str(e)
+            raise ServerError(message) from None
+        except (urllib.error.URLError, OSError) as e:
+            raise ServerError(f"cannot reach {self.url}: {getattr(e, 'reason', e)}") from None
+
+    def get_json(self, path, params=None):
+        return json.loads(self.request(path, params=params))
+
+    def post_json(self, path, data):
+        result = json.loads(self.request(path, data=data))
+        if not result.get('success', True):
+            raise ServerError(result.get('message', 'request failed'))
+        return result
+
+    def submit(self, options, description, config=None, user=None, priority='normal'):
+        """Submit a build job, returns the /execute response (job_id, output_seq, state)"""
+        data = {'options': options, 'description': description, 'priority': priority}
+        if config:
+            data['config'] = config
+        if user:
+            data['user'] = user
+        return self.post_json('/execute', data)
+
+    def job(self, job_id):
+        return self.get_json(f'/jobs/{job_id}', params={'tail': 1})
+
+    def read_output(self, job_id, offset, wait_ms=1000):
+        """One long-poll read of a job's log from byte `offset`, returns (lines, meta)"""
+        data = self.request(f'/jobs/{job_id}/output', params={'offset': offset, 'wait': wait_ms},
+                            timeout=self.timeout + wait_ms / 1000)
+        return decode(data, 'text')
+
+    def follow(self, job_id, on_lines, should_stop=None):
+        """Pass a job's output to on_lines(lines) until the job is done (or
+        should_stop() is true), returns the final job record"""
+        offset = 0
+        while True:
+            lines, meta = self.read_output(job_id, offset)
+            if lines:
+                on_lines(lines)
+            offset = meta['next']
+            if meta['more']:
+                continue
+            record = self.job(job_id)
+            if record['state'] in DONE_STATES or (should_stop and should_stop()):
+                # The runner writes all of its output before the job changes state
+                lines, meta = self.read_output(job_id, offset, wait_ms=0)
+                while lines:
+                    on_lines(lines)
+                    lines, meta = self.read_output(job_id, meta['next'], wait_ms=0)
+                return record
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+"""
+Build Config Registry
+Index of the build configurations (*.cfg) under one directory.
+
+Every *.cfg under BUILD_CONFIG_DIR (default: the script directory, searched
+BUILD_CONFIG_DEPTH levels deep, hidden directories skipped) is parsed and
+validated once; the result is cached until the file's mtime or size changes,
+so listing dozens of configs costs a stat per file.
+
+A config is named by its path relative to the registry directory
+("build_config.cfg", "teams/cv/setup3.cfg"). Any config in the registry can be
+the target of a build job, and bulk edits rewrite the selected files in
+place (comments and order kept, new keys appended) with an atomic replace.
+"""
+
+import fnmatch
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+
+# What build_automation.sh refuses to run without
+REQUIRED_KEYS = ('APP_ROOT', 'PROJECT_NAME', 'ENV_PATH')
+BUILD_TYPES = ('HW', 'SW')
+# Fields shown in listings, next to the name and validation result
+SUMMARY_KEYS = ('PROJECT_NAME', 'BUILD_TYPE', 'HW_APP', 'SETUP_NAME', 'AVPC_IP', 'ENV_PATH')
+# Never returned by the API
+SECRET_KEYS = ('AVPC_PASSWORD',)
+
+
+def parse_config(text):
+    """KEY=VALUE lines of a config file as a dict, raw values (quotes kept)"""
+    values = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#') and '=' in line:
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip()
+    return values
+
+
+def unquote(value):
+    """Value as the shell sees it for the simple quoting used in configs"""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1]
+    return value
+
+
+def validate(values):
+    """List of problems that would stop build_automation.sh (or make it guess)"""
+    errors = [f"{key} not defined" for key in REQUIRED_KEYS if not unquote(values.get(key, ''))]
+    build_type = unquote(values.get('BUILD_TYPE', ''))
+    if build_type and build_type not in BUILD_TYPES:
+        errors.append(f"BUILD_TYPE must be one of {', '.join(BUILD_TYPES)}, not {build_type}")
+    return errors
+
+
+def update_text(text, set_values=None, unset=()):
+    """Config text with keys set (in place, or appended) and unset keys removed"""
+    set_values = dict(set_values or {})
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#') and '=' in stripped:
+            key = stripped.split('=', 1)[0].strip()
+            if key in unset:
+                continue
+            if key in set_values:
+                line = f"{key}={set_values.pop(key)}"
+        lines.append(line)
+    if set_values:
+        if lines and lines[-1].strip():
+            lines.append('')
+        lines.extend(f"{key}={value}" for key, value in set_values.items())
+    return '\n'.join(lines) + '\n'
+
+
+class ConfigRegistry:
+    """Cached, validated view of the *.cfg files under one directory"""
+
+    def __init__(self, root=None, depth=None):
+        self.root = Path(root or os.environ.get('BUILD_CONFIG_DIR') or Path(__file__).parent).absolute()
+        self.depth = depth if depth is not None else int(os.environ.get('BUILD_CONFIG_DEPTH', '') or 3)
+        self.cache = {}  # name -> entry, reused while (mtime_ns, size) match
+        self.lock = threading.Lock()
+
+    def paths(self):
+        """(name, path) of every config under the root"""
+        found = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            rel = Path(dirpath).relative_to(self.root)
+            level = len(rel.parts)
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and level + 1 < self.depth)
+            for filename in sorted(fnmatch.filter(filenames, '*.cfg')):
+                found.append(((rel / filename).as_posix(), Path(dirpath) / filename))
+        return found
+
+    def scan(self):
+        """Entries of every config, parsing only files that changed since the last scan"""
+        with self.lock:
+            entries, seen = [], set()
+            for name, path in self.paths():
+                entry = self._load(name, path)
+                if entry:
+                    entries.append(entry)
+                    seen.add(name)
+            for name in set(self.cache) - seen:
+                del self.cache[name]
+            return entries
+
+    def _load(self, name, path):
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = self.cache.get(name)
+        if entry and entry['stamp'] == stamp:
+            return entry
+        try:
+            values = parse_config(path.read_text(errors='replace'))
+            errors = validate(values)
+        except OSError as e:
+            values, errors = {}, [f"unreadable: {e}"]
+        entry = {'name': name, 'path': str(path), 'stamp': stamp, 'mtime': st.st_mtime,
+                 'values': values, 'errors': errors}
+        self.cache[name] = entry
+        return entry
+
+    def get(self, name):
+        """Entry of one config by name, None when it is not in the registry"""
+        path = self.resolve(name)
+        if not path:
+            return None
+        with self.lock:
+            return self._load(path.relative_to(self.root).as_posix(), path)
+
+    def load(self, path):
+        """Entry of a config file given by path, inside the registry or not"""
+        path = Path(path).absolute()
+        try:
+            name = path.relative_to(self.root).as_posix()
+        except ValueError:
+            name = str(path)
+        with self.lock:
+            return self._load(name, path)
+
+    def resolve(self, name):
+        """Path of a config by name; names outside the registry resolve to None"""
+        if not name:
+            return None
+        path = (self.root / name).resolve()
+        if path.suffix != '.cfg' or not path.is_file() or self.root.resolve() not in path.parents:
+            return None
+        # Resolve through the root as given so names stay relative to it
+        return self.root / path.relative_to(self.root.resolve())
+
+    def query(self, filters=None, text=None, valid=None):
+        """Entries matching every KEY=pattern filter (fnmatch, on unquoted values),
+        containing `text` in the name or any value, and valid/invalid if asked"""
+        matches = []
+        for entry in self.scan():
+            values = entry['values']
+            if valid is not None and (not entry['errors']) != valid:
+                continue
+            if filters and not all(fnmatch.fnmatchcase(unquote(values.get(key, '')), pattern)
+                                   for key, pattern in filters.items()):
+                continue
+            if text and text not in entry['name'] and not any(
+                    text in value for key, value in values.items() if key not in SECRET_KEYS):
+                continue
+            matches.append(entry)
+        return matches
+
+    def bulk_update(self, names, set_values=None, unset=(), dry_run=False):
+        """Apply the same edit to several configs, returns one result per name.
+
+        Files are rewritten through a temporary file and os.replace, so a
+        running build never sources a half-written config. An edit that would
+        make a valid config invalid is refused for that file.
+        """
+        results = []
+        for name in names:
+            path = self.resolve(name)
+            if not path:
+                results.append({'name': name, 'success': False, 'message': 'not in the registry'})
+                continue
+            try:
+                text = path.read_text()
+                new_text = update_text(text, set_values, unset)
+                before, after = validate(parse_config(text)), validate(parse_config(new_text))
+                if after and not before:
+                    results.append({'name': name, 'success': False, 'message': '; '.join(after)})
+                    continue
+                changed = new_text != text
+                if changed and not dry_run:
+                    self._replace(path, new_text)
+                results.append({'name': name, 'success': True, 'changed': changed, 'errors': after})
+            except OSError as e:
+                results.append({'name': name, 'success': False, 'message': str(e)})
+        return results
+
+    @staticmethod
+    def _replace(path, text):
+        fd, tmp = tempfile.mkstemp(prefix=f'.{path.name}.', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.chmod(tmp, path.stat().st_mode & 0o7777)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def summary(entry, full=False):
+    """API view of an entry: summary fields (or every value with full=True), secrets removed"""
+    values = entry['values']
+    shown = values if full else {key: values[key] for key in SUMMARY_KEYS if key in values}
+    return {'name': entry['name'], 'path': entry['path'], 'mtime': entry['mtime'],
+            'valid': not entry['errors'], 'errors': entry['errors'],
+            'values': {key: value for key, value in shown.items() if key not in SECRET_KEYS}}
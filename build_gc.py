@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+"""
+Build Garbage Collector
+Retention for what the workflow leaves on the shared disk.
+
+Collected, in groups that each keep their newest entries:
+    packages  $OUTPUT_BASE/$PROJECT_NAME/<PROJECT_NAME>_<timestamp> of every config
+    envs      AVM-<timestamp> / Bundle-<timestamp> clones in the destinations of
+              environment jobs (only with WEB_GUI_GC_ENVS=true)
+    backups   <file>.backup.<timestamp> next to AppConfig.sh, EpgConfig.sh and the configs
+
+Never collected: anything a config references (ZERO_CONFIG_PATH, ENV_PATH),
+the package a tree deploys next ($ENV_PATH/.last_bkc_path), a clone whose
+tree lock is held, and the newest WEB_GUI_GC_KEEP_LAST entries of a group.
+Beyond those, an entry goes when it is older than WEB_GUI_GC_MAX_AGE_DAYS,
+and the oldest entries go while the collected kinds take more than
+WEB_GUI_GC_MAX_TOTAL_GB or a filesystem has less than WEB_GUI_GC_MIN_FREE_GB
+free.
+
+It ships in dry-run mode: passes only report what they would remove
+until WEB_GUI_GC_DRY_RUN=false is set, review a few reports (dashboard or
+GET /gc) before switching it.
+
+Sizes are measured incrementally: a pass spends at most
+WEB_GUI_GC_SCAN_BUDGET_SEC walking entries it has not measured yet (or that
+changed) and continues in the next pass; the size policy counts what is
+measured so far.
+
+Settings (environment of the web GUI):
+    WEB_GUI_GC_INTERVAL_SEC    Seconds between passes (default: 3600, 0 disables the background collector)
+    WEB_GUI_GC_KEEP_LAST       Newest entries kept per group (default: 5)
+    WEB_GUI_GC_MAX_AGE_DAYS    Remove entries older than this (default: 30, 0 = no age limit)
+    WEB_GUI_GC_MAX_TOTAL_GB    Size cap of everything collectable (default: 0, no cap)
+    WEB_GUI_GC_MIN_FREE_GB     Free space to restore on a filesystem (default: 0, off)
+    WEB_GUI_GC_ENVS            Also collect environment clones (default: false)
+    WEB_GUI_GC_DRY_RUN         Only report what would be removed, also for passes started from
+                               the dashboard (default: true, false enables removal)
+    WEB_GUI_GC_SCAN_BUDGET_SEC Time a pass spends measuring sizes (default: 10)
+"""
+
+import collections
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from build_treelock import TreeBusy, TreeLock
+
+
+def _env_number(name, default):
+    try:
+        return type(default)(os.environ.get(name, '') or default)
+    except ValueError:
+        return default
+
+
+def _env_flag(name, default='false'):
+    return (os.environ.get(name) or default).lower() in ('1', 'true', 'yes', 'on')
+
+
+INTERVAL_SEC = _env_number('WEB_GUI_GC_INTERVAL_SEC', 3600)
+KEEP_LAST = _env_number('WEB_GUI_GC_KEEP_LAST', 5)
+MAX_AGE_DAYS = _env_number('WEB_GUI_GC_MAX_AGE_DAYS', 30.0)
+MAX_TOTAL_GB = _env_number('WEB_GUI_GC_MAX_TOTAL_GB', 0.0)
+MIN_FREE_GB = _env_number('WEB_GUI_GC_MIN_FREE_GB', 0.0)
+COLLECT_ENVS = _env_flag('WEB_GUI_GC_ENVS')
+DRY_RUN = _env_flag('WEB_GUI_GC_DRY_RUN', 'true')
+SCAN_BUDGET_SEC = _env_number('WEB_GUI_GC_SCAN_BUDGET_SEC', 10.0)
+
+GB = 1024 ** 3
+TIMESTAMP = r'\d{8}_\d{6}'
+ENV_CLONE = re.compile(rf'^(AVM|Bundle)-{TIMESTAMP}(-\d+)?$')
+BACKUP = re.compile(rf'^(.+)\.backup\.{TIMESTAMP}$')
+TREE_FILES = ('ME.Develop/BuildSys/AppConfig.sh', 'ME.Develop/BuildSys/EpgConfig.sh')
+
+
+def disk_usage(path):
+    """Bytes a file or directory tree takes on disk (symlinks not followed)"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return 0
+    total = st.st_blocks * 512
+    if not os.path.isdir(path) or os.path.islink(path):
+        return total
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        total += entry.stat(follow_symlinks=False).st_blocks * 512
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+class GarbageCollector:
+    """Periodic retention passes over packages, clones and backups.
+
+    `configs` is a callable returning (config path, values) pairs with
+    unquoted values, `env_roots` one returning the destinations of
+    environment jobs; both are read again every pass. `log` gets every
+    removal and error of the background passes.
+    """
+
+    def __init__(self, configs, env_roots=None, interval=None, log=print):
+        self.configs = configs
+        self.log = log
+        self.env_roots = env_roots or (lambda: [])
+        self.interval = INTERVAL_SEC if interval is None else interval
+        self.sizes = {}  # path -> (mtime_ns, bytes), kept between passes
+        self.lock = threading.Lock()  # one pass at a time
+        self.thread = None
+        self.reclaimed_bytes = 0
+        self.removed_count = 0
+        self.recent = collections.deque(maxlen=50)  # latest removals, newest last
+        self.last = None  # report of the last pass
+
+    def start(self):
+        """Start the background passes (no-op when the interval is 0)"""
+        if self.interval <= 0 or self.thread:
+            return
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.run()
+            except Exception as e:
+                self.log(f"Garbage collector error: {e}")
+            time.sleep(self.interval)
+
+    # ------------------------------------------------------------ scan
+
+    def candidates(self):
+        """Collectable entries as dicts (path, kind, group, mtime), and the protected paths"""
+        protected, groups, seen = set(), collections.defaultdict(list), set()
+
+        def add(kind, group, path):
+            # Configs sharing an output directory or tree list the same entries
+            if str(path) in seen:
+                return
+            seen.add(str(path))
+            try:
+                mtime = path.lstat().st_mtime
+            except OSError:
+                return
+            groups[(kind, group)].append({'path': str(path), 'kind': kind, 'group': group, 'mtime': mtime})
+
+        for config_path, values in self.configs():
+            for key in ('ZERO_CONFIG_PATH', 'ENV_PATH'):
+                if values.get(key):
+                    protected.add(os.path.abspath(values[key]))
+            env_path = values.get('ENV_PATH')
+            if env_path:
+                try:
+                    protected.add(os.path.abspath(Path(env_path, '.last_bkc_path').read_text().strip()))
+                except OSError:
+                    pass
+            project, output_base = values.get('PROJECT_NAME'), values.get('OUTPUT_BASE')
+            if project and output_base:
+                output_dir = Path(output_base, project)
+                package = re.compile(rf'^{re.escape(project)}_{TIMESTAMP}$')
+                for path in self._listdir(output_dir):
+                    if package.match(path.name) and path.is_dir():
+                        add('packages', str(output_dir), path)
+            files = [Path(config_path)] + ([Path(env_path, name) for name in TREE_FILES] if env_path else [])
+            for file in files:
+                for path in self._listdir(file.parent):
+                    match = BACKUP.match(path.name)
+                    if match and match.group(1) == file.name:
+                        add('backups', str(file), path)
+        if COLLECT_ENVS:
+            for root in set(self.env_roots()):
+                for path in self._listdir(Path(root).expanduser()):
+                    if ENV_CLONE.match(path.name) and path.is_dir():
+                        add('envs', str(root), path)
+        return groups, protected
+
+    @staticmethod
+    def _listdir(directory):
+        try:
+            return list(directory.iterdir())
+        except OSError:
+            return []
+
+    def _measure(self, entries, deadline):
+        """Fill in entry['size'] from the cache, measuring stale entries until the deadline"""
+        pending = 0
+        for entry in entries:
+            try:
+                stamp = os.lstat(entry['path']).st_mtime_ns
+            except OSError:
+                stamp = None
+            cached = self.sizes.get(entry['path'])
+            if cached and cached[0] == stamp:
+                entry['size'] = cached[1]
+            elif time.monotonic() < deadline:
+                entry['size'] = disk_usage(entry['path'])
+                self.sizes[entry['path']] = (stamp, entry['size'])
+            else:
+                entry['size'] = cached[1] if cached else None
+                pending += 1
+        return pending
+
+    # ------------------------------------------------------------ policy
+
+    def plan(self, groups, protected, now=None):
+        """Entries to remove and why, from the retention policies"""
+        now = now or time.time()
+        keep_last = max(KEEP_LAST, 0)
+        removable, plan = [], []
+        for entries in groups.values():
+            entries.sort(key=lambda entry: entry['mtime'], reverse=True)
+            for index, entry in enumerate(entries):
+                path = entry['path']
+                if index < keep_last or any(p == path or p.startswith(path + os.sep) for p in protected):
+                    continue
+                removable.append(entry)
+        removable.sort(key=lambda entry: entry['mtime'])
+
+        if MAX_AGE_DAYS > 0:
+            for entry in removable:
+                age_days = (now - entry['mtime']) / 86400
+                if age_days > MAX_AGE_DAYS:
+                    entry['reason'] = f"older than {MAX_AGE_DAYS:g} days"
+                    plan.append(entry)
+        left = [entry for entry in removable if 'reason' not in entry]
+
+        if MAX_TOTAL_GB > 0:
+            total = sum(entry['size'] or 0 for entries in groups.values() for entry in entries)
+            total -= sum(entry['size'] or 0 for entry in plan)
+            for entry in list(left):
+                if total <= MAX_TOTAL_GB * GB:
+                    break
+                entry['reason'] = f"total above {MAX_TOTAL_GB:g} GB"
+                plan.append(entry)
+                left.remove(entry)
+                total -= entry['size'] or 0
+
+        if MIN_FREE_GB > 0:
+            freed = collections.Counter()
+            for entry in plan:
+                freed[self._device(entry['path'])] += entry['size'] or 0
+            for entry in list(left):
+                device = self._device(entry['path'])
+                try:
+                    free = shutil.disk_usage(entry['path']).free + freed[device]
+                except OSError:
+                    continue
+                if free >= MIN_FREE_GB * GB:
+                    continue
+                entry['reason'] = f"less than {MIN_FREE_GB:g} GB free"
+                plan.append(entry)
+                left.remove(entry)
+                freed[device] += entry['size'] or 0
+        return plan
+
+    @staticmethod
+    def _device(path):
+        try:
+            return os.lstat(path).st_dev
+        except OSError:
+            return None
+
+    # ------------------------------------------------------------ passes
+
+    def run(self, dry_run=None):
+        """One pass: scan, measure within the budget, remove what the policies select.
+        Returns the report (also kept as self.last for the dashboard).
+        In dry-run mode (DRY_RUN) every pass is a dry run."""
+        dry_run = DRY_RUN or bool(dry_run)
+        with self.lock:
+            started = time.time()
+            groups, protected = self.candidates()
+            entries = [entry for group in groups.values() for entry in group]
+            pending = self._measure(entries, time.monotonic() + SCAN_BUDGET_SEC)
+            plan = self.plan(groups, protected, started)
+            removed, failed, reclaimed = [], [], 0
+            for entry in plan:
+                if entry['kind'] == 'envs' and not TreeLock(entry['path'], 'write').available():
+                    continue
+                if not dry_run:
+                    try:
+                        self._remove(entry)
+                    except TreeBusy:
+                        continue
+                    except OSError as e:
+                        failed.append(dict(entry, error=str(e)))
+                        continue
+                    self.sizes.pop(entry['path'], None)
+                    self.recent.append(dict(entry, removed_at=time.time()))
+                    self.log(f"GC removed {entry['path']} ({entry['reason']})")
+                removed.append(entry)
+                reclaimed += entry['size'] or 0
+            if not dry_run:
+                self.reclaimed_bytes += reclaimed
+                self.removed_count += len(removed)
+            totals = collections.defaultdict(lambda: {'count': 0, 'bytes': 0})
+            gone = {entry['path'] for entry in removed}
+            for entry in entries:
+                if entry['path'] in gone:
+                    continue
+                totals[entry['kind']]['count'] += 1
+                totals[entry['kind']]['bytes'] += entry['size'] or 0
+            report = {
+                'finished_at': time.time(),
+                'seconds': round(time.time() - started, 2),
+                'dry_run': dry_run,
+                'kinds': dict(totals),
+                'unmeasured': pending,
+                'removed': removed,
+                'failed': failed,
+                'reclaimed_bytes': reclaimed,
+            }
+            # A dry run asked for on the dashboard does not replace the last real pass
+            if not dry_run or DRY_RUN:
+                self.last = report
+            return report
+
+    @staticmethod
+    def _remove(entry):
+        path = entry['path']
+        if not os.path.isdir(path) or os.path.islink(path):
+            os.unlink(path)
+        elif entry['kind'] == 'envs':
+            # Hold the clone's lock so no build starts in it while it goes
+            with TreeLock(path, 'write', timeout=0, config='gc'):
+                shutil.rmtree(path)
+        else:
+            shutil.rmtree(path)
+
+    def snapshot(self):
+        """Totals since the server started, the last pass and the latest removals"""
+        return {
+            'enabled': self.interval > 0,
+            'interval_sec': self.interval,
+            'policy': {'keep_last': KEEP_LAST, 'max_age_days': MAX_AGE_DAYS, 'max_total_gb': MAX_TOTAL_GB,
+                       'min_free_gb': MIN_FREE_GB, 'envs': COLLECT_ENVS, 'dry_run': DRY_RUN},
+            'reclaimed_bytes': self.reclaimed_bytes,
+            'removed_count': self.removed_count,
+            'last': self.last,
+            'recent': list(reversed(self.recent)),
+        }
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+"""
+Build Setup Health
+Background prober of the setups (SETUP_NAME) and AVPCs (AVPC_IP) that the
+build configs deploy to.
+
+Every WEB_GUI_HEALTH_INTERVAL_SEC the prober runs `true` over SSH on each
+setup, and on each AVPC through its setup (the same hop deploy and install
+take), recording reachability and latency. Connections to the setups are
+pooled with an SSH ControlMaster that persists between rounds, so a round
+costs one round trip per setup instead of a full handshake. Results are
+cached for WEB_GUI_HEALTH_TTL_SEC; an older result counts as unknown.
+
+Settings (environment of the web GUI):
+    WEB_GUI_HEALTH_INTERVAL_SEC  Seconds between rounds (default: 60, 0 disables the prober)
+    WEB_GUI_HEALTH_TTL_SEC       Age after which a result is stale (default: 180)
+    WEB_GUI_HEALTH_SSH_TIMEOUT   SSH connect timeout of a probe (default: 5)
+    WEB_GUI_HEALTH_CONTROL_DIR   Directory of the ControlMaster sockets
+                                 (default: /tmp/bkc_health_<uid>)
+"""
+
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _env_number(name, default):
+    try:
+        return type(default)(os.environ.get(name, '') or default)
+    except ValueError:
+        return default
+
+
+INTERVAL_SEC = _env_number('WEB_GUI_HEALTH_INTERVAL_SEC', 60)
+TTL_SEC = _env_number('WEB_GUI_HEALTH_TTL_SEC', 180)
+SSH_TIMEOUT = _env_number('WEB_GUI_HEALTH_SSH_TIMEOUT', 5)
+CONTROL_DIR = os.environ.get('WEB_GUI_HEALTH_CONTROL_DIR') or f'/tmp/bkc_health_{os.getuid()}'
+MAX_PARALLEL = 8
+
+
+class HealthProber:
+    """Periodic SSH reachability checks with a TTL cache of the results.
+
+    `targets` is a callable returning (setup, avpc_ip, avpc_password) tuples,
+    read again every round so new configs are picked up. `log` gets the errors
+    of the background rounds.
+    """
+
+    def __init__(self, targets, interval=None, ttl=None, timeout=None, control_dir=None, log=print):
+        self.targets = targets
+        self.log = log
+        self.interval = INTERVAL_SEC if interval is None else interval
+        self.ttl = ttl or TTL_SEC
+        self.timeout = timeout or SSH_TIMEOUT
+        self.control_dir = control_dir or CONTROL_DIR
+        self.results = {}  # (kind, host, via) -> result dict; AVPC IPs repeat behind setups
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """Start the background rounds (no-op when the interval is 0)"""
+        if self.interval <= 0 or self.thread:
+            return
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.probe_all()
+            except Exception as e:
+                self.log(f"Health prober error: {e}")
+            time.sleep(self.interval)
+
+    # ------------------------------------------------------------ probes
+
+    def _ssh(self, host, command='true', stdin=None):
+        """Run a command on a setup over the pooled connection, returns (ok, ms, error)"""
+        persist = max(self.interval * 2, 60)
+        cmd = ['ssh', '-o', 'BatchMode=yes', '-o', f'ConnectTimeout={self.timeout}',
+               '-o', 'ControlMaster=auto', '-o', f'ControlPath={self.control_dir}/%C',
+               '-o', f'ControlPersist={persist}', host, command]
+        started = time.monotonic()
+        try:
+            result = subprocess.run(cmd, input=stdin, capture_output=True, text=True,
+                                    timeout=self.timeout * 2 + 5)
+        except subprocess.TimeoutExpired:
+            return False, None, 'timed out'
+        except OSError as e:
+            return False, None, str(e)
+        ms = round((time.monotonic() - started) * 1000, 1)
+        if result.returncode != 0:
+            error = (result.stderr.strip().splitlines() or [f'exit {result.returncode}'])[-1]
+            return False, ms, error
+        return True, ms, None
+
+    def probe_setup(self, setup):
+        ok, ms, error = self._ssh(setup)
+        return self._record('setup', setup, None, ok, ms, error)
+
+    def probe_avpc(self, setup, avpc_ip, password):
+        """Reach the AVPC from its setup, as deploy and install do (password on stdin)"""
+        hop = (f'read -r SSHPASS; export SSHPASS; '
+               f'sshpass -e ssh -o ConnectTimeout={self.timeout} avpc@{avpc_ip} true')
+        ok, ms, error = self._ssh(setup, hop, stdin=(password or '') + '\n')
+        return self._record('avpc', avpc_ip, setup, ok, ms, error)
+
+    def probe(self, setup, avpc_ip=None, password=None):
+        """Probe one target now: the setup, then its AVPC when the setup is up"""
+        self._probe_setup_targets(setup, [(avpc_ip, password)])
+
+    def probe_all(self):
+        targets = {}
+        for setup, avpc_ip, password in self.targets():
+            if setup:
+                targets[(setup, avpc_ip)] = password
+        if not targets:
+            return
+        # Targets sharing a setup are probed in order so they share its connection
+        by_setup = {}
+        for (setup, avpc_ip), password in targets.items():
+            by_setup.setdefault(setup, []).append((avpc_ip, password))
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL, len(by_setup))) as pool:
+            for setup, avpcs in by_setup.items():
+                pool.submit(self._probe_setup_targets, setup, avpcs)
+
+    def _probe_setup_targets(self, setup, avpcs):
+        up = self.probe_setup(setup)['status'] == 'up'
+        for avpc_ip, password in avpcs:
+            if not avpc_ip:
+                continue
+            if up:
+                self.probe_avpc(setup, avpc_ip, password)
+            else:
+                self._record('avpc', avpc_ip, setup, False, None, f'setup {setup} is down')
+
+    def _record(self, kind, host, via, ok, ms, error):
+        result = {'kind': kind, 'host': host, 'via': via, 'status': 'up' if ok else 'down',
+                  'latency_ms': ms, 'error': error, 'checked_at': time.time()}
+        with self.lock:
+            self.results[(kind, host, via)] = result
+        return result
+
+    # ------------------------------------------------------------ cache
+
+    def cached(self, kind, host, via=None):
+        """Last result for a host, with status 'unknown' once it is older than the TTL"""
+        with self.lock:
+            result = self.results.get((kind, host, via))
+        if not result:
+            return None
+        if time.time() - result['checked_at'] > self.ttl:
+            return dict(result, status='unknown', stale=True)
+        return result
+
+    def _target_results(self, setup, avpc_ip):
+        results = [self.cached('setup', setup)]
+        if avpc_ip:
+            results.append(self.cached('avpc', avpc_ip, setup))
+        return results
+
+    def down(self, setup, avpc_ip=None):
+        """Reason the target is down according to fresh cached results, None otherwise"""
+        for result in self._target_results(setup, avpc_ip):
+            if result and result['status'] == 'down':
+                name = 'setup' if result['kind'] == 'setup' else 'AVPC'
+                return f"{name} {result['host']} is down ({result['error']})"
+        return None
+
+    def check(self, setup, avpc_ip=None, password=None):
+        """Reason the target is down, probing it first when there is no fresh result"""
+        if any(not result or result['status'] == 'unknown' for result in self._target_results(setup, avpc_ip)):
+            self.probe(setup, avpc_ip, password)
+        return self.down(setup, avpc_ip)
+
+    def snapshot(self):
+        """Every cached result (stale ones marked unknown) for the dashboard"""
+        with self.lock:
+            keys = sorted(self.results, key=lambda key: (key[2] or key[1], key[0] != 'setup', key[1]))
+        return [self.cached(*key) for key in keys]
+
+    def close(self):
+        """Close the pooled connections"""
+        with self.lock:
+            setups = [host for kind, host, via in self.results if kind == 'setup']
+        for setup in setups:
+            subprocess.run(['ssh', '-o', f'ControlPath={self.control_dir}/%C', '-O', 'exit', setup],
+                           capture_output=True)
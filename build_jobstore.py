@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+"""
+Build Job Store
+SQLite-backed record of every job submitted to the web GUI.
+
+Each job keeps its options, state, the steps of build_automation.sh it has
+completed (taken from its --events stream, or from the "STEP N:" markers in
+its output), the artifacts it produced and a log file with its full output.
+When the server restarts, jobs that were queued or running are recovered:
+queued jobs are submitted again, and interrupted builds resume from the first
+step that did not complete.
+"""
+
+import json
+import os
+import re
+import signal
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+# build_automation.sh step markers ("STEP 2: Building Project (HW)") and their flags
+STEP_FLAGS = {1: '-u', 2: '-b', 3: '-g', 4: '-d', 5: '-i'}
+STEP_ORDER = ['-u', '-b', '-g', '-d', '-i']
+STEP_MARKER = re.compile(r'^STEP (\d+):')
+# Step names in the step_start/step_end events of build_automation.sh --events
+STEP_NAMES = {'update': '-u', 'build': '-b', 'generate': '-g', 'deploy': '-d', 'install': '-i'}
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+# "[RETRY] Deploy attempt 2/3" printed by run_with_retry in build_automation.sh
+RETRY_MARKER = re.compile(r'\[RETRY\] (\w+) attempt (\d+)/(\d+)')
+# "[CCACHE] hits=120 misses=8 hit_rate=93% size_mb=2048 dir=..." printed after a wake build
+CCACHE_MARKER = re.compile(r'\[CCACHE\] (.*)$')
+
+ACTIVE_STATES = ('pending', 'running')
+
+# Columns added after the first release of the table, with their definitions
+MIGRATIONS = {
+    'attempts': "TEXT NOT NULL DEFAULT '{}'",
+    'ccache': "TEXT",
+    'artifacts': "TEXT NOT NULL DEFAULT '{}'",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '',
+    args TEXT NOT NULL DEFAULT '[]',
+    description TEXT NOT NULL DEFAULT '',
+    config_file TEXT,
+    user TEXT,
+    priority TEXT,
+    resource_class TEXT,
+    tree TEXT,
+    state TEXT NOT NULL,
+    pid INTEGER,
+    returncode INTEGER,
+    completed_steps TEXT NOT NULL DEFAULT '[]',
+    current_step TEXT,
+    attempts TEXT NOT NULL DEFAULT '{}',
+    ccache TEXT,
+    artifacts TEXT NOT NULL DEFAULT '{}',
+    log_file TEXT,
+    resumed_from INTEGER,
+    submitted_at REAL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+
+def step_flags(options):
+    """Expand an option string into the ordered list of step flags it runs"""
+    flags = options.split()
+    # -m (build matrix) takes the place of the build step
+    selected = [f for f in STEP_ORDER if f in flags or (f == '-b' and '-m' in flags)]
+    # --resume without step flags resumes the whole workflow
+    if '-a' in flags or (not selected and '--resume' in flags):
+        return list(STEP_ORDER)
+    return selected
+
+
+def remaining_options(options, completed):
+    """Option string that runs only the steps of `options` not in `completed`"""
+    flags = options.split()
+    extra = [f for f in flags if f not in STEP_ORDER and f != '-a'
+             and not (f == '-m' and '-b' in completed)]
+    todo = [f for f in step_flags(options) if f not in completed]
+    if not todo:
+        return ''
+    return ' '.join(todo + extra)
+
+
+def parse_step_marker(line):
+    """Return the step flag announced by an output line, or None"""
+    match = STEP_MARKER.match(ANSI_ESCAPE.sub('', line).strip())
+    if match:
+        return STEP_FLAGS.get(int(match.group(1)))
+    return None
+
+
+def parse_ccache_stats(text):
+    """Turn 'hits=1 misses=2 hit_rate=33% ...' into a dict"""
+    stats = {}
+    for item in text.split():
+        if '=' in item:
+            key, value = item.split('=', 1)
+            value = value.rstrip('%')
+            stats[key] = int(value) if value.isdigit() else value
+    return stats
+
+
+class JobStore:
+    """Durable job table plus one log file per job"""
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.environ.get('BUILD_JOBS_DIR') or Path(__file__).parent.absolute() / 'jobs')
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / 'jobs.db'
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute(SCHEMA)
+            columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in MIGRATIONS.items():
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+
+    # ------------------------------------------------------------- records
+
+    def create(self, kind, options='', args=(), description='', config_file=None, user=None,
+               priority='normal', resource_class=None, tree=None, resumed_from=None):
+        """Insert a new pending job and return its id"""
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO jobs (kind, options, args, description, config_file, user, priority, "
+                "resource_class, tree, state, resumed_from, submitted_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?)",
+                (kind, options, json.dumps(list(args)), description, config_file, user, priority,
+                 resource_class, tree, resumed_from, time.time()))
+            job_id = cur.lastrowid
+            log_file = str(self.root / f'job_{job_id}.log')
+            self.conn.execute("UPDATE jobs SET log_file = ? WHERE id = ?", (log_file, job_id))
+        return job_id
+
+    def update(self, job_id, **fields):
+        if not fields:
+            return
+        for key in ('completed_steps', 'attempts', 'ccache', 'artifacts'):
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        columns = ', '.join(f"{key} = ?" for key in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def recent(self, limit=50):
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def env_destinations(self):
+        """Distinct destination directories of environment creation jobs"""
+        with self.lock:
+            rows = self.conn.execute("SELECT DISTINCT args FROM jobs WHERE kind = 'env'").fetchall()
+        args = [json.loads(row['args'] or '[]') for row in rows]
+        return sorted({arg[1] for arg in args if len(arg) > 1})
+
+    def active(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY id", ACTIVE_STATES).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def read_log(self, job_id, tail=None):
+        record = self.get(job_id)
+        if not record or not record['log_file'] or not os.path.exists(record['log_file']):
+            return []
+        with open(record['log_file'], 'r', errors='replace') as f:
+            lines = f.read().splitlines()
+        return lines[-tail:] if tail else lines
+
+    @staticmethod
+    def _to_dict(row):
+        record = dict(row)
+        record['args'] = json.loads(record['args'] or '[]')
+        record['completed_steps'] = json.loads(record['completed_steps'] or '[]')
+        record['attempts'] = json.loads(record['attempts'] or '{}')
+        record['ccache'] = json.loads(record['ccache']) if record['ccache'] else None
+        record['artifacts'] = json.loads(record['artifacts'] or '{}')
+        return record
+
+    # ------------------------------------------------------------ recovery
+
+    def recover(self):
+        """Prepare jobs left active by a previous server process.
+
+        Returns (record, options) pairs to submit again: queued jobs keep their
+        options, interrupted builds get only the steps they did not complete.
+        Leftover build processes are terminated first so the resumed job does
+        not compete with them for the same tree.
+        """
+        to_submit = []
+        for record in self.active():
+            if record['pid']:
+                self._terminate_orphan(record['pid'])
+            if record['state'] == 'pending':
+                to_submit.append((record, record['options']))
+                continue
+            if record['kind'] != 'build':
+                self.update(record['id'], state='interrupted', finished_at=time.time())
+                continue
+            options = remaining_options(record['options'], record['completed_steps'])
+            if options:
+                self.update(record['id'], state='resumed', finished_at=time.time())
+                to_submit.append((record, options))
+            else:
+                self.update(record['id'], state='finished', finished_at=time.time())
+        return to_submit
+
+    @staticmethod
+    def _terminate_orphan(pid):
+        # Only touch the pid if it still is one of our runners (pids get reused)
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                cmdline = f.read()
+                if b'build_automation' not in cmdline and b'build_pipeline' not in cmdline:
+                    return
+        except OSError:
+            return
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            return
+        for _ in range(20):
+            try:
+                os.killpg(pid, 0)
+            except ProcessLookupError:
+                return
+            time.sleep(0.25)
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class StepTracker:
+    """Follows the events (or step markers) of one running job and persists its progress"""
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+        self.current = None
+        self.completed = []
+        self.attempts = {}
+        self.ccache = None
+        self.artifacts = {}  # kind (bkc, manifest, matrix_report) -> path
+
+    def event(self, event):
+        """Take one decoded event of build_automation.sh --events"""
+        kind = event.get('type')
+        if kind in ('step_start', 'step_end'):
+            flag = STEP_NAMES.get(event.get('step'))
+            if not flag:
+                return
+            if kind == 'step_start':
+                self.current = flag
+            elif event.get('status') in ('ok', 'skipped') and flag not in self.completed:
+                self.completed.append(flag)
+            self.store.update(self.job_id, current_step=self.current, completed_steps=self.completed)
+        elif kind == 'retry':
+            self.attempts[event.get('label', '').lower()] = event.get('attempt')
+            self.store.update(self.job_id, attempts=self.attempts)
+        elif kind == 'ccache':
+            self.ccache = {key: value for key, value in event.items() if key not in ('ts', 'type')}
+            self.store.update(self.job_id, ccache=self.ccache)
+        elif kind == 'artifact' and event.get('kind'):
+            self.artifacts[event['kind']] = event.get('path')
+            self.store.update(self.job_id, artifacts=self.artifacts)
+
+    def feed(self, line):
+        stats = CCACHE_MARKER.search(ANSI_ESCAPE.sub('', line))
+        if stats:
+            self.ccache = parse_ccache_stats(stats.group(1))
+            self.store.update(self.job_id, ccache=self.ccache)
+            return
+        retry = RETRY_MARKER.search(line)
+        if retry:
+            self.attempts[retry.group(1).lower()] = int(retry.group(2))
+            self.store.update(self.job_id, attempts=self.attempts)
+            return
+        flag = parse_step_marker(line)
+        if flag is None:
+            return
+        # Steps run in order and the script exits on the first failure,
+        # so a new marker means the previous step completed
+        if self.current and self.current not in self.completed:
+            self.completed.append(self.current)
+        self.current = flag
+        self.store.update(self.job_id, current_step=flag, completed_steps=self.completed)
+
+    def finish(self, success):
+        if success and self.current and self.current not in self.completed:
+            self.completed.append(self.current)
+        self.store.update(self.job_id, current_step=None, completed_steps=self.completed)
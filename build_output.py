@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+"""
+Build Output Log
+Sequence-numbered buffer between the runners and the web GUI viewers.
+
+Every line put into the log gets the next sequence number. Viewers read with
+the sequence they want to continue from, so any number of viewers see every
+line (the old queue handed each line to whichever viewer polled first) and a
+viewer that reconnects continues where it stopped. The buffer keeps the last
+WEB_GUI_OUTPUT_BUFFER_LINES lines; a viewer that falls further behind is told
+how many lines it missed.
+
+Responses are coalesced: a read returns at most max_bytes of lines, waits up
+to `wait` seconds for the first line when there is none, and then lingers a
+moment so lines that arrive in a burst go out in one response.
+
+Wire formats for a batch (meta is a dict with at least first/next/count/more):
+    json    {"output": [lines...], "seq": first, "next": next, ...meta}
+    text    one JSON meta line, then the lines, newline separated
+    binary  frames of <4-byte big-endian length><utf-8 payload>, the first
+            frame is the JSON meta, one frame per line after it
+"""
+
+import collections
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+
+
+def _env_number(name, default):
+    try:
+        return type(default)(os.environ.get(name, '') or default)
+    except ValueError:
+        return default
+
+
+BUFFER_LINES = _env_number('WEB_GUI_OUTPUT_BUFFER_LINES', 100000)
+MAX_BYTES = _env_number('WEB_GUI_OUTPUT_MAX_BYTES', 256 * 1024)
+MAX_WAIT_SEC = _env_number('WEB_GUI_OUTPUT_MAX_WAIT_MS', 1000) / 1000
+LINGER_SEC = _env_number('WEB_GUI_OUTPUT_LINGER_MS', 50) / 1000
+
+FORMATS = ('json', 'text', 'binary')
+MIMETYPES = {
+    'json': 'application/json',
+    'text': 'text/plain; charset=utf-8',
+    'binary': 'application/octet-stream',
+}
+
+
+class OutputLog:
+    """Bounded, sequence-numbered line buffer with blocking reads"""
+
+    def __init__(self, max_lines=None):
+        self.lines = collections.deque(maxlen=max_lines or BUFFER_LINES)
+        self.first = 0  # sequence number of self.lines[0]
+        self.next = 0   # sequence number the next line gets
+        self.cursor = 0  # shared position of viewers that do not track a sequence
+        self.total_bytes = 0  # bytes ever put, used to bound the linger
+        self.lines_read = 0  # lines ever handed to viewers (self.next counts the lines put)
+        self.cond = threading.Condition()
+
+    def put(self, line):
+        with self.cond:
+            if len(self.lines) == self.lines.maxlen:
+                self.first += 1
+            self.lines.append(line)
+            self.next += 1
+            self.total_bytes += len(line) + 1
+            self.cond.notify_all()
+
+    def clear(self):
+        """Start a fresh log; sequence numbers keep increasing"""
+        with self.cond:
+            self.lines.clear()
+            self.first = self.cursor = self.next
+            self.cond.notify_all()
+
+    def empty(self):
+        with self.cond:
+            return self.cursor >= self.next
+
+    def read(self, since=None, max_bytes=None, wait=0.0, linger=None):
+        """Lines from sequence `since` on, returns (lines, meta).
+
+        since=None reads from (and advances) the shared cursor, which keeps
+        the old drain-once behaviour for viewers that do not track a sequence.
+        """
+        max_bytes = min(max_bytes or MAX_BYTES, MAX_BYTES)
+        wait = min(max(wait, 0.0), MAX_WAIT_SEC)
+        linger = LINGER_SEC if linger is None else linger
+        with self.cond:
+            shared = since is None
+            start = self.cursor if shared else since
+            if start > self.next:
+                # A sequence from before a server restart: start over
+                start = self.first
+            if wait and start >= self.next:
+                deadline = time.monotonic() + wait
+                while start >= self.next:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                if start < self.next and linger:
+                    # Let a burst finish so it goes out in one response, up to max_bytes
+                    base = self.total_bytes - sum(len(line) + 1 for line in self._slice(max(start, self.first)))
+                    linger_end = time.monotonic() + linger
+                    while self.total_bytes - base < max_bytes:
+                        remaining = linger_end - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.cond.wait(remaining)
+            dropped = max(0, self.first - start)
+            start = max(start, self.first)
+            batch, size = [], 0
+            for line in self._slice(start):
+                size += len(line) + 1
+                if batch and size > max_bytes:
+                    break
+                batch.append(line)
+            end = start + len(batch)
+            self.lines_read += len(batch)
+            if shared:
+                self.cursor = end
+            return batch, {'first': start, 'next': end, 'count': len(batch),
+                           'more': end < self.next, 'dropped': dropped}
+
+    def _slice(self, start):
+        return itertools.islice(self.lines, start - self.first, None)
+
+
+def encode(lines, meta, fmt):
+    """Encode a batch of lines in one of FORMATS, returns bytes"""
+    if fmt == 'text':
+        return '\n'.join([json.dumps(meta)] + lines).encode('utf-8', 'replace')
+    if fmt == 'binary':
+        frames = [json.dumps(meta).encode()] + [line.encode('utf-8', 'replace') for line in lines]
+        return b''.join(struct.pack('>I', len(frame)) + frame for frame in frames)
+    return json.dumps(dict(meta, output=lines, seq=meta['first'])).encode()
+
+
+def decode(data, fmt):
+    """Inverse of encode, returns (lines, meta)"""
+    if fmt == 'text':
+        text = data.decode('utf-8', 'replace')
+        header, _, body = text.partition('\n')
+        meta = json.loads(header)
+        return (body.split('\n') if meta.get('count') else []), meta
+    if fmt == 'binary':
+        frames, offset = [], 0
+        while offset < len(data):
+            (length,) = struct.unpack_from('>I', data, offset)
+            offset += 4
+            frames.append(data[offset:offset + length].decode('utf-8', 'replace'))
+            offset += length
+        return frames[1:], json.loads(frames[0])
+    meta = json.loads(data)
+    return meta.pop('output', []), meta
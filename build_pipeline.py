@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+
+"""
+Build Pipeline
+The update/build/generate/deploy/install workflow as Python step objects,
+orchestrating build_automation.sh.
+
+build_automation.sh stays the engine: every step runs as one
+`build_automation.sh -c <config> <step option> --events` invocation, so the
+step logic, checkpoints (--resume), retries, the tree environment snapshot
+and the compiler cache exist only there. This module adds the orchestration
+around it:
+
+    steps      objects declaring the config keys they require and the
+               artifacts they consume and provide ('bkc', 'manifest'); the
+               artifacts a step's events report are handed to later steps
+    runners    LocalRunner runs a command, ScriptRunner one step of the
+               script, relaying its output and events to the run
+    hooks      wrap every step (TimingHook, or your own)
+    lock       the tree lock is held once for the whole run
+
+Usage: build_pipeline.py -c <config_file> [-u] [-b] [-m] [-g] [-d] [-i] [-a] [--resume] [--events[=<fd>|=<file>]]
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from build_configs import REQUIRED_KEYS
+from build_jobstore import STEP_NAMES, step_flags
+from build_treelock import TreeLock, describe, holders, lock_mode
+
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+BUILD_SCRIPT = SCRIPT_DIR / 'build_automation.sh'
+
+STEP_ORDER = ('update', 'build', 'generate', 'deploy', 'install')
+# Reported by the pipeline itself, not by each step's invocation of the script
+RUN_EVENTS = ('run_start', 'run_end', 'lock')
+
+GREEN, MAGENTA, NC = '\033[0;32m', '\033[0;35m', '\033[0m'
+LEVELS = {
+    'info': ('\033[0;34m', 'INFO'),
+    'success': (GREEN, 'SUCCESS'),
+    'warning': ('\033[1;33m', 'WARNING'),
+    'error': ('\033[0;31m', 'ERROR'),
+}
+
+
+class StepFailed(Exception):
+    def __init__(self, message, exit_code=1):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+def load_config(path):
+    """Environment of the script after it sources the config: the config is
+    evaluated by bash, so $VAR, $(...) and ~ resolve as they do for the script"""
+    result = subprocess.run(['bash', '-c', 'set -a; source "$1" > /dev/null; env -0', 'load_config', str(path)],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise StepFailed(f"Could not load {path}: {result.stderr.decode(errors='replace').strip()}")
+    entries = result.stdout.decode('utf-8', 'surrogateescape').split('\0')
+    return dict(entry.partition('=')[::2] for entry in entries if entry)
+
+
+class Context:
+    """State of one run, shared by its steps, runners and hooks"""
+
+    def __init__(self, config_path, config, output, on_event=None):
+        self.config_path = config_path
+        self.config = config
+        self.env_path = Path(config.get('ENV_PATH', ''))
+        self.output = output  # called with every console line
+        self.on_event = on_event
+        self.artifacts = {}  # kind -> path, produced by this run
+        self.steps = {}  # step name -> status reported by the script (ok, failed, skipped)
+        self.timings = {}  # step name -> seconds
+        self.process = None  # child process running now
+        self.stopped = False
+
+    def get(self, key, default=''):
+        """Value of the sourced config (which includes the environment), or default"""
+        return self.config.get(key) or default
+
+    def emit(self, event_type, **fields):
+        if self.on_event:
+            self.on_event(dict({'ts': time.time(), 'type': event_type}, **fields))
+
+    def log(self, level, message):
+        color, label = LEVELS[level]
+        self.output(f"{color}[{label}]{NC} {message}")
+        self.emit('log', level=level, message=message)
+
+    def banner(self, title):
+        for line in ('', f"{GREEN}========================================{NC}", f"{GREEN}{title}{NC}",
+                     f"{GREEN}========================================{NC}", ''):
+            self.output(line)
+
+    def artifact(self, kind):
+        """Path of an artifact from this run, or the tree's record of the last one"""
+        if kind in self.artifacts:
+            return self.artifacts[kind]
+        if kind == 'bkc':
+            return last_bkc_path(self.env_path) or None
+        return None
+
+
+def last_bkc_path(env_path):
+    try:
+        return (Path(env_path) / '.last_bkc_path').read_text().rstrip('\n')
+    except OSError:
+        return ''
+
+
+# ============================================================================
+# Runners
+# ============================================================================
+
+class LocalRunner:
+    """Runs commands on this host, passing their output lines to the run"""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+
+    def run(self, argv, cwd=None, env=None, stdin=None, pass_fds=()):
+        """Run a command to completion, returns its exit code"""
+        process = subprocess.Popen(
+            argv, cwd=cwd, env=env, pass_fds=pass_fds,
+            stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True, bufsize=1)
+        self.ctx.process = process
+        try:
+            if stdin is not None:
+                process.stdin.write(stdin)
+                process.stdin.close()
+            for line in process.stdout:
+                self.ctx.output(line.rstrip('\n'))
+            return process.wait()
+        finally:
+            self.ctx.process = None
+
+
+class ScriptRunner(LocalRunner):
+    """Runs one step through build_automation.sh, relaying its output and events"""
+
+    def run_step(self, step, resume=False):
+        """Exit code of the script; the step's status lands in ctx.steps, the
+        artifacts it reports in ctx.artifacts"""
+        ctx = self.ctx
+        read_fd, write_fd = os.pipe()
+        argv = [str(BUILD_SCRIPT), '-c', ctx.config_path, step.flag(), f"--events={write_fd}"]
+        if resume:
+            argv.append('--resume')
+        # The pipeline holds the tree lock for the whole run and prints the summary
+        env = dict(os.environ, TREE_LOCK='false', BUILD_SUMMARY='false')
+
+        def relay():
+            with os.fdopen(read_fd, 'r', errors='replace') as events:
+                for line in events:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if event.get('type') in RUN_EVENTS:
+                        continue
+                    if event.get('type') == 'step_end':
+                        ctx.steps[event.get('step')] = event.get('status')
+                    elif event.get('type') == 'artifact':
+                        ctx.artifacts[event.get('kind')] = event.get('path')
+                    if ctx.on_event:
+                        ctx.on_event(event)
+
+        reader = threading.Thread(target=relay, daemon=True)
+        reader.start()
+        try:
+            code = self.run(argv, env=env, pass_fds=(write_fd,))
+        finally:
+            os.close(write_fd)
+        reader.join(timeout=5)
+        return code
+
+
+# ============================================================================
+# Steps
+# ============================================================================
+
+class Step:
+    """One step of the workflow.
+
+    name      checkpoint and event name of the step
+    requires  config keys it cannot run without
+    consumes  artifacts it takes from earlier steps
+    provides  artifacts it hands to later steps
+    """
+
+    name = ''
+    label = ''
+    requires = ()
+    consumes = ()
+    provides = ()
+
+    def flag(self):
+        """Its build_automation.sh option"""
+        return STEP_NAMES[self.name]
+
+    def run(self, ctx, resume=False):
+        code = ScriptRunner(ctx).run_step(self, resume)
+        if code != 0:
+            raise StepFailed(f"build_automation.sh {self.flag()} failed with exit code {code}", code)
+        for kind in self.provides:
+            if kind in ctx.artifacts:
+                ctx.log('info', f"{self.label} provides {kind}: {ctx.artifacts[kind]}")
+
+
+class UpdateStep(Step):
+    name, label = 'update', 'Update'
+    requires = ('APP_ROOT',)
+
+
+class BuildStep(Step):
+    name, label = 'build', 'Build'
+
+    def __init__(self, matrix=False):
+        self.matrix = matrix
+        self.requires = ('BUILD_MATRIX',) if matrix else ('BUILD_TYPE',)
+
+    def flag(self):
+        return '-m' if self.matrix else '-b'
+
+
+class GenerateStep(Step):
+    name, label = 'generate', 'Generate'
+    requires = ('PROJECT_NAME',)
+    provides = ('bkc', 'manifest')
+
+
+class DeployStep(Step):
+    name, label = 'deploy', 'Deploy'
+    requires = ('SETUP_NAME',)
+    consumes = ('bkc',)
+
+
+class InstallStep(Step):
+    name, label = 'install', 'Install'
+    requires = ('SETUP_NAME',)
+
+
+STEPS = {step.name: step for step in (UpdateStep, BuildStep, GenerateStep, DeployStep, InstallStep)}
+
+
+# ============================================================================
+# Hooks
+# ============================================================================
+
+class Hook:
+    """Extension point around every step; all methods are optional"""
+
+    def before_step(self, step, ctx):
+        """Return a reason to skip the step, None to run it"""
+        return None
+
+    def run_step(self, step, ctx, call):
+        """Wrap the execution of the step, call() runs it (or the next hook)"""
+        return call()
+
+    def after_step(self, step, ctx, error):
+        """Called after the step ran, error is None when it succeeded"""
+
+
+class TimingHook(Hook):
+    """Measures every step into ctx.timings and reports it"""
+
+    def run_step(self, step, ctx, call):
+        started = time.monotonic()
+        try:
+            return call()
+        finally:
+            ctx.timings[step.name] = round(time.monotonic() - started, 1)
+            ctx.log('info', f"[TIMING] {step.label} took {ctx.timings[step.name]}s")
+
+
+# ============================================================================
+# Pipeline
+# ============================================================================
+
+class Pipeline:
+    """The selected steps of one config, run in order through the hooks.
+
+    `options` is a build_automation.sh option string ("-u -b", "-a --resume").
+    `output` gets every console line, `on_event` every event dict.
+    """
+
+    def __init__(self, config_path, options, output=print, on_event=None, hooks=None):
+        self.config_path = str(config_path)
+        self.options = options
+        flags = options.split()
+        self.matrix = '-m' in flags
+        self.resume = '--resume' in flags
+        self.names = [name for name in STEP_ORDER if STEP_NAMES[name] in step_flags(options)]
+        self.output = output
+        self.on_event = on_event
+        self.hooks = hooks if hooks is not None else [TimingHook()]
+        self.ctx = None
+        self.stopped = False
+
+    def steps(self):
+        return [BuildStep(self.matrix) if name == 'build' else STEPS[name]() for name in self.names]
+
+    def stop(self):
+        """Stop after the current command (which is terminated)"""
+        self.stopped = True
+        if self.ctx:
+            self.ctx.stopped = True
+            if self.ctx.process:
+                self.ctx.process.terminate()
+
+    def run(self):
+        """Run the steps, returns the exit code (0 on success) like build_automation.sh"""
+        ctx = self.ctx = Context(self.config_path, {}, self.output, self.on_event)
+        lock = None
+        code = 1
+        try:
+            if self.load(ctx):
+                ctx.log('info', "Starting automation script...")
+                ctx.emit('run_start', options=self.options, config=self.config_path,
+                         env_path=str(ctx.env_path), pid=os.getpid())
+                self.output('')
+                lock = self.lock(ctx)
+                code = self.run_steps(ctx)
+        except Exception as e:
+            ctx.log('error', str(e))
+            code = 1
+        finally:
+            if lock:
+                lock.release()
+            ctx.emit('run_end', status='ok' if code == 0 else 'failed', exit_code=code)
+        return code
+
+    def load(self, ctx):
+        if not os.path.isfile(self.config_path):
+            ctx.log('error', f"Configuration file not found: {self.config_path}")
+            return False
+        ctx.config = load_config(self.config_path)
+        ctx.env_path = Path(ctx.get('ENV_PATH'))
+        for key in REQUIRED_KEYS:
+            if not ctx.get(key):
+                ctx.log('error', f"{key} not defined in config file")
+                return False
+        if not self.names:
+            ctx.log('warning', "No action selected. Use -u, -b, -g, -d, -i, or -a")
+            return False
+        return True
+
+    def lock(self, ctx):
+        """Take the tree lock for the whole run (see build_treelock.py)"""
+        if ctx.get('TREE_LOCK', 'true') != 'true':
+            return None
+        if not ctx.env_path.is_dir():
+            ctx.log('warning', f"ENV_PATH {ctx.env_path} does not exist, running without the tree lock")
+            return None
+        mode = lock_mode(self.options)
+        timeout = int(ctx.get('TREE_LOCK_TIMEOUT', '0'))
+        lock = TreeLock(ctx.env_path, mode, timeout=timeout or None, config=self.config_path)
+        if not lock.available():
+            ctx.log('warning', f"[LOCK] {ctx.env_path} is in use, waiting for the {mode} lock:")
+            for holder in holders(ctx.env_path):
+                ctx.output(f"  {describe(holder)} ({holder.get('config')})")
+            ctx.emit('lock', state='waiting', mode=mode, env_path=str(ctx.env_path))
+        lock.acquire()
+        ctx.emit('lock', state='held', mode=mode, env_path=str(ctx.env_path))
+        ctx.log('info', f"[LOCK] Holding the {mode} lock on {ctx.env_path}")
+        return lock
+
+    def run_steps(self, ctx):
+        # The script skips steps with a valid checkpoint while --resume is passed;
+        # it is passed until the first step that really runs
+        resume = self.resume
+        for step in self.steps():
+            if self.stopped:
+                ctx.log('warning', "Stopped")
+                return 1
+            reason = next(filter(None, (hook.before_step(step, ctx) for hook in self.hooks)), None)
+            if reason:
+                ctx.log('info', f"Skipping {step.label}: {reason}")
+                ctx.emit('step_end', step=step.name, status='skipped', duration_sec=0)
+                ctx.steps[step.name] = 'skipped'
+                continue
+            error = None
+            try:
+                self.check_inputs(step, ctx)
+                call = lambda step=step, resume=resume: step.run(ctx, resume)
+                for hook in reversed(self.hooks):
+                    call = (lambda hook, call: lambda: hook.run_step(step, ctx, call))(hook, call)
+                call()
+            except (StepFailed, OSError) as e:
+                error = e
+                ctx.log('error', str(e))
+                if step.name not in ctx.steps:
+                    # Failed before the script reported the step
+                    ctx.emit('step_end', step=step.name, status='failed', duration_sec=0)
+            for hook in self.hooks:
+                hook.after_step(step, ctx, error)
+            if error:
+                ctx.log('error', f"{step.label} failed")
+                return 1
+            resume = resume and ctx.steps.get(step.name) == 'skipped'
+        self.summary(ctx)
+        return 0
+
+    def check_inputs(self, step, ctx):
+        for key in step.requires:
+            if not ctx.get(key):
+                raise StepFailed(f"{key} not defined in config file")
+        for kind in step.consumes:
+            if not ctx.artifact(kind):
+                raise StepFailed(f"No {kind} artifact found. Please run the step that produces it first.")
+
+    def summary(self, ctx):
+        ctx.banner("ALL TASKS COMPLETED SUCCESSFULLY!")
+        ctx.log('info', "Summary of executed steps:")
+        done = {
+            'update': "Updated APP_ROOT",
+            'build': f"Built matrix ({ctx.get('BUILD_MATRIX')})" if self.matrix
+                     else f"Built project ({ctx.get('BUILD_TYPE')})",
+            'generate': "Generated deployment package",
+            'deploy': "Deployed to setup",
+            'install': "Installed on setup",
+        }
+        for name in self.names:
+            if ctx.steps.get(name) == 'skipped':
+                ctx.output(f"  ↷ {done[name]} (skipped, checkpoint valid)")
+            else:
+                ctx.output(f"  ✓ {done[name]}")
+        self.output('')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the build workflow step by step through build_automation.sh")
+    parser.add_argument('-c', dest='config', default=str(SCRIPT_DIR / 'build_config.cfg'),
+                        help="Path to configuration file (default: build_config.cfg next to this script)")
+    for flag, text in (('-u', "Update APP_ROOT in AppConfig.sh"), ('-b', "Build"),
+                       ('-m', "Build every BUILD_MATRIX variant"), ('-g', "Generate deployment package"),
+                       ('-d', "Deploy to setup"), ('-i', "Install on setup"), ('-a', "Execute all steps")):
+        parser.add_argument(flag, action='store_true', help=text)
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip steps already completed with unchanged inputs")
+    parser.add_argument('--events', nargs='?', const='3', metavar='FD|FILE',
+                        help="Write NDJSON events to file descriptor 3, or the given descriptor or file")
+    args = parser.parse_args()
+
+    options = ' '.join(flag for flag in ('-u', '-b', '-m', '-g', '-d', '-i', '-a')
+                       if getattr(args, flag[1]))
+    if args.resume:
+        options += ' --resume'
+
+    on_event = None
+    if args.events:
+        try:
+            if args.events.isdigit():
+                events = os.fdopen(int(args.events), 'a', buffering=1)
+            else:
+                events = open(args.events, 'a', buffering=1)
+        except OSError as e:
+            print(f"--events: {e}", file=sys.stderr)
+            return 1
+        on_event = lambda event: events.write(json.dumps(event) + '\n')
+
+    # A stop from the GUIs (SIGTERM to the process group) still releases the lock and reports run_end
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    return Pipeline(args.config, options.strip(), output=lambda line: print(line, flush=True),
+                    on_event=on_event).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
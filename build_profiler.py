@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+"""
+Build Web GUI Profiler
+Opt-in profiling of the web GUI, switched on and off at runtime through
+/admin/profile (no restart).
+
+Request timing: wall and CPU time (thread_time) of every request, per
+endpoint. CPU time separates work from waiting, e.g. /get_output holding a
+request open until output arrives. While it is on, responses carry a
+Server-Timing header, shown by the browser's developer tools.
+
+Output rates: lines put into the OutputLog and handed to viewers per
+second, sampled every second while request timing is on.
+
+Sampling profiler: a thread that records the stack of every other thread
+each WEB_GUI_PROFILE_SAMPLE_MS and counts them in the collapsed format read
+by flamegraph.pl and speedscope ("thread;file:function;... count").
+
+Settings (environment of the web GUI):
+    WEB_GUI_PROFILE            Start with request timing and output rates on (default: false)
+    WEB_GUI_PROFILE_SAMPLE_MS  Sampling interval of the profiler (default: 10)
+    WEB_GUI_PROFILE_ALLOW      Addresses allowed to use /admin/profile (default: 127.0.0.1,::1)
+"""
+
+import collections
+import os
+import re
+import sys
+import threading
+import time
+
+
+def _env_number(name, default):
+    try:
+        return type(default)(os.environ.get(name, '') or default)
+    except ValueError:
+        return default
+
+
+ENABLED = (os.environ.get('WEB_GUI_PROFILE') or 'false').lower() in ('1', 'true', 'yes', 'on')
+SAMPLE_MS = _env_number('WEB_GUI_PROFILE_SAMPLE_MS', 10.0)
+ALLOW = [host.strip() for host in (os.environ.get('WEB_GUI_PROFILE_ALLOW') or '127.0.0.1,::1').split(',')]
+RECENT_REQUESTS = 500  # per endpoint, for the percentiles
+RATE_WINDOW_SEC = 60
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Profiler:
+    """Request timings, output rates and a sampling profiler, all off until switched on.
+
+    `output_log` is the OutputLog whose put/read counters are turned into rates.
+    """
+
+    def __init__(self, output_log=None):
+        self.output_log = output_log
+        self.lock = threading.Lock()
+        self.timing = False
+        self.endpoints = {}  # endpoint -> stats
+        self.rates = collections.deque(maxlen=RATE_WINDOW_SEC + 1)  # (time, lines put, lines read)
+        self.meter = None
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.sampling = None  # {'interval_ms', 'started_at', 'until'} while the sampler runs
+        self.sampler_stop = threading.Event()
+
+    # ------------------------------------------------------------ request timing
+
+    def set_timing(self, on):
+        """Switch request timing and the output rate meter"""
+        self.timing = bool(on)
+        if self.timing and not (self.meter and self.meter.is_alive()):
+            self.rates.clear()
+            self.meter = threading.Thread(target=self._meter_loop, name='profile-meter', daemon=True)
+            self.meter.start()
+
+    def record(self, endpoint, wall, cpu, status):
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if not stats:
+                stats = self.endpoints[endpoint] = {
+                    'count': 0, 'errors': 0, 'wall_total': 0.0, 'wall_max': 0.0, 'cpu_total': 0.0,
+                    'cpu_max': 0.0, 'recent': collections.deque(maxlen=RECENT_REQUESTS)}
+            stats['count'] += 1
+            stats['errors'] += status >= 500
+            stats['wall_total'] += wall
+            stats['wall_max'] = max(stats['wall_max'], wall)
+            stats['cpu_total'] += cpu
+            stats['cpu_max'] = max(stats['cpu_max'], cpu)
+            stats['recent'].append(wall)
+
+    def endpoint_stats(self):
+        """Per endpoint: requests, errors, wall and CPU milliseconds (mean, max, p50/p95 of recent)"""
+        with self.lock:
+            items = [(name, dict(stats, recent=list(stats['recent']))) for name, stats in self.endpoints.items()]
+        result = {}
+        for name, stats in sorted(items, key=lambda item: -item[1]['cpu_total']):
+            count = stats['count']
+            result[name] = {
+                'count': count,
+                'errors': stats['errors'],
+                'wall_ms_mean': round(stats['wall_total'] / count * 1000, 2),
+                'wall_ms_p50': round(_percentile(stats['recent'], 0.5) * 1000, 2),
+                'wall_ms_p95': round(_percentile(stats['recent'], 0.95) * 1000, 2),
+                'wall_ms_max': round(stats['wall_max'] * 1000, 2),
+                'cpu_ms_mean': round(stats['cpu_total'] / count * 1000, 3),
+                'cpu_ms_max': round(stats['cpu_max'] * 1000, 3),
+                'cpu_sec_total': round(stats['cpu_total'], 3),
+            }
+        return result
+
+    def middleware(self, wsgi_app):
+        """Wrap a WSGI app so each request is timed while timing is on.
+
+        The endpoint is read from environ['profile.endpoint'], which the app sets
+        per request (Flask: in a before_request hook).
+        """
+        def timed_app(environ, start_response):
+            if not self.timing:
+                return wsgi_app(environ, start_response)
+            wall, cpu = time.perf_counter(), time.thread_time()
+            status = [500]
+
+            def timed_start_response(status_line, headers, exc_info=None):
+                status[0] = int(status_line.split(' ', 1)[0])
+                elapsed = time.perf_counter() - wall
+                headers.append(('Server-Timing', f'app;dur={elapsed * 1000:.1f}, '
+                                                 f'cpu;dur={(time.thread_time() - cpu) * 1000:.1f}'))
+                return start_response(status_line, headers, exc_info)
+
+            try:
+                return wsgi_app(environ, timed_start_response)
+            finally:
+                # Not recorded when switched off during the request
+                if self.timing:
+                    endpoint = environ.get('profile.endpoint') or f"<{environ.get('PATH_INFO', '?')}>"
+                    self.record(endpoint, time.perf_counter() - wall, time.thread_time() - cpu, status[0])
+
+        return timed_app
+
+    # ------------------------------------------------------------ output rates
+
+    def _meter_loop(self):
+        while self.timing:
+            if self.output_log:
+                self.rates.append((time.monotonic(), self.output_log.next, self.output_log.lines_read))
+            time.sleep(1)
+
+    def output_rates(self):
+        """Lines per second put into and read from the output log: last second, 10 s, 60 s and peak"""
+        samples = list(self.rates)
+        result = {}
+        for index, name in ((1, 'put'), (2, 'read')):
+            rates = {}
+            for window in (1, 10, RATE_WINDOW_SEC):
+                if len(samples) > 1:
+                    first, last = samples[max(0, len(samples) - 1 - window)], samples[-1]
+                    rates[f'per_sec_{window}s'] = round((last[index] - first[index]) / (last[0] - first[0]), 1)
+            steps = [(b[index] - a[index]) / (b[0] - a[0]) for a, b in zip(samples, samples[1:])]
+            rates['per_sec_peak'] = round(max(steps), 1) if steps else None
+            rates['total'] = samples[-1][index] if samples else None
+            result[name] = rates
+        return result
+
+    # ------------------------------------------------------------ sampling profiler
+
+    def start_sampling(self, interval_ms=None, seconds=None):
+        """Start the sampler (restarting it with the new settings when it runs); stops by
+        itself after `seconds` when given"""
+        self.stop_sampling()
+        interval = max(interval_ms or SAMPLE_MS, 1.0) / 1000
+        self.sampler_stop = threading.Event()
+        until = time.time() + seconds if seconds else None
+        self.sampling = {'interval_ms': interval * 1000, 'started_at': time.time(), 'until': until}
+        threading.Thread(target=self._sample_loop, args=(self.sampler_stop, interval, until),
+                         name='profile-sampler', daemon=True).start()
+
+    def stop_sampling(self):
+        self.sampler_stop.set()
+        self.sampling = None
+
+    def _sample_loop(self, stop, interval, until):
+        me = threading.get_ident()
+        while not stop.wait(interval):
+            if until and time.time() >= until:
+                self.sampling = None
+                break
+            # Request threads are numbered, strip the numbers so their stacks add up
+            names = {thread.ident: re.sub(r'-\d+', '', thread.name) for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            stacks = []
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks.append(';'.join([names.get(ident, 'thread').replace(' ', '_')] + stack[::-1]))
+            del frames
+            with self.lock:
+                self.stacks.update(stacks)
+                self.samples += 1
+
+    def collapsed(self, reset=False):
+        """Sampled stacks in collapsed format, one "stack count" line each"""
+        with self.lock:
+            lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+            if reset:
+                self.stacks.clear()
+                self.samples = 0
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    # ------------------------------------------------------------ state
+
+    def reset(self):
+        """Drop the collected timings and stacks"""
+        with self.lock:
+            self.endpoints.clear()
+            self.stacks.clear()
+            self.samples = 0
+
+    def snapshot(self):
+        return {
+            'timing': self.timing,
+            'endpoints': self.endpoint_stats(),
+            'output': self.output_rates() if self.timing else None,
+            'sampling': self.sampling,
+            'samples': self.samples,
+            'stacks': len(self.stacks),
+        }
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+
+"""
+Build Scheduler
+Admission control in front of the build automation runners.
+
+Every job is classified by the heaviest step it runs (compile, generate,
+deploy/install, ...) and only admitted when the configured CPU and memory
+budget has room for it. Pending jobs are ordered by priority, then by
+fair-share between users, so light deploy jobs keep flowing while heavy
+compiles wait for capacity.
+
+Jobs on the same tree (ENV_PATH) follow reader/writer rules: a job that
+changes the tree ('write') never runs next to another job on that tree,
+'read' jobs (deploy, install) run together. Holds registered by the server
+keep other jobs queued the same way (a tree locked from outside the
+scheduler, a setup that is down). A held job waits without holding back
+jobs that are not.
+
+Budgets are read from the environment:
+    BUILD_SCHED_CPU_SLOTS      CPU cores available to jobs (default: all cores)
+    BUILD_SCHED_MEM_MB         Memory available to jobs (default: 80% of RAM)
+    BUILD_SCHED_MAX_JOBS       Max jobs running at once (default: 1)
+    BUILD_SCHED_COMPILE_CPUS   Cores reserved by one compile (default: half)
+    BUILD_SCHED_COMPILE_MEM_MB Memory reserved by one compile (default: 16384)
+    BUILD_SCHED_AGING_SEC      Wait time after which a job blocks backfill (default: 900)
+"""
+
+import os
+import threading
+import time
+import itertools
+
+
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+# Steps of build_automation.sh and the resource class each one belongs to
+STEP_CLASSES = {
+    '-u': 'update',
+    '-b': 'compile',
+    '-m': 'compile',
+    '-g': 'generate',
+    '-d': 'deploy',
+    '-i': 'install',
+}
+
+# Jobs with several steps are charged for the heaviest class they contain
+CLASS_ORDER = ['update', 'deploy', 'install', 'clone', 'generate', 'compile']
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, '') or default)
+    except ValueError:
+        return default
+
+
+def _total_memory_mb():
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 16384
+
+
+class ResourceClass:
+    """Resources reserved by a job of a given class while it runs"""
+
+    def __init__(self, name, cpus, mem_mb):
+        self.name = name
+        self.cpus = cpus
+        self.mem_mb = mem_mb
+
+    def __repr__(self):
+        return f"ResourceClass({self.name}, cpus={self.cpus}, mem_mb={self.mem_mb})"
+
+
+class Budget:
+    """Server-wide capacity shared by all admitted jobs"""
+
+    def __init__(self, cpus=None, mem_mb=None, max_jobs=None):
+        self.cpus = cpus or _env_int('BUILD_SCHED_CPU_SLOTS', os.cpu_count() or 1)
+        self.mem_mb = mem_mb or _env_int('BUILD_SCHED_MEM_MB', int(_total_memory_mb() * 0.8))
+        self.max_jobs = max_jobs or _env_int('BUILD_SCHED_MAX_JOBS', 1)
+
+    def default_classes(self):
+        """Resource classes sized relative to this budget"""
+        compile_cpus = min(self.cpus, _env_int('BUILD_SCHED_COMPILE_CPUS', max(1, self.cpus // 2)))
+        compile_mem = min(self.mem_mb, _env_int('BUILD_SCHED_COMPILE_MEM_MB', 16384))
+        return {
+            'compile': ResourceClass('compile', compile_cpus, compile_mem),
+            'generate': ResourceClass('generate', min(self.cpus, 2), min(self.mem_mb, 4096)),
+            'clone': ResourceClass('clone', 1, min(self.mem_mb, 1024)),
+            'install': ResourceClass('install', 0, 256),
+            'deploy': ResourceClass('deploy', 0, 256),
+            'update': ResourceClass('update', 0, 64),
+        }
+
+
+def classify_options(options):
+    """Return the resource class name for a build_automation.sh option string"""
+    flags = options.split() if isinstance(options, str) else list(options)
+    found = [STEP_CLASSES[f] for f in flags if f in STEP_CLASSES]
+    if '-a' in flags or (not found and '--resume' in flags):
+        return 'compile'
+    if not found:
+        return 'update'
+    return max(found, key=CLASS_ORDER.index)
+
+
+class Job:
+    """A unit of work submitted to the scheduler"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, target, args=(), description='', resource_class='update',
+                 user='anonymous', priority='normal', tree=None, tree_mode='write', setup=None,
+                 avpc=None, job_id=None):
+        self.id = job_id if job_id is not None else next(Job._ids)
+        self.target = target
+        self.args = args
+        self.description = description
+        self.resource_class = resource_class
+        self.user = user or 'anonymous'
+        self.priority_name = priority if priority in PRIORITIES else 'normal'
+        self.priority = PRIORITIES[self.priority_name]
+        self.tree = tree
+        self.tree_mode = tree_mode
+        self.setup = setup  # SETUP_NAME / AVPC_IP the job deploys to, if any
+        self.avpc = avpc
+        self.state = 'pending'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.process = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'description': self.description,
+            'resource_class': self.resource_class,
+            'user': self.user,
+            'priority': self.priority_name,
+            'tree': self.tree,
+            'tree_mode': self.tree_mode,
+            'setup': self.setup,
+            'avpc': self.avpc,
+            'state': self.state,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+
+class JobScheduler:
+    """Priority queue with resource-aware admission and fair-share between users"""
+
+    def __init__(self, budget=None, classes=None):
+        self.budget = budget or Budget()
+        self.classes = classes or self.budget.default_classes()
+        self.aging_sec = _env_int('BUILD_SCHED_AGING_SEC', 900)
+        self.lock = threading.Condition()
+        self.pending = []
+        self.running = []
+        self.finished = []
+        self.usage = {}  # user -> accumulated cpu-seconds, used for fair-share
+        self.listeners = []
+        self.holds = []
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+
+    # ------------------------------------------------------------------ API
+
+    def submit(self, job):
+        """Queue a job; it starts as soon as it is admitted"""
+        with self.lock:
+            self.pending.append(job)
+            self.lock.notify_all()
+        self._notify(job)
+        return job
+
+    def cancel_pending(self):
+        """Drop every job that has not started yet, returns the cancelled jobs"""
+        with self.lock:
+            cancelled = self.pending
+            self.pending = []
+            for job in cancelled:
+                job.state = 'cancelled'
+                job.finished_at = time.time()
+                self.finished.append(job)
+        for job in cancelled:
+            self._notify(job)
+        return cancelled
+
+    def has_active(self):
+        with self.lock:
+            return bool(self.pending or self.running)
+
+    def running_jobs(self):
+        with self.lock:
+            return list(self.running)
+
+    def get(self, job_id):
+        with self.lock:
+            for job in self.running + self.pending + self.finished:
+                if job.id == job_id:
+                    return job
+        return None
+
+    def snapshot(self):
+        """Queue and capacity overview for the dashboard"""
+        with self.lock:
+            used_cpus, used_mem = self._used()
+            return {
+                'budget': {'cpus': self.budget.cpus, 'mem_mb': self.budget.mem_mb,
+                           'max_jobs': self.budget.max_jobs},
+                'used': {'cpus': used_cpus, 'mem_mb': used_mem, 'jobs': len(self.running)},
+                'running': [j.to_dict() for j in self.running],
+                'pending': [j.to_dict() for j in self._ordered_pending()],
+                'finished': [j.to_dict() for j in self.finished[-20:]],
+            }
+
+    def add_listener(self, callback):
+        """Register callback(job) invoked on every job state change"""
+        self.listeners.append(callback)
+
+    def add_hold(self, callback):
+        """Register callback(job) -> reason while the job must stay queued (None lets it run)"""
+        self.holds.append(callback)
+
+    def held(self, job):
+        """Why a job cannot start yet whatever the capacity, None when it can"""
+        if job.tree:
+            with self.lock:
+                for other in self.running:
+                    if other.tree == job.tree and 'write' in (other.tree_mode, job.tree_mode):
+                        return f"waiting for {job.tree} (job #{other.id} holds it)"
+        for callback in self.holds:
+            try:
+                reason = callback(job)
+            except Exception as e:
+                print(f"Scheduler hold error: {e}")
+                continue
+            if reason:
+                return reason
+        return None
+
+    # ------------------------------------------------------------ internals
+
+    def _notify(self, job):
+        for callback in self.listeners:
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"Scheduler listener error: {e}")
+
+    def _used(self):
+        cpus = sum(self.classes[j.resource_class].cpus for j in self.running)
+        mem = sum(self.classes[j.resource_class].mem_mb for j in self.running)
+        return cpus, mem
+
+    def _fits(self, job):
+        if len(self.running) >= self.budget.max_jobs:
+            return False
+        rc = self.classes[job.resource_class]
+        used_cpus, used_mem = self._used()
+        # A job larger than the whole budget still runs once the machine is idle
+        if not self.running:
+            return True
+        return used_cpus + rc.cpus <= self.budget.cpus and used_mem + rc.mem_mb <= self.budget.mem_mb
+
+    def _user_share(self, user):
+        running = sum(self.classes[j.resource_class].cpus or 0.1
+                      for j in self.running if j.user == user)
+        return running, self.usage.get(user, 0.0)
+
+    def _ordered_pending(self):
+        return sorted(self.pending,
+                      key=lambda j: (j.priority, self._user_share(j.user), j.submitted_at))
+
+    def _pick(self):
+        now = time.time()
+        for job in self._ordered_pending():
+            # A held job only holds back itself
+            if self.held(job):
+                continue
+            if self._fits(job):
+                return job
+            # A job that waited too long stops lighter jobs from overtaking it
+            if now - job.submitted_at > self.aging_sec:
+                return None
+        return None
+
+    def _dispatch_loop(self):
+        while True:
+            with self.lock:
+                job = self._pick()
+                while job is None:
+                    self.lock.wait(timeout=5)
+                    job = self._pick()
+                self.pending.remove(job)
+                job.state = 'running'
+                job.started_at = time.time()
+                self.running.append(job)
+            self._notify(job)
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job):
+        try:
+            job.target(*job.args, job=job)
+            if job.state == 'running':
+                job.state = 'finished'
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+        finally:
+            with self.lock:
+                job.finished_at = time.time()
+                self.running.remove(job)
+                self.finished.append(job)
+                del self.finished[:-200]
+                cpus = self.classes[job.resource_class].cpus or 0.1
+                self.usage[job.user] = self.usage.get(job.user, 0.0) + cpus * (job.finished_at - job.started_at)
+                self.lock.notify_all()
+            self._notify(job)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+"""
+Build Tree Lock
+Reader/writer advisory lock on an ENV_PATH, shared with build_automation.sh.
+
+The lock is a flock on $ENV_PATH/.build_lock: steps that change the tree
+(update, build, generate) take it exclusively, deploy and install share it.
+build_automation.sh takes it for every run, so this module is used to do the
+same from Python, to tell which lock a job will need and to see who holds a
+tree. Holders describe themselves in $ENV_PATH/.build_lock.d/<host>.<pid>
+("mode=write pid=... host=... user=... config=... since=...").
+"""
+
+import fcntl
+import getpass
+import os
+import socket
+import time
+from pathlib import Path
+
+from build_jobstore import step_flags
+
+
+LOCK_NAME = '.build_lock'
+HOLDERS_DIR = '.build_lock.d'
+WRITE_STEPS = ('-u', '-b', '-g')
+
+
+class TreeBusy(Exception):
+    pass
+
+
+def lock_mode(options):
+    """'write' when a build_automation.sh option string changes the tree, else 'read'"""
+    return 'write' if any(flag in WRITE_STEPS for flag in step_flags(options)) else 'read'
+
+
+def holders(env_path):
+    """Processes holding the lock on a tree, as dicts (stale local entries skipped)"""
+    found = []
+    directory = Path(env_path) / HOLDERS_DIR
+    try:
+        files = sorted(directory.iterdir())
+    except OSError:
+        return found
+    host = socket.gethostname()
+    for path in files:
+        try:
+            info = dict(field.split('=', 1) for field in path.read_text().split() if '=' in field)
+        except OSError:
+            continue
+        if info.get('host') == host and not _alive(info.get('pid')):
+            continue
+        found.append(info)
+    return found
+
+
+def _alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except (TypeError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class TreeLock:
+    """flock-based reader/writer lock on one tree, usable as a context manager"""
+
+    def __init__(self, env_path, mode='write', timeout=None, config=''):
+        self.env_path = Path(env_path)
+        self.mode = mode
+        self.timeout = timeout  # seconds, None waits without limit
+        self.config = config
+        self.fd = None
+        self.holder_file = None
+
+    def available(self):
+        """True when the lock could be taken right now (no conflicting holder)"""
+        try:
+            fd = os.open(self.env_path / LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o664)
+        except OSError:
+            # A missing or read-only tree: nothing can hold its lock
+            return True
+        try:
+            fcntl.flock(fd, self._op() | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+        finally:
+            os.close(fd)
+
+    def acquire(self):
+        self.fd = os.open(self.env_path / LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o664)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(self.fd, self._op() | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(self.fd)
+                    self.fd = None
+                    raise TreeBusy(f"{self.env_path} is locked by " +
+                                   ', '.join(describe(h) for h in holders(self.env_path)))
+                time.sleep(0.5)
+        self._write_holder()
+        return self
+
+    def release(self):
+        if self.holder_file:
+            try:
+                self.holder_file.unlink()
+            except OSError:
+                pass
+            self.holder_file = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _op(self):
+        return fcntl.LOCK_EX if self.mode == 'write' else fcntl.LOCK_SH
+
+    def _write_holder(self):
+        host = socket.gethostname()
+        directory = self.env_path / HOLDERS_DIR
+        try:
+            directory.mkdir(exist_ok=True)
+            self.holder_file = directory / f"{host}.{os.getpid()}"
+            self.holder_file.write_text(f"mode={self.mode} pid={os.getpid()} host={host} "
+                                        f"user={getpass.getuser()} config={self.config} since={int(time.time())}\n")
+        except OSError:
+            self.holder_file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def describe(holder):
+    return f"{holder.get('mode')} by {holder.get('user')}@{holder.get('host')} pid {holder.get('pid')}"
@@ -0,0 +1,469 @@
+let pendingCommand = null;
+let pendingDescription = null;
+let logPollTimer = null;
+let outputSeq = null;
+let editingConfig = '';  // registry name of the config open in the editor, '' for the default
+let editingKeys = [];  // keys present in that config
+
+function executeCommand(options, description) {
+    pendingCommand = options;
+    pendingDescription = description;
+    document.getElementById('confirm-message').textContent = 'Are you sure you want to execute: ' + description + '?';
+    document.getElementById('confirm-modal').classList.add('active');
+}
+
+function confirmNo() {
+    document.getElementById('confirm-modal').classList.remove('active');
+    pendingCommand = null;
+    pendingDescription = null;
+}
+
+function confirmYes() {
+    document.getElementById('confirm-modal').classList.remove('active');
+    if (pendingCommand) {
+        runCommand(pendingCommand, pendingDescription);
+    }
+}
+
+function runCommand(options, description) {
+    if (document.getElementById('resume-checkpoint').checked) {
+        options += ' --resume';
+        description += ' (resume)';
+    }
+    setStatus('running', 'Executing: ' + description + '...');
+    disableButtons(true);
+    showStopButton(true);
+    
+    fetch('/execute', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({options: options, description: description,
+                          config: document.getElementById('config-select').value})
+    })
+    .then(r => r.json())
+    .then(data => {
+        if (data.success) {
+            startLogPolling(data.output_seq);
+        } else {
+            addLog('Error: ' + data.message);
+            setStatus('ready', 'Ready');
+            disableButtons(false);
+        }
+    });
+}
+
+// Output is read by sequence number in the compact text format: one JSON
+// status line, then the log lines. The server holds the request (wait) until
+// output arrives, so polling again right away costs nothing while idle.
+function startLogPolling(seq) {
+    outputSeq = seq;
+    clearTimeout(logPollTimer);
+    updateLog();
+}
+
+function updateLog() {
+    fetch('/get_output?format=text&wait=1000&since=' + outputSeq)
+    .then(r => r.text())
+    .then(text => {
+        const newline = text.indexOf('\n');
+        const data = JSON.parse(newline < 0 ? text : text.slice(0, newline));
+        if (data.count) {
+            addLogLines(text.slice(newline + 1).split('\n'));
+        }
+        if (data.dropped) {
+            addLog('… ' + data.dropped + ' lines skipped (viewer fell behind)');
+        }
+        outputSeq = data.next;
+        if (data.ccache) {
+            document.getElementById('ccache-stats').textContent = formatCcache(data.ccache);
+        }
+        // Render the current command in the Execution Log header (ANSI -> HTML)
+        try {
+            const cmdEl = document.getElementById('current-command');
+            const cmdText = data.current_command || '';
+            // Hide the element if empty (no visible command), otherwise show it
+            if (!cmdText || cmdText.trim() === '') {
+                cmdEl.style.display = 'none';
+                cmdEl.innerHTML = '';
+                cmdEl.title = '';
+            } else {
+                cmdEl.style.display = '';
+                cmdEl.innerHTML = ansiToHtml(cmdText);
+                cmdEl.title = data.current_command_plain || '';
+            }
+        } catch (e) {}
+        if (data.more) {
+            logPollTimer = setTimeout(updateLog, 0);
+        } else if (data.finished) {
+            setStatus('ready', data.status);
+            disableButtons(false);
+            showStopButton(false);
+            if (data.success) {
+                alert('✓ ' + data.description + ' completed successfully!');
+            } else if (data.stopped) {
+                alert('⏹ ' + data.description + ' was stopped by user.');
+            } else {
+                alert('✗ ' + data.description + ' failed!');
+            }
+        } else {
+            logPollTimer = setTimeout(updateLog, 100);
+        }
+    })
+    .catch(() => {
+        logPollTimer = setTimeout(updateLog, 2000);
+    });
+}
+
+function formatCcache(c) {
+    return c.hits + ' hits / ' + c.misses + ' misses (' + c.hit_rate + '%), ' + c.size_mb + ' MB';
+}
+
+function escapeHtml(s) {
+    return s.replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;');
+}
+
+function ansiToHtml(text) {
+    // Normalize common escaped forms to actual ESC character so regex matches reliably
+    try {
+        // Replace literal backslash-x sequences (\x1b) and backslash-u sequences (\u001b) with an actual ESC
+        text = text.replace(/\\x1b/g, '\x1b').replace(/\\u001b/g, '\x1b');
+        // Some inputs may include the ESC char as the visible glyph '\u001b' already, leave as-is
+    } catch (e) {}
+
+    text = escapeHtml(text);
+
+    // Replace actual ESC sequences like \x1b[0;34m or \u001b[0;34m
+    const ansiRegex = /\x1b\[([0-9;]+)m/g;
+    text = text.replace(ansiRegex, function(_, codes) {
+        let parts = codes.split(';').map(Number);
+        // Treat 0 as reset; if it's the only code, close span; otherwise remove it and continue
+        if (parts.length === 1 && parts[0] === 0) return '</span>';
+        if (parts.includes(0)) parts = parts.filter(p => p !== 0);
+        let styles = [];
+        parts.forEach(code => {
+            if (code === 1) styles.push('font-weight:bold');
+            else if (code >= 30 && code <= 37) {
+                const cols = ['black','red','green','yellow','blue','magenta','cyan','white'];
+                styles.push('color:' + cols[code-30]);
+            } else if (code >= 90 && code <= 97) {
+                const cols = ['grey','red','green','yellow','blue','magenta','cyan','white'];
+                styles.push('color:' + cols[code-90]);
+            }
+        });
+        if (styles.length) return '<span style="' + styles.join(';') + '">';
+        return '';
+    });
+    return text;
+}
+
+function addLog(msg) {
+    addLogLines([msg]);
+}
+
+// Appends a batch of lines with a single layout and scroll
+function addLogLines(lines) {
+    const logDiv = document.getElementById('log-output');
+    const fragment = document.createDocumentFragment();
+    lines.forEach(msg => {
+        const line = document.createElement('div');
+        line.className = 'log-line';
+        line.innerHTML = ansiToHtml(msg);
+        fragment.appendChild(line);
+    });
+    logDiv.appendChild(fragment);
+    logDiv.scrollTop = logDiv.scrollHeight;
+}
+
+function clearLog() {
+    document.getElementById('log-output').innerHTML = '';
+}
+
+function setStatus(state, text) {
+    const dot = document.getElementById('status-dot');
+    const statusText = document.getElementById('status-text');
+    const spinner = document.getElementById('spinner');
+    statusText.textContent = text;
+    if (state === 'running') {
+        dot.classList.add('running');
+        spinner.classList.add('active');
+    } else {
+        dot.classList.remove('running');
+        spinner.classList.remove('active');
+    }
+}
+
+function disableButtons(disabled) {
+    document.querySelectorAll('.btn, .btn-edit-config').forEach(btn => btn.disabled = disabled);
+}
+
+function showStopButton(show) {
+    const stopBtn = document.getElementById('btn-stop');
+    if (show) {
+        stopBtn.classList.add('active');
+    } else {
+        stopBtn.classList.remove('active');
+    }
+}
+
+function stopExecution() {
+    if (!confirm('Are you sure you want to stop the current execution?')) {
+        return;
+    }
+    addLog('');
+    addLog('⏹ Stop requested by user...');
+    
+    fetch('/stop_execution', {method: 'POST'})
+    .then(r => r.json())
+    .then(data => {
+        if (data.success) {
+            addLog('⏹ Stop signal sent successfully');
+        } else {
+            addLog('Error stopping execution: ' + data.message);
+        }
+    })
+    .catch(err => addLog('Error: ' + err));
+}
+
+// Edits the config selected under "Run With". The password is never sent to the
+// page: the field stays empty and is only saved when something is typed into it.
+function openConfigEditor() {
+    const config = document.getElementById('config-select').value;
+    fetch('/get_full_config' + (config ? '?config=' + encodeURIComponent(config) : ''))
+    .then(r => r.json())
+    .then(data => {
+        if (data.success === false) {
+            alert('Error loading configuration: ' + data.message);
+            return;
+        }
+        editingConfig = config;
+        editingKeys = Object.keys(data);
+        document.getElementById('edit-config-name').textContent = config || 'build_config.cfg';
+        document.getElementById('edit-app-root').value = data.APP_ROOT || '';
+        document.getElementById('edit-project-name').value = data.PROJECT_NAME || '';
+        document.getElementById('edit-setup-name').value = data.SETUP_NAME || '';
+        document.getElementById('edit-env-path').value = data.ENV_PATH || '';
+        document.getElementById('edit-zero-config-path').value = data.ZERO_CONFIG_PATH || '';
+        document.getElementById('edit-build-type').value = data.BUILD_TYPE || 'HW';
+        document.getElementById('edit-hw-app').value = data.HW_APP || 'GPR_APP';
+        document.getElementById('edit-build-matrix').value = (data.BUILD_MATRIX || '').replace(/^"|"$/g, '');
+        document.getElementById('edit-matrix-jobs').value = data.MATRIX_JOBS || '';
+        document.getElementById('edit-output-base').value = data.OUTPUT_BASE || '';
+        document.getElementById('edit-avpc-ip').value = data.AVPC_IP || '';
+        const password = document.getElementById('edit-avpc-password');
+        password.value = '';
+        password.placeholder = (data.secrets_set || []).includes('AVPC_PASSWORD') ? '(unchanged)' : '';
+        document.getElementById('edit-modal').classList.add('active');
+    })
+    .catch(err => alert('Error loading configuration: ' + err));
+}
+
+function closeConfigEditor() {
+    document.getElementById('edit-modal').classList.remove('active');
+}
+
+function saveConfig() {
+    const formData = {
+        APP_ROOT: document.getElementById('edit-app-root').value,
+        PROJECT_NAME: document.getElementById('edit-project-name').value,
+        SETUP_NAME: document.getElementById('edit-setup-name').value,
+        ENV_PATH: document.getElementById('edit-env-path').value,
+        ZERO_CONFIG_PATH: document.getElementById('edit-zero-config-path').value,
+        BUILD_TYPE: document.getElementById('edit-build-type').value,
+        HW_APP: document.getElementById('edit-hw-app').value,
+        OUTPUT_BASE: document.getElementById('edit-output-base').value,
+        AVPC_IP: document.getElementById('edit-avpc-ip').value
+    };
+    // Optional keys are only written when set or already in the config
+    const matrix = document.getElementById('edit-build-matrix').value.trim();
+    if (matrix || editingKeys.includes('BUILD_MATRIX')) formData.BUILD_MATRIX = '"' + matrix + '"';
+    const matrixJobs = document.getElementById('edit-matrix-jobs').value.trim();
+    if (matrixJobs || editingKeys.includes('MATRIX_JOBS')) formData.MATRIX_JOBS = matrixJobs;
+    const password = document.getElementById('edit-avpc-password').value;
+    if (password) formData.AVPC_PASSWORD = password;
+    if (editingConfig) formData.config = editingConfig;
+    
+    if (!confirm('Save configuration changes?')) {
+        return;
+    }
+    
+    fetch('/save_config', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(formData)
+    })
+    .then(r => r.json())
+    .then(data => {
+        if (data.success) {
+            alert('✓ Configuration saved successfully!');
+            closeConfigEditor();
+            refreshConfig();
+            loadConfigList();
+        } else {
+            alert('Error saving configuration: ' + data.message);
+        }
+    })
+    .catch(err => alert('Error saving configuration: ' + err));
+}
+
+function refreshConfig() {
+    fetch('/get_config')
+    .then(r => r.json())
+    .then(config => {
+        document.getElementById('config-file').textContent = config.config_file;
+        document.getElementById('project-name').textContent = config.project_name;
+        document.getElementById('build-type').textContent = config.build_type;
+        document.getElementById('zero-config-path').textContent = config.zero_config_path || '';
+    });
+}
+
+// Configs from the registry for the "Run With" selector; the empty value
+// runs with the default config file.
+function loadConfigList() {
+    fetch('/configs')
+    .then(r => r.json())
+    .then(data => {
+        const select = document.getElementById('config-select');
+        const selected = select.value;
+        while (select.options.length > 1) select.remove(1);
+        data.configs.forEach(c => {
+            if (c.name === data.default) return;
+            const option = new Option(c.name + (c.values.PROJECT_NAME ? ' - ' + c.values.PROJECT_NAME : ''), c.name);
+            if (!c.valid) {
+                option.disabled = true;
+                option.title = c.errors.join('; ');
+            }
+            select.add(option);
+        });
+        select.value = selected;
+        if (select.selectedIndex < 0) select.value = '';
+    });
+}
+
+// Setup/AVPC reachability from the server's health prober
+function renderHealth(data) {
+    const list = document.getElementById('health-list');
+    if (!data.targets.length) {
+        list.textContent = data.interval > 0 ? 'Waiting for the first probe...' : 'Health prober disabled';
+        return;
+    }
+    list.innerHTML = data.targets.map(t => {
+        const name = t.kind === 'setup' ? t.host : t.via + ' → AVPC ' + t.host;
+        const detail = t.status === 'up' ? t.latency_ms + ' ms' : (t.error || t.status);
+        const age = Math.round(Date.now() / 1000 - t.checked_at);
+        return '<div class="health-item ' + t.status + '" title="checked ' + age + ' s ago">' +
+               '<span class="health-dot"></span>' + escapeHtml(name) + ' <small>' + escapeHtml(detail) + '</small></div>';
+    }).join('');
+}
+
+function refreshHealth() {
+    fetch('/health').then(r => r.json()).then(renderHealth);
+}
+
+function checkHealthNow() {
+    document.getElementById('health-list').textContent = 'Checking...';
+    fetch('/health/check', {method: 'POST'}).then(r => r.json()).then(renderHealth);
+}
+
+// Reclaimed space and removals of the server's garbage collector
+function formatBytes(bytes) {
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let i = 0;
+    while (bytes >= 1024 && i < units.length - 1) { bytes /= 1024; i++; }
+    return (i ? bytes.toFixed(1) : bytes) + ' ' + units[i];
+}
+
+function renderGc(data) {
+    const summary = document.getElementById('gc-summary');
+    const list = document.getElementById('gc-list');
+    const parts = ['Reclaimed ' + formatBytes(data.reclaimed_bytes) + ' (' + data.removed_count + ' removed)'];
+    if (data.last) {
+        const kinds = Object.entries(data.last.kinds).map(([k, v]) => v.count + ' ' + k + ' ' + formatBytes(v.bytes));
+        if (kinds.length) parts.push('kept: ' + kinds.join(', '));
+        if (data.last.unmeasured) parts.push(data.last.unmeasured + ' not measured yet');
+        parts.push((data.last.dry_run ? 'last dry run ' : 'last pass ') + new Date(data.last.finished_at * 1000).toLocaleString());
+    } else if (!data.enabled) {
+        parts.push('background collection disabled');
+    }
+    if (data.policy.dry_run) parts.push('dry-run mode, nothing is removed (WEB_GUI_GC_DRY_RUN=false enables removal)');
+    const clean = document.getElementById('gc-clean-btn');
+    clean.disabled = data.policy.dry_run;
+    clean.title = data.policy.dry_run ? 'Disabled while WEB_GUI_GC_DRY_RUN is on' : '';
+    summary.textContent = parts.join(' · ');
+    const item = (e, cls, when) => '<div class="gc-item ' + cls + '">' + escapeHtml(when + e.path + ' — ' +
+        (e.size !== null ? formatBytes(e.size) + ', ' : '') + e.reason) + '</div>';
+    let html = '';
+    if (data.report && data.report.dry_run) {
+        html += data.report.removed.map(e => item(e, 'planned', 'would remove ')).join('') ||
+                '<div class="gc-item">Nothing to remove</div>';
+    }
+    html += data.recent.map(e => item(e, '', new Date(e.removed_at * 1000).toLocaleString() + '  ')).join('');
+    list.innerHTML = html;
+}
+
+function refreshGc() {
+    fetch('/gc').then(r => r.json()).then(renderGc);
+}
+
+function runGc(dryRun) {
+    if (!dryRun && !confirm('Remove everything the retention policies select now?')) return;
+    document.getElementById('gc-summary').textContent = dryRun ? 'Checking...' : 'Cleaning...';
+    fetch('/gc/run', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                      body: JSON.stringify({dry_run: dryRun})})
+    .then(r => r.json()).then(renderGc);
+}
+
+function openEnvCreator() {
+    document.getElementById('env-creator-modal').classList.add('active');
+}
+
+function closeEnvCreator() {
+    document.getElementById('env-creator-modal').classList.remove('active');
+}
+
+function createEnvironment(envType) {
+    const destPath = document.getElementById('env-dest-path').value.trim();
+    
+    if (!destPath) {
+        alert('Please enter a destination path');
+        return;
+    }
+    
+    closeEnvCreator();
+    setStatus('running', 'Creating ' + envType + ' environment...');
+    disableButtons(true);
+    showStopButton(true);
+    
+    fetch('/create_environment', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({env_type: envType, dest_path: destPath})
+    })
+    .then(r => r.json())
+    .then(data => {
+        if (data.success) {
+            startLogPolling(data.output_seq);
+        } else {
+            addLog('Error: ' + data.message);
+            setStatus('ready', 'Ready');
+            disableButtons(false);
+            showStopButton(false);
+        }
+    });
+}
+
+setInterval(() => {
+    fetch('/get_config')
+    .then(r => r.json())
+    .then(data => {
+        document.getElementById('config-file').textContent = data.config_file;
+        document.getElementById('project-name').textContent = data.project_name;
+        document.getElementById('build-type').textContent = data.build_type;
+        document.getElementById('zero-config-path').textContent = data.zero_config_path || '';
+    });
+    loadConfigList();
+}, 30000);
+loadConfigList();
+refreshHealth();
+setInterval(refreshHealth, 15000);
+refreshGc();
+setInterval(refreshGc, 60000);